@@ -1,15 +1,25 @@
 import os
-import re
-from flask import Flask, request, jsonify, send_file, session, render_template, redirect, current_app
+from flask import Flask, request, jsonify, send_file, session, redirect, current_app, Response, stream_with_context
 import logging
 from dotenv import load_dotenv
 from voice_language_handler import VoiceLanguageHandler
-import speech_recognition as sr
 import base64
-import io
-import sqlite3
 from auth import auth_bp
-from websocket_handler import socketio
+from websocket_handler import socketio, socketio_options, init_consultation_channel
+from consultation_store import load_consultation_state
+from triage_engine import ask_follow_up
+from language_packs import needs_translation, pack_for
+from request_tracing import init_tracing, span
+from consultation import finalize_consultation, iter_summary_updates, sse_event, SummarySaveError
+from job_queue import JobManager, QueueFull
+from admission_control import admit, AdmissionRejected, init_admission_control, queue_utilization
+from qos_controller import qos, tier_allows_tts
+from audio_upload import read_request_audio, UploadTooLarge, MAX_AUDIO_UPLOAD
+from audio_codecs import accepted_formats, decode_audio, UnsupportedAudio
+from static_pages import init_static_pages, page_response
+from json_provider import init_json
+from http_compression import init_response_compression
+from tts_cache import speech_file, cached_audio, audio_url, available_profiles, OUTPUT_PROFILES
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,447 +34,69 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True  # Prevent JavaScript access to ses
 app.config['PERMANENT_SESSION_LIFETIME'] = 1800  # Session lifetime of 30 minutes
 app.register_blueprint(auth_bp, url_prefix='/auth')
 
-# Initialize SocketIO with the Flask app (let it choose best async mode)
-socketio.init_app(app, cors_allowed_origins="*")
+# Initialize SocketIO with the Flask app (let it choose best async mode); with several
+# workers, SOCKETIO_MESSAGE_QUEUE fans events out between them
+socketio.init_app(app, cors_allowed_origins="*", **socketio_options())
+
+# Per-stage timings: Server-Timing headers and the /metrics endpoint
+init_tracing(app)
+
+# Per-user and global limits on the remote STT, translation and TTS backends
+init_admission_control(app)
+
+# Static pages are rendered and compressed once; /assets serves fingerprinted static files
+init_static_pages(app)
+
+# UTF-8 JSON (orjson when installed), gzip/brotli for larger JSON responses
+init_json(app)
+init_response_compression(app)
 
 @app.route('/')
 def index():
-    return render_template('home.html')
+    return page_response('home.html')
 
 @app.route('/chat')
 def chat():
     if 'user_id' not in session:
         return redirect('/auth/login')
-    return render_template('index.html')
+    return page_response('index.html')
 
 # Initialize voice and language handler
 voice_handler = VoiceLanguageHandler()
 
+# Socket.IO consultation channel (/consultation namespace) shares the voice handler
+init_consultation_channel(voice_handler)
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
-def generate_summary(symptoms, language="English", follow_up_answers=None, format_type="concise"):
-    """
-    Generates a medical summary based on user symptoms and follow-up answers using local processing.
-    Always generates a concise single-paragraph summary optimized for quick medical review.
-    """
-    # Prepare context from common symptoms database
-    common_symptoms = {
-        "fever": {
-            "causes": ["Viral infection", "Bacterial infection", "Inflammation", "COVID-19"],
-            "severity": "Moderate to High",
-            "urgency": "Seek immediate care if temperature exceeds 103°F (39.4°C)",
-            "general_recommendations": [
-                "Maintain room temperature around 70°F (21°C)",
-                "Change bedding frequently if sweating",
-                "Eat light, easily digestible foods",
-                "Avoid strenuous activity"
-            ]
-        },
-        "headache": {
-            "causes": ["Tension", "Migraine", "Sinusitis", "Hypertension", "Dehydration"],
-            "severity": "Mild to Moderate",
-            "urgency": "Urgent if accompanied by confusion or stiff neck",
-            "general_recommendations": [
-                "Maintain regular sleep schedule",
-                "Practice stress-reduction techniques",
-                "Stay well-hydrated",
-                "Consider keeping a headache diary"
-            ]
-        },
-        "cough": {
-            "causes": ["Upper respiratory infection", "Bronchitis", "Asthma", "COVID-19", "Allergies"],
-            "severity": "Mild to Severe",
-            "urgency": "Urgent if difficulty breathing or coughing blood"
-        },
-        "fatigue": {
-            "causes": ["Sleep deprivation", "Anemia", "Depression", "Thyroid dysfunction", "Post-viral syndrome"],
-            "severity": "Varies",
-            "urgency": "Evaluate if persistent > 2 weeks"
-        },
-        "nausea": {
-            "causes": ["Gastroenteritis", "Food poisoning", "Migraine", "Pregnancy", "Medication side effect"],
-            "severity": "Mild to Moderate",
-            "urgency": "Urgent if severe dehydration signs present"
-        },
-        "chest pain": {
-            "causes": ["Heart attack", "Angina", "Pulmonary embolism", "Anxiety", "Muscle strain"],
-            "severity": "High",
-            "urgency": "Seek immediate emergency care"
-        },
-        "shortness of breath": {
-            "causes": ["Asthma", "Anxiety", "Heart failure", "Pneumonia", "COVID-19"],
-            "severity": "High",
-            "urgency": "Seek immediate care if severe or worsening"
-        },
-        "dizziness": {
-            "causes": ["Low blood pressure", "Inner ear problems", "Dehydration", "Anemia", "Medication side effect"],
-            "severity": "Moderate",
-            "urgency": "Urgent if accompanied by fainting or severe headache"
-        },
-        "abdominal pain": {
-            "causes": ["Gastritis", "Appendicitis", "Food poisoning", "Ulcer", "Gallstones"],
-            "severity": "Moderate to High",
-            "urgency": "Seek immediate care if severe or accompanied by fever"
-        },
-        "rash": {
-            "causes": ["Allergic reaction", "Infection", "Autoimmune condition", "Medication reaction", "Contact dermatitis"],
-            "severity": "Mild to Moderate",
-            "urgency": "Urgent if accompanied by difficulty breathing or severe swelling"
-        },
-        "joint pain": {
-            "causes": ["Arthritis", "Injury", "Gout", "Lupus", "Fibromyalgia"],
-            "severity": "Moderate",
-            "urgency": "Seek care if severe or affecting mobility",
-            "general_recommendations": [
-                "Apply heat or cold packs as appropriate",
-                "Maintain gentle range-of-motion exercises",
-                "Use supportive devices if needed (braces, canes)",
-                "Maintain healthy weight to reduce joint stress"
-            ]
-        },
-        "sore throat": {
-            "causes": ["Viral infection", "Strep throat", "Allergies", "Acid reflux", "Tonsillitis"],
-            "severity": "Mild to Moderate",
-            "urgency": "Seek care if difficulty swallowing or breathing"
-        },
-        "back pain": {
-            "causes": ["Muscle strain", "Herniated disc", "Arthritis", "Osteoporosis", "Kidney problems"],
-            "severity": "Moderate",
-            "urgency": "Urgent if accompanied by numbness or weakness"
-        },
-        "ear pain": {
-            "causes": ["Ear infection", "Sinus pressure", "Tooth infection", "Earwax buildup", "Swimmer's ear"],
-            "severity": "Mild to Moderate",
-            "urgency": "Seek care if severe pain or fever present"
-        },
-        "eye problems": {
-            "causes": ["Conjunctivitis", "Allergies", "Foreign object", "Glaucoma", "Eye strain"],
-            "severity": "Moderate",
-            "urgency": "Urgent if sudden vision changes or severe pain"
-        },
-        "stomach pain": {
-            "causes": ["Indigestion", "Food poisoning", "Ulcer", "Appendicitis", "IBS"],
-            "severity": "Moderate to High",
-            "urgency": "Seek immediate care if severe or persistent"
-        },
-        "muscle weakness": {
-            "causes": ["Fatigue", "Nerve problems", "Stroke", "Multiple sclerosis", "Electrolyte imbalance"],
-            "severity": "High",
-            "urgency": "Urgent if sudden onset or affecting breathing"
-        },
-        "bleeding": {
-            "causes": ["Injury", "Surgery", "Blood disorder", "Medication side effect", "Internal bleeding"],
-            "severity": "High",
-            "urgency": "Seek immediate care if heavy or uncontrolled"
-        },
-        "swelling": {
-            "causes": ["Injury", "Infection", "Heart problems", "Kidney problems", "Allergic reaction"],
-            "severity": "Moderate to High",
-            "urgency": "Urgent if affecting breathing or circulation"
-        },
-        "anxiety": {
-            "causes": ["Stress", "Panic disorder", "PTSD", "Depression", "Medical conditions"],
-            "severity": "Moderate",
-            "urgency": "Seek care if affecting daily life or worsening"
-        }
-    }
-    
-    symptoms_lower = symptoms.lower()
-    identified_symptoms = {}
-    
-    # Enhanced symptom identification that handles multiple symptoms better
-    symptom_words = re.findall(r'\b\w+\b', symptoms_lower)
-    for symptom, info in common_symptoms.items():
-        # Check if symptom appears as a standalone word or in a phrase
-        symptom_parts = symptom.split()
-        if len(symptom_parts) == 1:
-            # Single word symptom
-            if symptom in symptom_words:
-                identified_symptoms[symptom] = info
-        else:
-            # Multi-word symptom (like "chest pain")
-            if all(part in symptom_words for part in symptom_parts):
-                # Check if words appear consecutively in the input
-                if re.search(r'\b' + re.escape(symptom) + r'\b', symptoms_lower):
-                    identified_symptoms[symptom] = info
-    
-    # Generate personalized summary
-    summary = f"Based on your reported symptoms: {symptoms}. "
-    
-    if identified_symptoms:
-        summary += "Our analysis shows: "
-        symptom_details = []
-        warnings = []
-        specific_recommendations = []
-        
-        for symptom, info in identified_symptoms.items():
-            # Add symptom-specific details
-            symptom_details.append(f"{symptom} (severity: {info['severity']})")
-            
-            # Add urgent warnings
-            if 'urgent' in info['urgency'].lower() or 'immediate' in info['urgency'].lower():
-                warnings.append(f"For {symptom}: {info['urgency']}")
-            
-            # Add detailed symptom-specific recommendations
-            if symptom == "fever":
-                specific_recommendations.extend([
-                    "Monitor temperature every 4 hours",
-                    "Drink plenty of fluids (water, herbal teas, broth)",
-                    "Use lukewarm sponge baths if fever is high",
-                    "Wear lightweight clothing",
-                    "Avoid alcohol and caffeine"
-                ])
-            elif symptom == "headache":
-                specific_recommendations.extend([
-                    "Apply cold compress to forehead for 15 minutes",
-                    "Massage temples gently",
-                    "Practice relaxation techniques",
-                    "Avoid bright lights and loud noises",
-                    "Limit screen time"
-                ])
-            elif symptom == "cough":
-                specific_recommendations.extend([
-                    "Drink warm liquids like honey-lemon tea",
-                    "Use a humidifier at night",
-                    "Avoid smoke and strong perfumes",
-                    "Try throat lozenges (for adults)",
-                    "Sleep with head slightly elevated"
-                ])
-            elif symptom == "fatigue":
-                specific_recommendations.extend([
-                    "Maintain regular sleep schedule",
-                    "Take short naps (20-30 minutes)",
-                    "Engage in light physical activity",
-                    "Eat small, frequent meals",
-                    "Limit caffeine intake"
-                ])
-            elif symptom == "nausea":
-                specific_recommendations.extend([
-                    "Eat small, bland meals (crackers, toast)",
-                    "Sip ginger tea or chew ginger candy",
-                    "Avoid strong odors",
-                    "Stay hydrated with small sips of water",
-                    "Try acupressure wristbands"
-                ])
-            elif symptom == "chest pain":
-                specific_recommendations.extend([
-                    "Rest immediately and avoid exertion",
-                    "Loosen tight clothing",
-                    "Sit in a comfortable position",
-                    "Monitor for worsening symptoms",
-                    "Avoid eating or drinking until evaluated"
-                ])
-            elif symptom == "shortness of breath":
-                specific_recommendations.extend([
-                    "Sit upright and lean forward slightly",
-                    "Pursed-lip breathing technique",
-                    "Avoid lying flat",
-                    "Use a fan for air circulation",
-                    "Stay calm and breathe slowly"
-                ])
-            elif symptom == "dizziness":
-                specific_recommendations.extend([
-                    "Sit or lie down immediately",
-                    "Rise slowly from sitting/lying position",
-                    "Avoid sudden head movements",
-                    "Stay hydrated",
-                    "Use handrails when walking"
-                ])
-        
-        summary += f"Identified symptoms: {', '.join(symptom_details)}. "
-        
-        if warnings:
-            summary += f"URGENT WARNINGS: {'; '.join(warnings)}. "
-        
-        # Combine general and specific recommendations
-        all_recommendations = [
-            "See a doctor for proper medical care",
-            "Keep detailed symptom records",
-            *specific_recommendations
-        ]
-        summary += "Recommended actions: " + ", ".join(all_recommendations) + ". "
-    
-    # Analyze follow-up information and integrate insights
-    if follow_up_answers:
-        summary += "Based on your additional information: "
-        insights = []
-        
-        for answer in follow_up_answers:
-            question = answer['question'].lower()
-            response = answer['answer'].lower()
-            
-            # Analyze duration-related responses
-            if 'how long' in question or 'when' in question:
-                if any(word in response for word in ['day', 'week', 'month']):
-                    insights.append(f"Duration: {response}")
-            
-            # Analyze severity-related responses
-            elif 'scale' in question or 'intensity' in question:
-                if any(str(i) for i in range(1, 11) if str(i) in response):
-                    insights.append(f"Severity level: {response}")
-            
-            # Analyze pattern-related responses
-            elif 'pattern' in question or 'worse' in question:
-                insights.append(f"Pattern observed: {response}")
-            
-            # Analyze treatment-related responses
-            elif 'medication' in question or 'taken' in question:
-                insights.append(f"Treatment history: {response}")
-        
-        if insights:
-            summary += ", ".join(insights) + ". "
-            
-            # Add severity-based recommendations
-            if any('severity' in insight.lower() for insight in insights):
-                if any(str(i) for i in range(7, 11) for insight in insights if str(i) in insight.lower()):
-                    summary += "Given the high severity, immediate medical attention is recommended. "
-                elif any(str(i) for i in range(4, 7) for insight in insights if str(i) in insight.lower()):
-                    summary += "Consider consulting a healthcare provider soon. "
-            
-            # Add duration-based recommendations
-            if any('duration' in insight.lower() for insight in insights):
-                if any(word in summary.lower() for word in ['week', 'month']):
-                    summary += "The persistent nature of symptoms suggests the need for medical evaluation. "
-    
-    # Add severity-based insights
-    severity_level = "Low"
-    if identified_symptoms:
-        severity_scores = []
-        for symptom, info in identified_symptoms.items():
-            if info['severity'].lower().startswith('high'):
-                severity_scores.append(3)
-            elif info['severity'].lower().startswith('moderate'):
-                severity_scores.append(2)
-            else:
-                severity_scores.append(1)
-        
-        avg_severity = sum(severity_scores) / len(severity_scores)
-        if avg_severity > 2.5:
-            severity_level = "High"
-            summary += "This combination of symptoms suggests a potentially serious condition that requires immediate medical attention. "
-        elif avg_severity > 1.5:
-            severity_level = "Moderate"
-            summary += "These symptoms warrant medical evaluation within the next 24-48 hours. "
-        else:
-            summary += "While these symptoms appear mild, monitor for any worsening. "
-    
-    # Include symptom-specific general recommendations from the common_symptoms info
-    if identified_symptoms:
-        general_recommendations = []
-        for symptom, info in identified_symptoms.items():
-            if 'general_recommendations' in info:
-                general_recommendations.extend(info['general_recommendations'])
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_recommendations = []
-        for rec in general_recommendations:
-            if rec not in seen:
-                seen.add(rec)
-                unique_recommendations.append(rec)
-        
-        if unique_recommendations:
-            summary += "General recommendations: " + ", ".join(unique_recommendations) + ". "
-    
-    # Add emergency warning signs based on severity
-    if severity_level == "High":
-        summary += "SEEK IMMEDIATE MEDICAL CARE if you experience: difficulty breathing, severe chest pain, confusion, or high fever with severe headache. "
-    
-    return summary.strip()
+# Background executor for the final consultation step (summary, translation, save)
+app.config['ASYNC_SUMMARY_JOBS'] = os.getenv('ASYNC_SUMMARY_JOBS', 'false').lower() in ('1', 'true', 'yes')
+summary_jobs = JobManager(
+    max_workers=int(os.getenv('SUMMARY_JOB_WORKERS', 4)),
+    max_pending=int(os.getenv('SUMMARY_JOB_QUEUE', 64)),
+    result_ttl=int(os.getenv('SUMMARY_JOB_TTL', 600))
+)
+summary_jobs.register_metrics('chatbot_summary_jobs')
 
-def ask_follow_up(symptoms, language="English"):
-    symptoms_lower = symptoms.lower()
-    follow_up_questions = []
-    
-    # Start with a general timing question for all symptoms
-    follow_up_questions.append({
-        "question": "When did these symptoms first appear?",
-        "image": "/static/images/medical-bot.svg",
-        "animation": "fadeIn"
-    })
-    
-    # Symptom-specific questions with severity assessment
-    if "fever" in symptoms_lower:
-        follow_up_questions.extend([
-            {
-                "question": "What is your current temperature?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "slideInRight"
-            },
-            {
-                "question": "Have you taken any medication to reduce the fever?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "bounceIn"
-            },
-            {
-                "question": "Are you experiencing chills or sweating?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "fadeInUp"
-            }
-        ])
-    if "pain" in symptoms_lower:
-        follow_up_questions.extend([
-            {
-                "question": "On a scale of 1-10, how severe is your pain?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "slideInLeft"
-            },
-            {
-                "question": "Is the pain constant or does it come and go?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "bounceInRight"
-            },
-            {
-                "question": "What makes the pain better or worse?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "fadeInDown"
-            }
-        ])
-    if "cough" in symptoms_lower:
-        follow_up_questions.extend([
-            {
-                "question": "Is your cough dry or producing mucus?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "slideInUp"
-            },
-            {
-                "question": "How frequently are you coughing?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "bounceInLeft"
-            },
-            {
-                "question": "Does anything trigger or worsen your cough?",
-                "image": "/static/images/medical-bot.svg",
-                "animation": "fadeInRight"
-            }
-        ])
-    
-    # Add general follow-up questions if we need more
-    general_questions = [
-        {
-            "question": "Have you taken any medications for these symptoms?",
-            "image": "/static/images/medical-bot.svg",
-            "animation": "slideInDown"
-        },
-        {
-            "question": "Have you experienced any other related symptoms?",
-            "image": "/static/images/medical-bot.svg",
-            "animation": "bounceInUp"
-        },
-        {
-            "question": "Do your symptoms affect your daily activities?",
-            "image": "/static/images/medical-bot.svg",
-            "animation": "fadeInLeft"
-        }
-    ]
-    
-    while len(follow_up_questions) < 4:
-        if not general_questions:
-            break
-        follow_up_questions.append(general_questions.pop(0))
-    
-    return follow_up_questions
+# Degrade translation/TTS per request when queues fill up or backends slow down
+qos.add_queue_source(lambda: (summary_jobs.queued + summary_jobs.running) / summary_jobs.max_pending)
+qos.add_queue_source(queue_utilization)
+qos.register_metrics()
+MAX_JOB_WAIT = 30  # Longest long-poll in seconds
+
+def first_question_response(symptoms, language):
+    """Start a consultation: the follow-up questions for the initial symptoms"""
+    follow_up_questions = ask_follow_up(symptoms, language)
+    return {
+        "is_follow_up": True,
+        "current_question_index": 0,
+        "total_questions": len(follow_up_questions),
+        "current_question": follow_up_questions[0],
+        "all_questions": follow_up_questions,
+        "original_symptoms": symptoms,
+        "animation_delay": 500  # Delay in milliseconds for animation
+    }
 
 @app.route("/chatbot", methods=["POST"])
 def chatbot():
@@ -475,6 +107,7 @@ def chatbot():
         
     # Continue with chatbot logic
     request_data = request.json
+    tier = qos.select_tier()
     input_type = request_data.get("input_type", "text")  # 'text' or 'voice'
     language = request_data.get("language", "english").lower()
     
@@ -485,19 +118,22 @@ def chatbot():
     
     # Handle voice input for initial symptoms
     if input_type == "voice" and not is_follow_up:
+        if "audio" not in request_data:
+            return jsonify({"error": "No audio data provided"}), 400
         try:
-            if "audio" not in request_data:
-                return jsonify({"error": "No audio data provided"}), 400
-                
-            audio_data = base64.b64decode(request_data.get("audio", ""))
-            audio_file = io.BytesIO(audio_data)
-            audio_content = audio_file.read()
-            if not audio_content:
-                return jsonify({"error": "Empty audio data. Please try recording again."}), 400
-            
-            audio_file = io.BytesIO(audio_content)
-            audio = sr.AudioData(audio_content, sample_rate=44100, sample_width=2)
-            source_lang = "te-IN" if language == "telugu" else "en-IN"
+            # Base64 in JSON is kept for older clients; /chatbot/voice takes the raw bytes
+            with span('chatbot.audio_decode'):
+                audio_content = base64.b64decode(request_data.get("audio", ""))
+                if not audio_content:
+                    return jsonify({"error": "Empty audio data. Please try recording again."}), 400
+                audio = decode_audio(audio_content)
+        except Exception as e:
+            logging.error(f"Error processing voice input: {str(e)}")
+            return jsonify({"error": "Error processing voice input"}), 400
+        # Only a request with audio to recognize takes a speech-recognition token
+        admit("stt", session['user_id'])
+        try:
+            source_lang = pack_for(language).stt_code
             
             symptoms = voice_handler.process_voice_input(audio, source_lang)
             if not symptoms:
@@ -515,22 +151,7 @@ def chatbot():
     
     if not is_follow_up:
         # Generate initial follow-up questions
-        follow_up_questions = ask_follow_up(symptoms, language)
-        
-        # Translate questions if language is Telugu
-        if language == "telugu":
-            for question in follow_up_questions:
-                question["question"] = voice_handler.translate_text(question["question"], "te")
-        
-        response = {
-            "is_follow_up": True,
-            "current_question_index": 0,
-            "total_questions": len(follow_up_questions),
-            "current_question": follow_up_questions[0],
-            "all_questions": follow_up_questions,
-            "original_symptoms": symptoms,
-            "animation_delay": 500  # Delay in milliseconds for animation
-        }
+        response = first_question_response(symptoms, language)
     else:
         # Process follow-up answer and get next question
         all_questions = request_data.get("all_questions", [])
@@ -558,119 +179,181 @@ def chatbot():
                 "animation_delay": 500
             }
         else:
-            # Generate final summary including all follow-up answers
-            summary = generate_summary(original_symptoms, language, follow_up_answers)
-            
-            # Debuggable Telugu translation with step-by-step validation
-            if language == "telugu":
+            if needs_translation(language) and tier in ("full", "skip_tts"):
+                admit("translate", session['user_id'])
+            if request_data.get("async_summary", app.config['ASYNC_SUMMARY_JOBS']):
+                # Hand the slow final step to a background job and return its ID immediately
                 try:
-                    logging.info("Starting Telugu translation process")
-                    
-                    # Extended medical term preservation
-                    preserved_terms = {
-                        '°F': ' డిగ్రీ ఫారెన్హీట్ ',
-                        '°C': ' డిగ్రీ సెల్సియస్ ',
-                        'COVID-19': 'కోవిడ్-19',
-                        'IBS': 'ఐబీఎస్', 
-                        'PTSD': 'పీటీఎస్డీ',
-                        'BP': 'రక్తపోటు',
-                        'HR': 'హృదయ రేటు',
-                        'SPO2': 'ఆక్సిజన్ సంతృప్తత'
-                    }
-                    logging.info(f"Preserving {len(preserved_terms)} medical terms")
-                    
-                    # Validate and replace terms with placeholders
-                    term_map = {}
-                    original_length = len(summary)
-                    for i, (term, trans) in enumerate(preserved_terms.items()):
-                        placeholder = f'__TERM_{i}__'
-                        if term in summary:
-                            summary = summary.replace(term, placeholder)
-                            term_map[placeholder] = trans
-                            logging.debug(f"Preserved term: {term} -> {placeholder}")
-                    
-                    if len(summary) != original_length:
-                        logging.warning(f"Term replacement altered text length ({original_length} -> {len(summary)})")
-                    
-                    # Validate translation service
-                    if not hasattr(voice_handler, 'translate_text'):
-                        raise AttributeError("Translation service not available")
-                    
-                    # Test translation with known phrase
-                    test_phrase = "This is a test"
-                    test_translation = voice_handler.translate_text(test_phrase, "te")
-                    if not test_translation or len(test_translation) < len(test_phrase)/2:
-                        raise ValueError("Translation service test failed")
-                    
-                    # Translate the actual text
-                    logging.info(f"Translating text (length: {len(summary)})")
-                    translated_summary = voice_handler.translate_text(summary, "te")
-                    logging.info(f"Received translation (length: {len(translated_summary)})")
-                    
-                    if translated_summary:
-                        # Restore preserved terms
-                        for placeholder, trans in term_map.items():
-                            translated_summary = translated_summary.replace(placeholder, trans)
-                        
-                    # Verify translation quality and add standard precautions
-                    telugu_chars = len([c for c in translated_summary if '\u0C00' <= c <= '\u0C7F'])
-                    if telugu_chars > len(translated_summary)*0.6:  # At least 60% Telugu
-                        precautions = "\n\nసాధారణ జాగ్రత్తలు:\n- తగినంత నీరు తాగండి\n- సరైన విశ్రాంతి తీసుకోండి\n- ఒత్తిడిని తగ్గించుకోండి\n- వేడి లేదా చల్లటి కంప్రెస్ వేసుకోండి"
-                        summary = translated_summary + precautions
-                    else:
-                        logging.error(f"Low Telugu content in translation: {telugu_chars}/{len(translated_summary)}")
-                        summary = f"English:\n{summary}\n\nTelugu:\n{translated_summary}\n\nసాధారణ జాగ్రత్తలు:\n- తగినంత నీరు తాగండి\n- సరైన విశ్రాంతి తీసుకోండి"
-                    
-                    if not summary:
-                        raise ValueError("Empty translation result")
-                        
-                except Exception as e:
-                    logging.error(f"Telugu translation failed: {str(e)}")
-                    # Generate bilingual summary as fallback
-                    summary = f"English:\n{summary}\n\nTelugu:\n{voice_handler.translate_text(summary, 'te')}"
+                    job = summary_jobs.submit(finalize_consultation, voice_handler, session['user_id'],
+                                              original_symptoms, language, follow_up_answers,
+                                              owner=session['user_id'], tier=tier)
+                except QueueFull as e:
+                    return jsonify({'error': 'The server is busy. Please try again shortly.'}), 503, {'Retry-After': str(e.retry_after)}
+                return jsonify({
+                    "is_follow_up": False,
+                    "job_id": job.id,
+                    "status": job.status,
+                    "status_url": f"/chatbot/jobs/{job.id}",
+                    "qos_tier": tier
+                }), 202
             
-            # Save the summary sheet to database
             try:
-                db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-                conn = sqlite3.connect(db_path)
-                c = conn.cursor()
-                
-                c.execute('INSERT INTO summary_sheets (user_id, symptoms, summary) VALUES (?, ?, ?)',
-                          (session['user_id'], original_symptoms, summary))
-                conn.commit()
-                conn.close()
-                
-            except Exception as e:
-                logging.error(f"Error saving summary: {e}")
-                return jsonify({'error': 'Failed to save consultation summary'}), 500
-            
-            # Prepare response with translation status
-            is_telugu_complete = (
-                language != "telugu" or 
-                any('\u0C00' <= c <= '\u0C7F' for c in summary)
-            )
-            response = {
-                "is_follow_up": False,
-                "summary_sheet": summary,
-                "needs_audio": False,
-                "translation_status": "complete" if is_telugu_complete else "partial"
-            }
+                response = finalize_consultation(voice_handler, session['user_id'], original_symptoms,
+                                                 language, follow_up_answers, tier=tier)
+            except SummarySaveError as e:
+                return jsonify({'error': str(e)}), 500
+    
+    response["qos_tier"] = tier
     
-    # Handle voice response only when explicitly needed
-    if request_data.get("voice_response", False) and response.get("needs_audio", True):
+    # Handle voice response only when explicitly needed, and when load allows it
+    if request_data.get("voice_response", False) and response.get("needs_audio", True) and tier_allows_tts(tier):
         try:
-            lang_code = "te" if language == "telugu" else "en"
+            # The summary may already be saved, so a rejection only drops the audio
+            admit("tts", session['user_id'])
+            lang_code = pack_for(language).tts_code
             response_text = response.get("current_question", {}).get("question", "") if is_follow_up else response.get("summary_sheet", "")
             if response_text:  # Only generate audio if we have text
-                audio_file = voice_handler.process_voice_output(response_text, lang_code)
+                audio_file, profile = speech_file(voice_handler, response_text, lang_code,
+                                                  request_data.get("audio_profile", "standard"))
                 if audio_file:
-                    return send_file(audio_file, mimetype="audio/mp3")
+                    # Content-Location lets the client replay it from the cacheable GET URL
+                    audio_response = send_file(audio_file, mimetype=OUTPUT_PROFILES[profile][1])
+                    audio_response.headers['Content-Location'] = audio_url(audio_file)
+                    return audio_response
+        except AdmissionRejected as e:
+            logging.warning(f"Voice response skipped: {e}")
         except Exception as e:
             logging.error(f"Error generating voice response: {str(e)}")
             # Continue with text response if voice fails
     
     return jsonify(response)
 
+@app.route('/chatbot/voice', methods=['POST'])
+def chatbot_voice():
+    """Initial symptoms as a binary recording: raw PCM body or multipart 'audio' file"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Your session has expired. Please log in again to continue.'}), 401
+    
+    if request.mimetype == 'multipart/form-data':
+        language = request.form.get("language", "english").lower()
+    else:
+        language = request.args.get("language", "english").lower()
+    tier = qos.select_tier()
+    try:
+        with span('chatbot.audio_read'):
+            audio_content = read_request_audio(request)
+    except UploadTooLarge:
+        return jsonify({"error": "Audio recording is too long."}), 413
+    if not audio_content:
+        return jsonify({"error": "Empty audio data. Please try recording again."}), 400
+    
+    try:
+        # Compressed uploads are decoded to 16 kHz PCM; raw PCM goes to recognition without a copy
+        audio = decode_audio(audio_content)
+    except UnsupportedAudio as e:
+        logging.error(f"Unsupported audio upload: {str(e)}")
+        return jsonify({"error": "Unsupported audio format", "accepted": accepted_formats()}), 415
+    except Exception as e:
+        logging.error(f"Error decoding voice input: {str(e)}")
+        return jsonify({"error": "Error processing voice input"}), 400
+    # Only a request with audio to recognize takes a speech-recognition token
+    admit("stt", session['user_id'])
+    try:
+        source_lang = pack_for(language).stt_code
+        symptoms = voice_handler.process_voice_input(audio, source_lang)
+    except Exception as e:
+        logging.error(f"Error processing voice input: {str(e)}")
+        return jsonify({"error": "Error processing voice input"}), 400
+    if not symptoms:
+        return jsonify({"error": "Could not understand the audio. Please try again."}), 400
+    
+    response = first_question_response(symptoms, language)
+    response["qos_tier"] = tier
+    return jsonify(response)
+
+@app.route('/chatbot/audio-formats')
+def get_audio_formats():
+    """Recording formats accepted by /chatbot/voice, the voice path of /chatbot and the Socket.IO channel"""
+    return jsonify({'formats': accepted_formats(), 'max_bytes': MAX_AUDIO_UPLOAD,
+                    'output_profiles': available_profiles()})
+
+@app.route('/chatbot/audio/<name>')
+def get_speech_audio(name):
+    """Cached synthesized speech; content-addressed, so it never changes once written"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Your session has expired. Please log in again to continue.'}), 401
+    cached = cached_audio(name)
+    if cached is None:
+        return jsonify({'error': 'Audio not found'}), 404
+    path, mimetype = cached
+    # conditional=True answers Range and If-None-Match requests
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True, max_age=31536000)
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/chatbot/stream', methods=['POST'])
+def chatbot_stream():
+    """Final consultation step as Server-Sent Events, one event per summary section"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Your session has expired. Please log in again to continue.'}), 401
+    
+    request_data = request.json
+    language = request_data.get("language", "english").lower()
+    original_symptoms = request_data.get("original_symptoms", "")
+    follow_up_answers = request_data.get("follow_up_answers", [])
+    if not original_symptoms:
+        return jsonify({"error": "Please provide symptoms"}), 400
+    
+    # Accept the last answer the same way /chatbot does
+    all_questions = request_data.get("all_questions", [])
+    current_question_index = request_data.get("current_question_index", 0)
+    current_answer = request_data.get("answer", "")
+    if current_answer and current_question_index < len(all_questions):
+        follow_up_answers.append({
+            "question": all_questions[current_question_index]["question"],
+            "answer": current_answer
+        })
+    
+    tier = qos.select_tier()
+    if needs_translation(language) and tier in ("full", "skip_tts"):
+        admit("translate", session['user_id'])
+    updates = iter_summary_updates(voice_handler, session['user_id'], original_symptoms, language,
+                                   follow_up_answers, tier)
+    events = (sse_event(event, data) for event, data in updates)
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/chatbot/jobs/<job_id>')
+def get_summary_job(job_id):
+    """Poll a summary job; pass ?wait=<seconds> to long-poll until it finishes"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Your session has expired. Please log in again to continue.'}), 401
+    
+    job = summary_jobs.get(job_id)
+    if job is None or job.owner != session['user_id']:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT)
+    except ValueError:
+        wait = 0
+    if wait > 0:
+        job.wait(wait)
+    return jsonify(job.to_dict())
+
+@app.route('/chatbot/consultation')
+def get_consultation_state():
+    """The user's unfinished Socket.IO consultation, readable from any worker"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Your session has expired. Please log in again to continue.'}), 401
+    
+    state = load_consultation_state(session['user_id'])
+    if state is None:
+        return jsonify({'error': 'No consultation in progress'}), 404
+    return jsonify(state)
+
 @app.route('/set_language', methods=['POST'])
 def set_language():
     language = request.form.get('language', 'english')
@@ -680,20 +363,23 @@ def set_language():
 @app.route('/get_greeting')
 def get_greeting():
     language = session.get('language', 'english')
-    greetings = {
-        'english': 'Hello! I am your healthcare assistant. How can I help you today?',
-        'telugu': 'శుభ సాయంత్రం! నేను మీ ఆరోగ్య సహాయకుడిని. ఈరోజు మీకు ఎలా సహాయపడగలను?'
-    }
-    greeting = greetings.get(language, greetings['english'])
+    greeting = pack_for(language).message('greeting')
     
-    # Convert greeting to speech if voice_handler is available
+    # Convert greeting to speech if voice_handler is available and load allows it
+    if not tier_allows_tts(qos.select_tier()):
+        return jsonify({'text': greeting, 'audio': None})
     try:
+        # The greeting is shown as text when speech is not admitted
+        admit("tts", session.get('user_id', request.remote_addr))
         if voice_handler:
-            audio_file = voice_handler.text_to_speech(greeting, language)
+            lang_code = pack_for(language).tts_code
+            audio_file, _ = speech_file(voice_handler, greeting, lang_code, request.args.get('profile', 'standard'))
             return jsonify({
                 'text': greeting,
-                'audio': audio_file
+                'audio': audio_url(audio_file) if audio_file else None
             })
+    except AdmissionRejected as e:
+        logging.warning(f"Greeting audio skipped: {e}")
     except Exception as e:
         logging.error(f"Error in text-to-speech conversion: {e}")
     
@@ -702,7 +388,7 @@ def get_greeting():
         'audio': None
     })
 
-def find_available_port(start_port=8001, max_attempts=3):
+def find_available_port(start_port=int(os.getenv('PORT', 8001)), max_attempts=3):
     """Find first available port starting from start_port"""
     import socket
     for port in range(start_port, start_port + max_attempts):
@@ -721,7 +407,8 @@ if __name__ == "__main__":
     log.setLevel(logging.INFO)
     
     # Get debug mode from environment variable
-    debug_mode = os.environ.get('FLASK_DEBUG', 'True').lower() not in ('0', 'false', 'no')
+    # Development server only; use `python -m prefork_server serve` in production
+    debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() not in ('0', 'false', 'no')
     app.debug = debug_mode
     
     # Find available port first
@@ -1,5 +1,5 @@
 import os
-from flask import Flask, request, jsonify, send_file, session, render_template, redirect, current_app
+from flask import Flask, request, jsonify, send_file, session, redirect, current_app
 import logging
 from dotenv import load_dotenv
 from voice_language_handler import VoiceLanguageHandler
@@ -10,7 +10,13 @@ import sqlite3
 from auth import auth_bp
 from websocket_handler import socketio
 from functools import lru_cache
-import re
+from request_tracing import init_tracing
+from static_pages import init_static_pages, page_response
+from fuzzy_matcher import match_symptoms
+from symptom_catalogue import current_catalogue
+from language_packs import pack_for
+from json_provider import init_json
+from http_compression import init_response_compression
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,62 +29,40 @@ app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
 app.config['SESSION_COOKIE_SECURE'] = True
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = 1800
+# Production settings; set at import so they also apply under the prefork server.
+# SEND_FILE_MAX_AGE_DEFAULT is the cache lifetime of fingerprinted /assets URLs
+app.config.update(
+    TEMPLATES_AUTO_RELOAD=False,
+    JSONIFY_PRETTYPRINT_REGULAR=False,
+    SEND_FILE_MAX_AGE_DEFAULT=3600
+)
 app.register_blueprint(auth_bp, url_prefix='/auth')
 
 # Initialize SocketIO with the Flask app
 socketio.init_app(app, cors_allowed_origins="*")
 
+# Per-stage timings: Server-Timing headers and the /metrics endpoint
+init_tracing(app)
+
+# Static pages are rendered and compressed once; /assets serves fingerprinted static files
+init_static_pages(app)
+
+# UTF-8 JSON (orjson when installed), gzip/brotli for larger JSON responses
+init_json(app)
+init_response_compression(app)
+
 @app.route('/')
 def index():
-    return render_template('home.html')
+    return page_response('home.html')
 
 @app.route('/chat')
 def chat():
     if 'user_id' not in session:
         return redirect('/auth/login')
-    return render_template('index.html')
-
-# Common symptoms database with follow-up questions
-common_symptoms = {
-    "fever": {
-        "causes": ["Viral infection", "Bacterial infection", "Inflammation", "COVID-19"],
-        "severity": "Moderate to High",
-        "urgency": "Seek immediate care if temperature exceeds 103°F (39.4°C)",
-        "follow_up": {
-            "english": [
-                "How long have you had the fever?",
-                "Is the fever continuous or intermittent?",
-                "Are you experiencing chills or sweating?"
-            ],
-            "telugu": [
-                "మీకు జ్వరం ఎంతకాలంగా ఉంది?",
-                "జ్వరం నిరంతరంగా ఉందా లేక మధ్య మధ్య వస్తుందా?",
-                "మీకు చలి లేక చెమటలు వస్తున్నాయా?"
-            ]
-        }
-    },
-    "headache": {
-        "causes": ["Tension", "Migraine", "Sinusitis", "Hypertension", "Dehydration"],
-        "severity": "Mild to Moderate",
-        "urgency": "Urgent if accompanied by confusion or stiff neck"
-    },
-    "cough": {
-        "causes": ["Upper respiratory infection", "Bronchitis", "Asthma", "COVID-19", "Allergies"],
-        "severity": "Mild to Severe",
-        "urgency": "Urgent if difficulty breathing or coughing blood"
-    },
-    # [Include all other symptoms from original file...]
-    # ... rest of the symptom dictionary ...
-}
+    return page_response('index.html')
 
-# Pre-compile symptom patterns
-SYMPTOM_PATTERNS = {re.compile(r'\b'+s+r'\b'): info for s, info in common_symptoms.items()}
-
-# [Rest of the existing code...]
-
-# Modify generate_summary() to use pre-compiled patterns with language support
+# Modify generate_summary() to use the catalogue's pre-compiled matchers with language support
 def generate_summary(symptoms, language="english", follow_up_answers=None, format_type="concise"):
-    symptoms_lower = symptoms.lower()
     identified_symptoms = {}
     follow_up_questions = []
     
@@ -104,28 +88,24 @@ def generate_summary(symptoms, language="english", follow_up_answers=None, forma
     logger.addHandler(console_handler)
     logger.addHandler(file_handler)
     
-    for pattern, info in SYMPTOM_PATTERNS.items():
-        match = pattern.search(symptoms_lower)
-        if match:
-            logging.info(f"Matched symptom: {pattern.pattern}")
-            identified_symptoms[pattern.pattern[2:-2]] = info
-            if "follow_up" in info:
-                logging.info(f"Found follow-up questions for: {pattern.pattern}")
-                follow_up_questions.extend(info["follow_up"][language][:2])
+    # The shared, hot-reloadable catalogue replaces this module's former partial copy
+    catalogue = current_catalogue()
+    for symptom, confidence, _ in match_symptoms(catalogue, symptoms):
+        info = catalogue.symptoms[symptom]
+        logging.info(f"Matched symptom: {symptom} (confidence {confidence})")
+        identified_symptoms[symptom] = info
+        if "follow_up" in info:
+            logging.info(f"Found follow-up questions for: {symptom}")
+            # Languages without catalogue questions are asked in English
+            follow_up_questions.extend(info["follow_up"].get(language, info["follow_up"]["english"])[:2])
     
-    # Add Telugu translations for responses
-    if language == "telugu":
-        response = {
-            "summary": "మీ లక్షణాల ఆధారంగా సారాంశం",
-            "advice": "వైద్య సలహా కోసం సంప్రదించండి",
-            "symptoms": identified_symptoms
-        }
-    else:
-        response = {
-            "summary": "Summary based on your symptoms",
-            "advice": "Consult a doctor for medical advice",
-            "symptoms": identified_symptoms
-        }
+    # Responses in the language's pack, English without one
+    pack = pack_for(language)
+    response = {
+        "summary": pack.message("summary_heading"),
+        "advice": pack.message("advice"),
+        "symptoms": identified_symptoms
+    }
     
     if follow_up_questions:
         logging.info(f"Generated follow-up questions: {follow_up_questions}")
@@ -149,7 +129,7 @@ def generate_summary(symptoms, language="english", follow_up_answers=None, forma
 def chatbot():
     # Check authentication first
     if 'user_id' not in session:
-        error_msg = 'మీ సెషన్ కాలముగిసింది. కొనసాగడానికి దయచేసి మళ్లీ లాగిన్ అవండి.' if session.get('language') == 'telugu' else 'Your session has expired. Please log in again to continue.'
+        error_msg = pack_for(session.get('language')).message('session_expired')
         return jsonify({'error': error_msg}), 401
         
     # Get input data
@@ -164,7 +144,7 @@ def chatbot():
             voice_handler = VoiceLanguageHandler(language)
             user_input = voice_handler.process_voice_input(request_data['voice_data'])
         except Exception as e:
-            error_msg = 'వాయిస్ ఇన్పుట్ ప్రాసెస్ చేయడంలో లోపం' if language == 'telugu' else 'Error processing voice input'
+            error_msg = pack_for(language).message('voice_error')
             return jsonify({'error': error_msg}), 400
 
     # Process input and generate response
@@ -220,12 +200,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     # Production-optimized configuration
-    app.config.update(
-        DEBUG=False,
-        TEMPLATES_AUTO_RELOAD=False,
-        JSONIFY_PRETTYPRINT_REGULAR=False,
-        SEND_FILE_MAX_AGE_DEFAULT=3600
-    )
+    app.config.update(DEBUG=False)
     
     # Run with appropriate settings
     try:
@@ -0,0 +1,246 @@
+"""
+Admission control for the remote voice and translation backends.
+
+Every call to speech-to-text, translation or text-to-speech must first be admitted.
+The request is checked against a token bucket for the user and a global bucket for
+that backend:
+
+- If the user's bucket is empty, the request is rejected with 429 and a Retry-After.
+- If the global bucket is empty, the request reserves a token and waits for it, up to
+  ADMISSION_MAX_WAIT seconds with at most ADMISSION_MAX_QUEUE waiters per backend.
+- If the wait would be longer or the queue is full, the request is rejected with 503.
+
+Buckets reserve tokens: taking from an empty bucket drives it negative, and the
+shortfall is the caller's wait. Waiters are therefore served in arrival order without a
+separate queue structure, and a rejected caller gives its reservation back.
+
+Limits are per process by default. Set ADMISSION_STORE=sqlite to keep the buckets in
+SQLite (ADMISSION_DB_PATH, by default the users database) so that they hold across
+workers. Admitted, waiting and rejected counts are exported on /metrics.
+
+Rates are requests per second and can be overridden per backend, e.g.
+ADMISSION_TTS_USER_RATE, ADMISSION_TTS_USER_BURST, ADMISSION_TTS_GLOBAL_RATE and
+ADMISSION_TTS_GLOBAL_BURST.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from request_tracing import register_metric, span
+
+# backend: (user rate, user burst, global rate, global burst)
+DEFAULT_LIMITS = {
+    "stt": (0.5, 3, 10.0, 20),
+    "translate": (2.0, 10, 20.0, 40),
+    "tts": (0.5, 5, 10.0, 20)
+}
+MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 2.0))
+MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 32))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a backend call is not admitted; status is 429 (user) or 503 (global)"""
+    def __init__(self, backend, scope, retry_after):
+        super().__init__(f"{backend} request rejected ({scope} limit)")
+        self.backend = backend
+        self.scope = scope
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.status = 429 if scope == "user" else 503
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def reserve(self, key, rate, burst, cost=1):
+        """Take cost tokens; returns the seconds until they are actually available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate) - cost
+            self._buckets[key] = (tokens, now)
+        return max(0.0, -tokens / rate)
+
+    def refund(self, key, rate, burst, cost=1):
+        with self._lock:
+            tokens, updated = self._buckets[key]
+            self._buckets[key] = (min(burst, tokens + cost), updated)
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite table shared by every worker process"""
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS admission_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connection(self):
+        # One connection per thread; never reuse one inherited across fork()
+        cached = getattr(self._local, 'conn', None)
+        if cached is None or cached[0] != os.getpid():
+            cached = self._local.conn = (os.getpid(), sqlite3.connect(self.path, timeout=5, isolation_level=None))
+        return cached[1]
+
+    def _update(self, key, burst, change):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM admission_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = change(tokens, now - updated)
+            conn.execute('INSERT OR REPLACE INTO admission_buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return tokens
+
+    def reserve(self, key, rate, burst, cost=1):
+        tokens = self._update(key, burst, lambda tokens, elapsed: min(burst, tokens + elapsed * rate) - cost)
+        return max(0.0, -tokens / rate)
+
+    def refund(self, key, rate, burst, cost=1):
+        self._update(key, burst, lambda tokens, elapsed: min(burst, tokens + elapsed * rate + cost))
+
+
+class BackendLimiter:
+    """Per-user and global admission for one backend"""
+    def __init__(self, name, store, user_rate, user_burst, global_rate, global_burst,
+                 max_wait=MAX_WAIT, max_queue=MAX_QUEUE):
+        self.name = name
+        self.store = store
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = {"user": 0, "global": 0, "queue": 0}
+
+    def _reject(self, scope, retry_after):
+        with self._lock:
+            self.rejected[scope] += 1
+        raise AdmissionRejected(self.name, "user" if scope == "user" else "global", retry_after)
+
+    def admit(self, user_key, cost=1):
+        """Block until the call may proceed, or raise AdmissionRejected"""
+        user_bucket = f"{self.name}:user:{user_key}"
+        global_bucket = f"{self.name}:global"
+
+        wait = self.store.reserve(user_bucket, self.user_rate, self.user_burst, cost)
+        if wait > 0:
+            self.store.refund(user_bucket, self.user_rate, self.user_burst, cost)
+            self._reject("user", wait)
+
+        wait = self.store.reserve(global_bucket, self.global_rate, self.global_burst, cost)
+        if wait > 0:
+            with self._lock:
+                queue_full = self.waiting >= self.max_queue
+                if not queue_full and wait <= self.max_wait:
+                    self.waiting += 1
+            if queue_full or wait > self.max_wait:
+                self.store.refund(global_bucket, self.global_rate, self.global_burst, cost)
+                self.store.refund(user_bucket, self.user_rate, self.user_burst, cost)
+                self._reject("queue" if queue_full else "global", wait)
+            try:
+                with span(f'admission.{self.name}_wait'):
+                    time.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+                    self.waited += 1
+
+        with self._lock:
+            self.admitted += 1
+
+
+def _limit(backend, field, default):
+    return type(default)(os.getenv(f'ADMISSION_{backend.upper()}_{field}', default))
+
+
+def create_store():
+    if os.getenv('ADMISSION_STORE', 'memory').lower() == 'sqlite':
+        from auth import DB_PATH
+        return SQLiteBucketStore(os.getenv('ADMISSION_DB_PATH', DB_PATH))
+    return MemoryBucketStore()
+
+
+def create_limiters(store):
+    return {
+        backend: BackendLimiter(
+            backend, store,
+            user_rate=_limit(backend, 'USER_RATE', user_rate),
+            user_burst=_limit(backend, 'USER_BURST', user_burst),
+            global_rate=_limit(backend, 'GLOBAL_RATE', global_rate),
+            global_burst=_limit(backend, 'GLOBAL_BURST', global_burst)
+        )
+        for backend, (user_rate, user_burst, global_rate, global_burst) in DEFAULT_LIMITS.items()
+    }
+
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_CONTROL', '1').lower() not in ('0', 'false', 'no')
+limiters = create_limiters(create_store())
+
+
+def admit(backend, user_key, cost=1):
+    """Admit one call to backend ('stt', 'translate' or 'tts') for user_key"""
+    if ADMISSION_ENABLED:
+        limiters[backend].admit(user_key, cost)
+
+
+def queue_utilization():
+    """Fullest admission wait queue, as a fraction of ADMISSION_MAX_QUEUE"""
+    return max(limiter.waiting / limiter.max_queue for limiter in limiters.values())
+
+
+def rejection_response(error):
+    """(body, status, headers) for an AdmissionRejected error"""
+    if error.status == 429:
+        message = 'You are sending requests too quickly. Please wait a moment and try again.'
+    else:
+        message = 'The server is busy. Please try again shortly.'
+    return {'error': message, 'retry_after': error.retry_after}, error.status, {'Retry-After': str(error.retry_after)}
+
+
+def register_admission_metrics():
+    register_metric("chatbot_admission_waiting", "gauge", "Backend calls waiting for admission.",
+                    lambda: [({"backend": name}, limiter.waiting) for name, limiter in limiters.items()])
+    register_metric("chatbot_admission_admitted_total", "counter", "Backend calls admitted.",
+                    lambda: [({"backend": name}, limiter.admitted) for name, limiter in limiters.items()])
+    register_metric("chatbot_admission_waited_total", "counter", "Backend calls admitted after waiting.",
+                    lambda: [({"backend": name}, limiter.waited) for name, limiter in limiters.items()])
+    register_metric("chatbot_admission_rejected_total", "counter", "Backend calls rejected by admission control.",
+                    lambda: [({"backend": name, "reason": reason}, count)
+                             for name, limiter in limiters.items() for reason, count in limiter.rejected.items()])
+
+
+def init_admission_control(app):
+    """Answer AdmissionRejected with 429/503 and Retry-After, and export the counters"""
+    from flask import jsonify
+
+    @app.errorhandler(AdmissionRejected)
+    def _admission_rejected(error):
+        body, status, headers = rejection_response(error)
+        return jsonify(body), status, headers
+
+    register_admission_metrics()
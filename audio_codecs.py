@@ -0,0 +1,185 @@
+"""
+Compressed audio uploads for voice input.
+
+Browsers can send a recording as Opus in WebM or Ogg (what MediaRecorder produces), as
+MP3, or as WAV, instead of raw 16-bit 44.1 kHz PCM. Opus at 24 kbit/s is about 180 KB
+per minute, against roughly 5 MB for the raw PCM. The format is sniffed from the first
+bytes and the declared content type is ignored. The recording is decoded to what
+recognition needs, 16 kHz mono 16-bit PCM:
+- WAV that is already 16 kHz mono 16-bit is used as it is. Other WAV goes through
+  ffmpeg when it is installed, or else is converted in-process: the sample width by
+  byte slicing, the channels and a lower rate by averaging the input samples around
+  each output sample (through prefix sums), and a higher rate by linear interpolation.
+- WebM, Ogg and MP3 go through a local ffmpeg subprocess, if ffmpeg is installed
+  (FFMPEG_BINARY).
+
+A body that matches none of these is treated as legacy raw 44.1 kHz PCM, so existing
+clients keep working. GET /chatbot/audio-formats lists what this server accepts.
+"""
+import io
+import operator
+import os
+import shutil
+import subprocess
+import sys
+import wave
+from array import array
+from itertools import accumulate
+
+import speech_recognition as sr
+
+from request_tracing import span
+
+TARGET_RATE = 16000
+TARGET_WIDTH = 2
+# Raw PCM sent by clients that predate format sniffing
+LEGACY_PCM_RATE = 44100
+FFMPEG = shutil.which(os.getenv('FFMPEG_BINARY', 'ffmpeg'))
+DECODE_TIMEOUT = float(os.getenv('AUDIO_DECODE_TIMEOUT', 20))
+# 8-bit WAV is unsigned; flipping the top bit gives the high byte of the signed sample
+UNSIGNED_TO_SIGNED = bytes(value ^ 0x80 for value in range(256))
+# Output samples resampled at a time, which bounds the running sums kept in memory
+RESAMPLE_BLOCK = 4096
+
+# format: (mimetypes, needs ffmpeg)
+FORMATS = {
+    "wav": (("audio/wav", "audio/x-wav"), False),
+    "webm": (("audio/webm;codecs=opus", "audio/webm"), True),
+    "ogg": (("audio/ogg;codecs=opus", "audio/ogg"), True),
+    "mp3": (("audio/mpeg",), True),
+    "pcm": (("audio/L16;rate=44100", "application/octet-stream"), False)
+}
+
+
+class UnsupportedAudio(Exception):
+    """Raised when an upload cannot be decoded"""
+
+
+def sniff_format(data):
+    """Container format from the leading bytes: wav, webm, ogg, mp3 or pcm"""
+    head = bytes(data[:12])
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return "wav"
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return "webm"
+    if head[:4] == b'OggS':
+        return "ogg"
+    # ID3 tag, or an MPEG layer III frame header with a valid bitrate and sample rate
+    if head[:3] == b'ID3' or (len(head) > 2 and head[0] == 0xFF and (head[1] & 0xE6) == 0xE2
+                               and (head[2] & 0xF0) != 0xF0 and (head[2] & 0x0C) != 0x0C):
+        return "mp3"
+    return "pcm"
+
+
+def accepted_formats():
+    """Formats this server can decode, for the client to pick its recorder settings"""
+    return [
+        {"format": name, "mimetypes": list(mimetypes)}
+        for name, (mimetypes, needs_ffmpeg) in FORMATS.items()
+        if FFMPEG or not needs_ffmpeg
+    ]
+
+
+def to_16bit(frames, width):
+    """Little-endian PCM of 1 to 4 bytes per sample as 16-bit, keeping each sample's top bytes"""
+    if width == 2:
+        return frames
+    out = bytearray(len(frames) // width * 2)
+    if width == 1:
+        out[1::2] = frames.translate(UNSIGNED_TO_SIGNED)
+    else:
+        out[0::2] = frames[width - 2::width]
+        out[1::2] = frames[width - 1::width]
+    return bytes(out)
+
+
+def to_mono_16k(frames, channels, rate):
+    """Mono or stereo 16-bit PCM of any rate as 16 kHz mono"""
+    samples = array('h', frames)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    count = len(samples) // channels
+    total = count * TARGET_RATE // rate
+    step = rate / TARGET_RATE
+    mono = array('h')
+    for block in range(0, total, RESAMPLE_BLOCK):
+        positions = range(block, min(block + RESAMPLE_BLOCK, total))
+        # Frames low to high cover what this block's output samples are made from
+        low = max(0, int((block - 1) * step))
+        high = min(count, int((positions[-1] + 1) * step) + 2)
+        if channels == 1:
+            frame_sums = list(samples[low:high])
+        else:
+            frame_sums = list(map(operator.add, samples[2 * low:2 * high:2], samples[2 * low + 1:2 * high:2]))
+        if step > 1:
+            # Downsampling: the mean over a window one output sample wide centered on it,
+            # which also filters out what the lower rate cannot carry. Frame i covers
+            # [i, i + 1), so its center is at i + 0.5. Windows are summed through running
+            # sums, with the frames at either end counted in part.
+            running = list(accumulate(frame_sums, initial=0))
+            frame_sums.append(0)
+            for position in positions:
+                start = max(0.0, position * step + 0.5 - step / 2) - low
+                end = min(count, position * step + 0.5 + step / 2) - low
+                first, last = int(start), int(end)
+                window = (running[last] + (end - last) * frame_sums[last]
+                          - running[first] - (start - first) * frame_sums[first])
+                mono.append(round(window / ((end - start) * channels)))
+        else:
+            # Upsampling: linear interpolation between the nearest two frames
+            frame_sums.append(frame_sums[-1])
+            for position in positions:
+                at = position * step - low
+                first = int(at)
+                fraction = at - first
+                mono.append(round((frame_sums[first] * (1 - fraction) + frame_sums[first + 1] * fraction) / channels))
+    if sys.byteorder == 'big':
+        mono.byteswap()
+    return mono.tobytes()
+
+
+def decode_wav(data):
+    """Mono or stereo WAV of any rate and sample width to 16 kHz mono 16-bit PCM"""
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as reader:
+            channels = reader.getnchannels()
+            width = reader.getsampwidth()
+            rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudio(f"Invalid WAV data: {e}")
+    if channels > 2:
+        raise UnsupportedAudio(f"WAV with {channels} channels is not supported")
+    if (channels, width, rate) == (1, TARGET_WIDTH, TARGET_RATE):
+        return frames
+    if FFMPEG:
+        return decode_with_ffmpeg(data)
+    return to_mono_16k(to_16bit(frames, width), channels, rate)
+
+
+def decode_with_ffmpeg(data):
+    """Any container/codec ffmpeg understands to 16 kHz mono 16-bit PCM"""
+    if not FFMPEG:
+        raise UnsupportedAudio("Compressed audio needs ffmpeg, which is not installed")
+    try:
+        result = subprocess.run(
+            [FFMPEG, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+             '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(TARGET_RATE), 'pipe:1'],
+            input=data, capture_output=True, timeout=DECODE_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise UnsupportedAudio("Decoding the audio took too long")
+    if result.returncode != 0 or not result.stdout:
+        raise UnsupportedAudio(f"Could not decode audio: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def decode_audio(data):
+    """sr.AudioData for an uploaded recording in any accepted format"""
+    audio_format = sniff_format(data)
+    if audio_format == "pcm":
+        # Legacy raw PCM is passed through without a copy
+        return sr.AudioData(data, sample_rate=LEGACY_PCM_RATE, sample_width=2)
+    with span(f'audio.decode_{audio_format}'):
+        frames = decode_wav(data) if audio_format == "wav" else decode_with_ffmpeg(data)
+    return sr.AudioData(frames, sample_rate=TARGET_RATE, sample_width=TARGET_WIDTH)
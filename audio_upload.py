@@ -0,0 +1,71 @@
+"""
+Binary audio uploads for voice input.
+
+POST /chatbot/voice takes the recording (16-bit, 44.1 kHz PCM) in one of two forms:
+- as the raw request body (application/octet-stream or audio/L16), or
+- as the "audio" file of a multipart form.
+
+The body is read straight into one bytearray sized from Content-Length, and that
+buffer goes to speech recognition as is. There is no base64 decoding and no
+intermediate copy. Uploads over MAX_AUDIO_UPLOAD bytes get 413 before any of the
+body is read. The raw body form is the cheaper of the two: werkzeug's multipart parser
+buffers the file once more before it reaches us.
+"""
+import os
+
+MAX_AUDIO_UPLOAD = int(os.getenv('AUDIO_UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+# Read size when the client does not send Content-Length
+READ_CHUNK = 64 * 1024
+# Allowance for multipart boundaries and headers on top of the audio itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an audio upload is over the size limit"""
+
+
+def read_into_buffer(stream, length=None, limit=MAX_AUDIO_UPLOAD):
+    """Read stream into a single bytearray, preallocated when the length is known"""
+    if length is not None:
+        if length > limit:
+            raise UploadTooLarge(f"Audio upload of {length} bytes exceeds {limit}")
+        buffer = bytearray(length)
+        view = memoryview(buffer)
+        filled = 0
+        while filled < length:
+            count = stream.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        view.release()
+        # A short read means the client went away; trim in place rather than copy
+        del buffer[filled:]
+        return buffer
+
+    # Unknown length (chunked transfer): grow one buffer up to the limit
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            return buffer
+        if len(buffer) + len(chunk) > limit:
+            raise UploadTooLarge(f"Audio upload exceeds {limit} bytes")
+        buffer += chunk
+
+
+def read_request_audio(req, limit=MAX_AUDIO_UPLOAD):
+    """Audio bytes of a raw-body or multipart upload; None if no audio was sent"""
+    if req.content_length is not None and req.content_length > limit + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f"Request of {req.content_length} bytes exceeds {limit}")
+
+    if req.mimetype == 'multipart/form-data':
+        upload = req.files.get('audio')
+        if upload is None:
+            return None
+        stream = upload.stream
+        stream.seek(0, os.SEEK_END)
+        length = stream.tell()
+        stream.seek(0)
+        return read_into_buffer(stream, length, limit)
+
+    return read_into_buffer(req.stream, req.content_length, limit)
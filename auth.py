@@ -1,15 +1,19 @@
-from flask import Blueprint, request, jsonify, session, render_template
+from flask import Blueprint, request, jsonify, session, redirect
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import sqlite3
 import os
+from request_tracing import span
+from static_pages import page_response
 
 auth_bp = Blueprint('auth', __name__)
 
+# Location of the SQLite database (overridable so benchmarks can use a scratch copy)
+DB_PATH = os.getenv('USERS_DB_PATH', os.path.join(os.path.dirname(__file__), 'users.db'))
+
 # Initialize SQLite database
 def init_db():
-    db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
     # Create users table
@@ -42,17 +46,17 @@ init_db()
 
 @auth_bp.route('/signup', methods=['GET'])
 def signup_page():
-    return render_template('signup.html')
+    return page_response('signup.html')
 
 @auth_bp.route('/login', methods=['GET'])
 def login_page():
-    return render_template('login.html')
+    return page_response('login.html')
 
 @auth_bp.route('/profile')
 def profile_page():
     if 'user_id' not in session:
         return redirect('/auth/login')
-    return render_template('profile.html')
+    return page_response('profile.html')
 
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
@@ -64,8 +68,7 @@ def signup():
         return jsonify({'error': 'Username and password are required'}), 400
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
         # Check if username already exists
@@ -74,7 +77,8 @@ def signup():
             return jsonify({'error': 'Username already exists'}), 400
         
         # Hash password and store user
-        password_hash = generate_password_hash(password)
+        with span('auth.password_hash'):
+            password_hash = generate_password_hash(password)
         c.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)',
                   (username, password_hash))
         conn.commit()
@@ -96,19 +100,21 @@ def login():
         return jsonify({'error': 'Username and password are required'}), 400
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
         # Get user from database
-        c.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
-        user = c.fetchone()
+        with span('auth.db_query'):
+            c.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
+            user = c.fetchone()
         
         if user is None:
             return jsonify({'error': 'Invalid username or password'}), 401
         
         # Verify password
-        if not check_password_hash(user[1], password):
+        with span('auth.password_check'):
+            password_ok = check_password_hash(user[1], password)
+        if not password_ok:
             return jsonify({'error': 'Invalid username or password'}), 401
         
         # Set session
@@ -144,8 +150,7 @@ def update_profile():
         return jsonify({'error': 'No changes provided'}), 400
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
         if new_username:
@@ -162,7 +167,8 @@ def update_profile():
         
         if new_password:
             # Update password
-            password_hash = generate_password_hash(new_password)
+            with span('auth.password_hash'):
+                password_hash = generate_password_hash(new_password)
             c.execute('UPDATE users SET password_hash = ? WHERE id = ?',
                       (password_hash, session['user_id']))
         
@@ -180,8 +186,7 @@ def get_profile_data():
         return jsonify({'error': 'Authentication required'}), 401
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
         # Get user data
@@ -189,12 +194,13 @@ def get_profile_data():
         user = c.fetchone()
         
         # Get summaries
-        c.execute('SELECT symptoms, summary, created_at FROM summary_sheets WHERE user_id = ? ORDER BY created_at DESC', (session['user_id'],))
-        summaries = [{
-            'symptoms': row[0],
-            'summary': row[1],
-            'date': row[2]
-        } for row in c.fetchall()]
+        with span('auth.db_query'):
+            c.execute('SELECT symptoms, summary, created_at FROM summary_sheets WHERE user_id = ? ORDER BY created_at DESC', (session['user_id'],))
+            summaries = [{
+                'symptoms': row[0],
+                'summary': row[1],
+                'date': row[2]
+            } for row in c.fetchall()]
         
         return jsonify({
             'username': user[0] if user else '',
@@ -219,12 +225,12 @@ def update_password():
         return jsonify({'error': 'New password is required'}), 400
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
         # Update password with proper hashing
-        password_hash = generate_password_hash(new_password)
+        with span('auth.password_hash'):
+            password_hash = generate_password_hash(new_password)
         c.execute('UPDATE users SET password_hash = ? WHERE id = ?',
                   (password_hash, session['user_id']))
         conn.commit()
@@ -248,13 +254,13 @@ def save_summary():
         return jsonify({'error': 'Symptoms and summary are required'}), 400
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
-        c.execute('INSERT INTO summary_sheets (user_id, symptoms, summary) VALUES (?, ?, ?)',
-                  (session['user_id'], symptoms, summary))
-        conn.commit()
+        with span('auth.db_insert'):
+            c.execute('INSERT INTO summary_sheets (user_id, symptoms, summary) VALUES (?, ?, ?)',
+                      (session['user_id'], symptoms, summary))
+            conn.commit()
         
         return jsonify({'message': 'Summary saved successfully'}), 201
     
@@ -269,22 +275,22 @@ def get_summary_history():
         return jsonify({'error': 'Authentication required'}), 401
     
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
         
-        c.execute('''
-            SELECT symptoms, summary, created_at 
-            FROM summary_sheets 
-            WHERE user_id = ? 
-            ORDER BY created_at DESC
-        ''', (session['user_id'],))
-        
-        summaries = [{
-            'symptoms': row[0],
-            'summary': row[1],
-            'created_at': row[2]
-        } for row in c.fetchall()]
+        with span('auth.db_query'):
+            c.execute('''
+                SELECT symptoms, summary, created_at 
+                FROM summary_sheets 
+                WHERE user_id = ? 
+                ORDER BY created_at DESC
+            ''', (session['user_id'],))
+            
+            summaries = [{
+                'symptoms': row[0],
+                'summary': row[1],
+                'created_at': row[2]
+            } for row in c.fetchall()]
         
         return jsonify({'summaries': summaries}), 200
     
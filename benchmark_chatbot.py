@@ -0,0 +1,1027 @@
+"""
+Performance benchmark suite for the chatbot pipeline.
+
+Drives generate_summary, ask_follow_up, the full /chatbot multi-turn flow (through
+Flask's test client), the Socket.IO consultation channel and its scaling across worker
+processes, binary vs base64 audio uploads, compressed audio decoding, the static pages,
+JSON encoding and compression, catalogue reloads and snapshots, fuzzy matching and
+normalization, localized summaries and language packs, batch triage of intake files,
+the auth routes and the translation/TTS paths against the local stub backends. Reports
+p50/p95/p99 latency, throughput and peak allocation per operation, and can save results
+to JSON and compare them against a previous run:
+
+    python benchmark_chatbot.py --output bench.json
+    python benchmark_chatbot.py --compare bench.json --tolerance 0.15
+"""
+import argparse
+import base64
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# Keep benchmark users out of the real database; must be set before importing auth
+os.environ.setdefault('USERS_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='chatbot-bench-'), 'users.db'))
+
+SAMPLE_SYMPTOMS = [
+    "I have a fever and headache",
+    "I'm feeling nausea and fatigue",
+    "Severe chest pain and shortness of breath since this morning",
+    "dry cough, sore throat and a mild rash on my arm",
+    "my back pain is getting worse and my knee joint pain too",
+    "I feel dizziness and anxiety when standing up"
+]
+SAMPLE_ANSWERS = [
+    "Since 3 days",
+    "About 7 out of 10",
+    "It gets worse at night",
+    "I have taken paracetamol",
+    "No other symptoms",
+    "Yes, I cannot work"
+]
+BENCH_PASSWORD = "bench-password"
+# Socket.IO connections each worker holds open in the scaling suite
+SCALING_CONNECTIONS = int(os.getenv('BENCH_SCALING_CONNECTIONS', 200))
+# Seconds between consultations completed by one connected user, for connections per core
+CONSULTATION_INTERVAL = float(os.getenv('BENCH_CONSULTATION_INTERVAL', 60.0))
+
+# Metrics compared between runs; higher values are regressions
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "alloc_peak_kb")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def measure(func, iterations, warmup=3, alloc_iterations=None):
+    """Time func over iterations and measure its peak allocation in a separate pass"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - op_start)
+    elapsed = time.perf_counter() - started
+
+    # tracemalloc slows everything down, so allocations are measured on their own
+    alloc_iterations = alloc_iterations or max(1, min(iterations, 20))
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return dict(latency_metrics(timings, elapsed), alloc_peak_kb=round(sum(peaks) / len(peaks) / 1024, 2))
+
+
+def latency_metrics(timings, elapsed):
+    """Mean and p50/p95/p99 ms of timings in seconds, and throughput over elapsed seconds"""
+    timings = sorted(timings)
+    return {
+        "iterations": len(timings),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 4) if timings else 0.0,
+        "p50_ms": round(percentile(timings, 50) * 1000, 4),
+        "p95_ms": round(percentile(timings, 95) * 1000, 4),
+        "p99_ms": round(percentile(timings, 99) * 1000, 4),
+        "throughput_ops": round(len(timings) / elapsed, 2) if elapsed else 0.0
+    }
+
+
+def cycle(values):
+    """Endless iterator over values, used to vary benchmark inputs"""
+    while True:
+        for value in values:
+            yield value
+
+
+def login_client(app, username):
+    """Return a test client with an authenticated session for username"""
+    client = app.test_client()
+    client.post('/auth/signup', json={'username': username, 'password': BENCH_PASSWORD})
+    response = client.post('/auth/login', json={'username': username, 'password': BENCH_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"Benchmark login failed: {response.get_json()}")
+    return client
+
+
+def run_consultation(client, symptoms, language="english", audio=None, traffic=None):
+    """
+    Drive one full /chatbot consultation: initial symptoms (or base64 audio), every
+    follow-up, summary. If traffic is a [messages, bytes] list, adds the exchange to it.
+    """
+    def post(payload):
+        response = client.post('/chatbot', json=payload)
+        if traffic is not None:
+            traffic[0] += 2
+            traffic[1] += (len(json.dumps(payload).encode('utf-8')) + len(response.get_data())
+                           + sum(len(key) + len(value) + 4 for key, value in response.headers.items()))
+        return response.get_json()
+
+    payload = {"input_type": "text", "language": language, "symptoms": symptoms}
+    if audio:
+        payload.update({"input_type": "voice", "audio": audio})
+    data = post(payload)
+    answers = cycle(SAMPLE_ANSWERS)
+    follow_up_answers = []
+    while data.get("is_follow_up"):
+        data = post({
+            "input_type": "text",
+            "language": language,
+            "is_follow_up": True,
+            "current_question_index": data["current_question_index"],
+            "all_questions": data["all_questions"],
+            "original_symptoms": data["original_symptoms"],
+            "follow_up_answers": follow_up_answers,
+            "answer": next(answers)
+        })
+        follow_up_answers = data.get("follow_up_answers", follow_up_answers)
+    if "summary_sheet" not in data:
+        raise RuntimeError(f"Consultation did not produce a summary: {data}")
+    return data
+
+
+def socketio_wire_size(event, data):
+    """Encoded size of one Socket.IO event, including binary attachments"""
+    from socketio import packet
+    from websocket_handler import NAMESPACE
+
+    encoded = packet.Packet(packet.EVENT, data=[event, data], namespace=NAMESPACE).encode()
+    parts = encoded if isinstance(encoded, list) else [encoded]
+    return sum(len(part.encode('utf-8') if isinstance(part, str) else part) for part in parts)
+
+
+def run_socket_consultation(client, symptoms, language="english", audio=None, traffic=None):
+    """Drive one consultation over the Socket.IO channel with a connected test client"""
+    from websocket_handler import NAMESPACE
+
+    def send(event, data):
+        if traffic is not None:
+            traffic[0] += 1
+            traffic[1] += socketio_wire_size(event, data)
+        client.emit(event, data, namespace=NAMESPACE)
+
+    def receive():
+        events = client.get_received(NAMESPACE)
+        for event in events:
+            if traffic is not None:
+                traffic[0] += 1
+                traffic[1] += socketio_wire_size(event['name'], event['args'][0] if event['args'] else None)
+            if event['name'] == 'audio':
+                client.emit('audio_ack', {"seq": event['args'][0]["seq"]}, namespace=NAMESPACE)
+        return events
+
+    start = {"language": language, "symptoms": symptoms}
+    if audio:
+        start = {"language": language, "audio": audio}
+    send('start', start)
+    answers = cycle(SAMPLE_ANSWERS)
+    while True:
+        events = {event['name']: event['args'] for event in receive()}
+        if 'summary' in events:
+            return events['summary'][0]
+        if 'question' not in events:
+            raise RuntimeError(f"Consultation channel did not reply with a question: {events}")
+        send('answer', {"answer": next(answers)})
+
+
+def bench_pipeline(iterations):
+    """Benchmark the local triage functions"""
+    from triage_engine import generate_summary, ask_follow_up
+
+    symptoms = cycle(SAMPLE_SYMPTOMS)
+    answers = [{"question": "How long have you had these symptoms?", "answer": "for 2 weeks"},
+               {"question": "On a scale of 1-10, how severe is your pain?", "answer": "8"}]
+    return {
+        "generate_summary": measure(lambda: generate_summary(next(symptoms)), iterations),
+        "generate_summary_follow_up": measure(lambda: generate_summary(next(symptoms), "english", answers), iterations),
+        "ask_follow_up": measure(lambda: ask_follow_up(next(symptoms)), iterations),
+        "ask_follow_up_telugu": measure(lambda: ask_follow_up(next(symptoms), "telugu"), iterations)
+    }
+
+
+def bench_chatbot_flow(iterations):
+    """Benchmark complete multi-turn consultations through the Flask test client"""
+    from Ai_Healthcare_Chatbot import app
+
+    client = login_client(app, "bench-flow")
+    symptoms = cycle(SAMPLE_SYMPTOMS)
+    return {
+        "chatbot_flow_english": measure(lambda: run_consultation(client, next(symptoms)), iterations),
+        # Telugu summaries go through chunked translation, which sleeps between chunks
+        "chatbot_flow_telugu": measure(lambda: run_consultation(client, next(symptoms), "telugu"),
+                                       max(1, iterations // 20), warmup=1, alloc_iterations=2)
+    }
+
+
+def bench_transport(iterations):
+    """Compare one consultation over JSON POSTs with the same one over the Socket.IO channel"""
+    from Ai_Healthcare_Chatbot import app
+    from websocket_handler import socketio, NAMESPACE
+    from load_generator import synthetic_recording
+
+    recording = synthetic_recording()
+    http_client = login_client(app, "bench-transport")
+    socket_client = socketio.test_client(app, namespace=NAMESPACE, flask_test_client=http_client)
+    if not socket_client.is_connected(NAMESPACE):
+        raise RuntimeError("Benchmark client could not connect to the consultation channel")
+
+    flows = {
+        "http_consultation_text": lambda symptoms, traffic: run_consultation(
+            http_client, symptoms, traffic=traffic),
+        "http_consultation_voice": lambda symptoms, traffic: run_consultation(
+            http_client, symptoms, audio=recording, traffic=traffic),
+        "socketio_consultation_text": lambda symptoms, traffic: run_socket_consultation(
+            socket_client, symptoms, traffic=traffic),
+        "socketio_consultation_voice": lambda symptoms, traffic: run_socket_consultation(
+            socket_client, symptoms, audio=base64.b64decode(recording), traffic=traffic)
+    }
+    results = {}
+    for name, flow in flows.items():
+        symptoms = cycle(SAMPLE_SYMPTOMS)
+        metrics = measure(lambda: flow(next(symptoms), None), iterations)
+        # Count messages and bytes over one pass through the sample symptoms
+        traffic = [0, 0]
+        for sample in SAMPLE_SYMPTOMS:
+            flow(sample, traffic)
+        metrics["messages_per_consultation"] = round(traffic[0] / len(SAMPLE_SYMPTOMS), 1)
+        metrics["bytes_per_consultation"] = round(traffic[1] / len(SAMPLE_SYMPTOMS))
+        metrics["messages_per_second"] = round(metrics["throughput_ops"] * metrics["messages_per_consultation"], 1)
+        results[name] = metrics
+    socket_client.disconnect(NAMESPACE)
+    return results
+
+
+def scaling_worker(connections, consultations, results):
+    """Hold connections open and run consultations over them; runs in a spawned process"""
+    from stub_backends import install_stub_backends
+    from prefork_server import memory_usage
+    from Ai_Healthcare_Chatbot import app
+    from websocket_handler import socketio, NAMESPACE
+
+    with install_stub_backends():
+        http_client = login_client(app, f"bench-scale-{os.getpid()}")
+        before = memory_usage(os.getpid()).get('rss', 0)
+        clients = [socketio.test_client(app, namespace=NAMESPACE, flask_test_client=http_client)
+                   for _ in range(connections)]
+        rss_per_connection = (memory_usage(os.getpid()).get('rss', 0) - before) / connections
+
+        symptoms = cycle(SAMPLE_SYMPTOMS)
+        traffic = [0, 0]
+        timings = []
+        cpu_start = time.process_time()
+        started = time.perf_counter()
+        for number in range(consultations):
+            op_start = time.perf_counter()
+            run_socket_consultation(clients[number % connections], next(symptoms), traffic=traffic)
+            timings.append(time.perf_counter() - op_start)
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_start
+
+        for client in clients:
+            client.disconnect(NAMESPACE)
+    results.put({"timings": timings, "messages": traffic[0], "cpu_seconds": cpu, "elapsed_seconds": elapsed,
+                 "rss_per_connection_kb": rss_per_connection})
+
+
+def fanout_worker(broker_url, workers, events, start, results):
+    """Publish events through the broker and count every worker's events arriving"""
+    from message_broker import LocalBrokerManager
+
+    manager = LocalBrokerManager(broker_url)
+    listener = manager._listen()
+    payload = b'x' * 256
+    expected = workers * events
+    received = 0
+
+    # The first receive connects the subscriber; the parent starts publishing once all are in
+    def consume():
+        nonlocal received
+        for _ in listener:
+            received += 1
+            if received == expected:
+                return
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    start.wait()
+    started = time.perf_counter()
+    for _ in range(events):
+        manager._publish({'method': 'emit', 'event': 'bench', 'data': payload, 'namespace': '/',
+                          'room': None, 'skip_sid': None, 'callback': None, 'host_id': 'bench'})
+    consumer.join(60)
+    results.put({"received": received, "elapsed_seconds": time.perf_counter() - started})
+
+
+def run_in_workers(target, workers, *args, before_start=None):
+    """Run target(*args, results) in spawned worker processes and return what each puts"""
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    processes = [ctx.Process(target=target, args=args + (results,)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    if before_start is not None:
+        before_start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def bench_socketio_scaling(iterations):
+    """
+    Connections per core of the Socket.IO channel. One spawned worker per core holds
+    SCALING_CONNECTIONS connections and runs iterations consultations over them. Then
+    every worker publishes iterations * 10 events through the local message broker and
+    receives everyone else's. Connections per core is estimated from the CPU time of one
+    consultation and one consultation per CONSULTATION_INTERVAL seconds per connection.
+    """
+    from message_broker import LocalBroker
+
+    workers = os.cpu_count() or 1
+    reports = run_in_workers(scaling_worker, workers, SCALING_CONNECTIONS, iterations)
+    elapsed = max(report["elapsed_seconds"] for report in reports)
+    metrics = latency_metrics([timing for report in reports for timing in report["timings"]], elapsed)
+    cpu_per_consultation = sum(report["cpu_seconds"] for report in reports) / max(1, metrics["iterations"])
+    metrics.update({
+        "connections": workers * SCALING_CONNECTIONS,
+        "messages_per_second": round(sum(report["messages"] for report in reports) / elapsed, 1) if elapsed else 0.0,
+        "cpu_ms_per_consultation": round(cpu_per_consultation * 1000, 3),
+        "rss_kb_per_connection": round(sum(report["rss_per_connection_kb"] for report in reports) / workers, 1),
+        "connections_per_core": int(CONSULTATION_INTERVAL / cpu_per_consultation) if cpu_per_consultation else 0
+    })
+
+    events = iterations * 10
+    path = os.path.join(tempfile.mkdtemp(prefix='chatbot-broker-'), 'broker.sock')
+    broker = LocalBroker(path).start()
+    start = multiprocessing.get_context('spawn').Event()
+
+    def release():
+        deadline = time.time() + 30
+        while broker.subscriber_count() < workers and time.time() < deadline:
+            time.sleep(0.05)
+        start.set()
+
+    try:
+        fanout = run_in_workers(fanout_worker, workers, f"local://{path}", workers, events, start,
+                                before_start=release)
+    finally:
+        broker.stop()
+    delivered = sum(report["received"] for report in fanout)
+    elapsed = max(report["elapsed_seconds"] for report in fanout)
+    # Time per event delivered to each worker
+    fanout_metrics = latency_metrics([report["elapsed_seconds"] / max(1, report["received"]) for report in fanout],
+                                     elapsed)
+    fanout_metrics.update({"throughput_ops": round(delivered / elapsed, 2) if elapsed else 0.0,
+                           "published": workers * events, "delivered": delivered})
+    return {"socketio_scaling": metrics, "socketio_broker_fanout": fanout_metrics}
+
+
+def bench_audio_upload(iterations):
+    """Peak allocation per request for a 30-second clip: base64 JSON vs binary uploads"""
+    from Ai_Healthcare_Chatbot import app
+    from load_generator import synthetic_recording
+
+    recording = synthetic_recording(seconds=30)
+    raw = base64.b64decode(recording)
+    client = login_client(app, "bench-upload")
+
+    def post(**kwargs):
+        response = client.post(**kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"Audio upload failed with {response.status_code}: {response.get_json()}")
+
+    uploads = {
+        "voice_upload_base64_json": lambda: post(path='/chatbot', json={
+            "language": "english", "input_type": "voice", "audio": recording}),
+        "voice_upload_raw": lambda: post(path='/chatbot/voice?language=english', data=raw,
+                                         content_type='application/octet-stream'),
+        "voice_upload_multipart": lambda: post(path='/chatbot/voice', content_type='multipart/form-data',
+                                               data={"language": "english", "audio": (io.BytesIO(raw), "clip.pcm")})
+    }
+    # A 30-second clip makes every request expensive, so fewer iterations
+    upload_iterations = max(1, iterations // 10)
+    results = {}
+    for name, upload in uploads.items():
+        results[name] = measure(upload, upload_iterations, warmup=1, alloc_iterations=5)
+        results[name]["upload_bytes"] = len(recording) if name == "voice_upload_base64_json" else len(raw)
+    return results
+
+
+def encode_clip(pcm, audio_format, sample_rate=44100):
+    """Encode raw 16-bit mono PCM as a WAV file, or with ffmpeg as Opus/WebM, Opus/Ogg or MP3"""
+    import subprocess
+    import wave
+    from audio_codecs import FFMPEG
+
+    if audio_format == "wav":
+        out = io.BytesIO()
+        with wave.open(out, 'wb') as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(sample_rate)
+            writer.writeframes(pcm)
+        return out.getvalue()
+    codec = {"webm": ['-c:a', 'libopus', '-b:a', '24k', '-f', 'webm'],
+             "ogg": ['-c:a', 'libopus', '-b:a', '24k', '-f', 'ogg'],
+             "mp3": ['-c:a', 'libmp3lame', '-b:a', '32k', '-f', 'mp3']}[audio_format]
+    result = subprocess.run([FFMPEG, '-hide_banner', '-loglevel', 'error', '-f', 's16le', '-ar', str(sample_rate),
+                             '-ac', '1', '-i', 'pipe:0', *codec, 'pipe:1'], input=pcm, capture_output=True, check=True)
+    return result.stdout
+
+
+def bench_codecs(iterations):
+    """Upload size and decode throughput of a 30-second clip in each accepted format"""
+    import math
+    import struct
+    from audio_codecs import accepted_formats, decode_audio
+
+    # A tone rather than noise, so the lossy codecs compress it like speech rather than worst case
+    seconds = 30
+    pcm = b''.join(struct.pack('<h', int(6000 * math.sin(2 * math.pi * 220 * i / 44100)))
+                   for i in range(44100 * seconds))
+    results = {}
+    for entry in accepted_formats():
+        audio_format = entry["format"]
+        clip = pcm if audio_format == "pcm" else encode_clip(pcm, audio_format)
+        metrics = measure(lambda: decode_audio(clip), max(1, iterations // 10), warmup=1, alloc_iterations=3)
+        metrics["upload_bytes"] = len(clip)
+        metrics["audio_seconds_decoded_per_second"] = round(metrics["throughput_ops"] * seconds, 1)
+        results[f"decode_{audio_format}"] = metrics
+    return results
+
+
+def bench_pages(iterations):
+    """Time to serve the HTML pages and bytes on the wire, uncompressed, compressed and revalidated"""
+    from Ai_Healthcare_Chatbot import app
+
+    client = app.test_client()
+    results = {}
+    for page, path in (("home", '/'), ("login", '/auth/login'), ("signup", '/auth/signup')):
+        first = client.get(path, headers={'Accept-Encoding': 'br, gzip'})
+        if first.status_code != 200:
+            raise RuntimeError(f"{path} returned {first.status_code}, not a page")
+        etag = first.headers.get('ETag')
+        if etag is None:
+            raise RuntimeError(f"{path} was not pre-rendered: it has no ETag")
+        requests = {
+            "identity": {},
+            "compressed": {'Accept-Encoding': 'br, gzip'},
+            "revalidated": {'Accept-Encoding': 'br, gzip', 'If-None-Match': etag or ''}
+        }
+        for variant, headers in requests.items():
+            metrics = measure(lambda: client.get(path, headers=headers), iterations)
+            response = client.get(path, headers=headers)
+            expected = 304 if variant == "revalidated" else 200
+            if response.status_code != expected:
+                raise RuntimeError(f"{path} ({variant}) returned {response.status_code}, not {expected}")
+            metrics["response_bytes"] = len(response.get_data())
+            metrics["status"] = response.status_code
+            results[f"page_{page}_{variant}"] = metrics
+    return results
+
+
+def json_payloads():
+    """Representative API responses: a Telugu first question, a Telugu summary, a long profile"""
+    from triage_engine import ask_follow_up, generate_summary
+    from stub_backends import fake_translation
+
+    questions = ask_follow_up(SAMPLE_SYMPTOMS[0], "telugu")
+    summary = fake_translation(generate_summary(SAMPLE_SYMPTOMS[2], "telugu"))
+    return {
+        "question": {"is_follow_up": True, "current_question_index": 0, "total_questions": len(questions),
+                     "current_question": questions[0], "all_questions": questions,
+                     "original_symptoms": SAMPLE_SYMPTOMS[0], "animation_delay": 500},
+        "summary": {"is_follow_up": False, "summary_sheet": summary, "needs_audio": False,
+                    "translation_status": "complete", "qos_tier": "full"},
+        "profile": {"username": "bench", "summary_count": 50, "last_consultation": "2024-01-01 10:00:00",
+                    "summaries": [{"symptoms": symptom, "summary": summary, "date": "2024-01-01 10:00:00"}
+                                  for symptom in SAMPLE_SYMPTOMS * 8 + SAMPLE_SYMPTOMS[:2]]}
+    }
+
+
+def bench_json(iterations):
+    """Bytes and encode time per response type: Flask's default encoding vs the UTF-8 providers"""
+    from Ai_Healthcare_Chatbot import app
+    from http_compression import ENCODINGS, DYNAMIC_LEVELS, compress
+    from json_provider import orjson, CompactJSONProvider, OrjsonProvider
+
+    # What jsonify produced before: ASCII escapes, sorted keys, compact separators
+    encoders = {"flask_default": lambda obj: json.dumps(obj, ensure_ascii=True, sort_keys=True,
+                                                        separators=(",", ":")).encode('utf-8'),
+                "compact_utf8": lambda obj: CompactJSONProvider(app).dumps(obj).encode('utf-8')}
+    if orjson:
+        provider = OrjsonProvider(app)
+        encoders["orjson"] = lambda obj: orjson.dumps(obj, default=provider.default, option=provider.options)
+
+    results = {}
+    for kind, payload in json_payloads().items():
+        for name, encode in encoders.items():
+            metrics = measure(lambda: encode(payload), iterations)
+            metrics["response_bytes"] = len(encode(payload))
+            results[f"json_{kind}_{name}"] = metrics
+        # Compression on top of the fastest encoder
+        body = encoders["orjson" if orjson else "compact_utf8"](payload)
+        for coding in ENCODINGS:
+            metrics = measure(lambda: compress(body, coding, DYNAMIC_LEVELS[coding]), iterations)
+            metrics["response_bytes"] = len(compress(body, coding, DYNAMIC_LEVELS[coding]))
+            results[f"json_{kind}_{coding}"] = metrics
+    return results
+
+
+def synthetic_catalogue(size):
+    """The shipped catalogue grown to size symptoms by cloning entries under new names"""
+    from symptom_catalogue import CATALOGUE_PATH
+
+    with open(CATALOGUE_PATH, encoding='utf-8') as fp:
+        data = json.load(fp)
+    base = list(data["symptoms"].items())
+    symptoms = dict(base)
+    for i in range(size - len(base)):
+        name, info = base[i % len(base)]
+        symptoms[f"{name} variant{i}"] = info
+    data["symptoms"] = symptoms
+    return data
+
+
+def bench_catalogue(iterations):
+    """Time to load, validate and compile the symptom catalogue at increasing sizes"""
+    from symptom_catalogue import load_catalogue
+
+    results = {}
+    directory = tempfile.mkdtemp(prefix='chatbot-catalogue-')
+    for size in (20, 1000, 10000):
+        path = os.path.join(directory, f"catalogue_{size}.json")
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump(synthetic_catalogue(size), fp, ensure_ascii=False)
+        reload_iterations = max(1, iterations // (10 if size < 10000 else 50))
+        metrics = measure(lambda: load_catalogue(path), reload_iterations, warmup=1, alloc_iterations=2)
+        metrics["file_bytes"] = os.path.getsize(path)
+        results[f"catalogue_reload_{size}"] = metrics
+    return results
+
+
+def worker_memory(load, workers=4):
+    """Mean extra RSS/PSS in KB of forked workers that each run load(), over an idle worker"""
+    from prefork_server import memory_usage
+
+    def fork(job):
+        ready_read, ready_write = os.pipe()
+        exit_read, exit_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            os.close(exit_write)
+            try:
+                job()
+                os.write(ready_write, b'1')
+                os.read(exit_read, 1)
+            finally:
+                os._exit(0)
+        os.close(ready_write)
+        os.close(exit_read)
+        return pid, ready_read, exit_write
+
+    children = [fork(lambda: None)] + [fork(load) for _ in range(workers)]
+    try:
+        for _, ready, _ in children:
+            os.read(ready, 1)
+        usage = [memory_usage(pid) for pid, _, _ in children]
+    finally:
+        # Later children inherited the earlier pipes, so close them all before waiting
+        for pid, ready, release in children:
+            os.close(ready)
+            os.close(release)
+        for pid, _, _ in children:
+            os.waitpid(pid, 0)
+    idle, loaded = usage[0], usage[1:]
+    if not idle:
+        return {}
+    return {f"worker_{key}_kb": round(sum(worker[key] for worker in loaded) / workers - idle[key])
+            for key in ('rss', 'pss')}
+
+
+def bench_snapshot(iterations):
+    """Load time, lookup time and per-worker memory of the JSON catalogue vs its mmap snapshot"""
+    from catalogue_snapshot import SnapshotCatalogue, build_snapshot
+    from symptom_catalogue import load_catalogue
+
+    text = "I have had a fever and chest pain with a painful cough since yesterday"
+    results = {}
+    directory = tempfile.mkdtemp(prefix='chatbot-snapshot-')
+    for size in (20, 1000, 10000):
+        path = os.path.join(directory, f"catalogue_{size}.json")
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump(synthetic_catalogue(size), fp, ensure_ascii=False)
+        snapshot_path = build_snapshot(path)
+        loaders = {"json": lambda: load_catalogue(path), "snapshot": lambda: SnapshotCatalogue(snapshot_path)}
+
+        for name, load in loaders.items():
+            load_iterations = max(1, iterations // (10 if size < 10000 else 50)) if name == "json" else iterations
+            metrics = measure(load, load_iterations, warmup=1, alloc_iterations=2)
+            metrics["file_bytes"] = os.path.getsize(path if name == "json" else snapshot_path)
+
+            def load_and_touch(load=load):
+                catalogue = load()
+                # Read every entry, so the snapshot's pages are mapped in as well
+                for symptom in catalogue.symptoms:
+                    catalogue.symptoms[symptom]
+            metrics.update(worker_memory(load_and_touch))
+            results[f"catalogue_{name}_load_{size}"] = metrics
+
+            catalogue = load()
+            results[f"catalogue_{name}_lookup_{size}"] = measure(
+                lambda: [catalogue.symptoms[symptom] for symptom in catalogue.identify_symptoms(text)]
+                + list(catalogue.get_question_plan(text, "telugu")), iterations)
+    return results
+
+
+def synthetic_terms(size, seed=0):
+    """The catalogue's symptom names plus generated one- and two-word terms, size in total"""
+    import random
+    from symptom_catalogue import common_symptoms
+
+    rng = random.Random(seed)
+    syllables = ["ba", "ce", "di", "fo", "gu", "ha", "ke", "li", "mo", "nu", "pa", "re", "si", "to", "vu", "za",
+                 "ther", "gia", "tion", "os", "al", "itis", "emia", "algia"]
+    terms = dict.fromkeys(common_symptoms)
+    while len(terms) < size:
+        words = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(rng.choice((1, 1, 2)))]
+        terms[" ".join(words)] = None
+    return list(terms)
+
+
+def bench_fuzzy(iterations):
+    """Fuzzy matcher build and lookup latency as the catalogue grows, against a linear scan"""
+    from fuzzy_matcher import FuzzyMatcher, allowed_distance, edit_distance
+
+    texts = {
+        "exact": "I have had a fever and chest pain since yesterday",
+        "misspelled": "I have had a feaver and shortnes of breth since yesterday",
+        "compound": "my head ache and chestpain are getting worse"
+    }
+    results = {}
+    for size in (20, 10000, 50000):
+        terms = synthetic_terms(size)
+        results[f"fuzzy_build_{size}"] = measure(lambda: FuzzyMatcher(terms), max(1, iterations // 50), warmup=0,
+                                                 alloc_iterations=1)
+        matcher = FuzzyMatcher(terms)
+
+        for name, text in texts.items():
+            def match(text=text):
+                # Cold lookups; repeated words are otherwise answered from the cache
+                matcher.lookup.cache_clear()
+                return matcher.match(text)
+            results[f"fuzzy_{name}_{size}"] = measure(match, iterations)
+
+        vocabulary = list(matcher.vocabulary)
+
+        def linear_scan(words=("feaver", "shortnes", "breth")):
+            return [[candidate for candidate in vocabulary
+                     if edit_distance(word, candidate, allowed_distance(len(word))) <= allowed_distance(len(word))]
+                    for word in words]
+        results[f"fuzzy_linear_scan_{size}"] = measure(linear_scan, max(1, iterations // 20), warmup=1)
+    return results
+
+
+def bench_normalizer(iterations):
+    """Symptom normalization throughput in tokens per second, alone and within the full matcher"""
+    from evaluate_chatbot import generate_corpus
+    from fuzzy_matcher import match_symptoms
+    from symptom_catalogue import current_catalogue
+    from text_normalizer import SymptomNormalizer, tokenize
+
+    path = os.path.join(tempfile.mkdtemp(prefix='chatbot-normalizer-'), 'corpus.jsonl')
+    generate_corpus(path, 200, variant_rate=0.5)
+    with open(path, encoding='utf-8') as fp:
+        texts = [json.loads(line)["input_text"] for line in fp]
+    telugu_path = os.path.join(os.path.dirname(path), 'telugu.jsonl')
+    generate_corpus(telugu_path, 200, telugu_rate=1.0)
+    with open(telugu_path, encoding='utf-8') as fp:
+        telugu_texts = [json.loads(line)["input_text"] for line in fp]
+
+    catalogue = current_catalogue()
+    results = {"normalizer_build": measure(lambda: SymptomNormalizer(catalogue), max(1, iterations // 10))}
+    normalizer = SymptomNormalizer(catalogue)
+    operations = {
+        "normalizer_lemmas": lambda: [normalizer.normalize(text) for text in texts],
+        "normalizer_match": lambda: [normalizer.match(text) for text in texts],
+        "exact_match": lambda: [catalogue.identify_symptoms(text) for text in texts],
+        "full_match": lambda: [match_symptoms(catalogue, text) for text in texts],
+        "telugu_normalizer_match": lambda: [normalizer.match(text) for text in telugu_texts],
+        "telugu_full_match": lambda: [match_symptoms(catalogue, text) for text in telugu_texts]
+    }
+    for name, operation in operations.items():
+        metrics = measure(operation, max(1, iterations // 10), alloc_iterations=2)
+        token_count = sum(len(tokenize(text)) for text in (telugu_texts if name.startswith("telugu") else texts))
+        metrics["tokens"] = token_count
+        metrics["tokens_per_second"] = round(token_count / (metrics["mean_ms"] / 1000))
+        results[name] = metrics
+    return results
+
+
+def bench_localization(iterations):
+    """Final Telugu summary: rendered from the Telugu locale vs the English summary translated as a whole"""
+    from consultation import native_summary, translate_summary
+    from language_packs import get_pack
+    from triage_engine import generate_summary
+    from voice_language_handler import VoiceLanguageHandler
+
+    handler = VoiceLanguageHandler()
+    telugu = get_pack("telugu")
+    symptoms = cycle(SAMPLE_SYMPTOMS)
+    answers = [{"question": "How long have you had these symptoms?", "answer": "for 2 weeks"},
+               {"question": "On a scale of 1-10, how severe is your pain?", "answer": "8"}]
+
+    def uncached(render):
+        # Every consultation has its own wording, so don't let the translation cache answer
+        def run():
+            handler._translation_cache.clear()
+            render()
+        return run
+
+    return {
+        "summary_english": measure(lambda: generate_summary(next(symptoms), "english", answers), iterations),
+        "summary_telugu_locale": measure(lambda: generate_summary(next(symptoms), "telugu", answers), iterations),
+        # Only the symptom text and the answers are translated
+        "summary_telugu_native": measure(uncached(lambda: native_summary(handler, next(symptoms), answers, "full", telugu)),
+                                         iterations),
+        # Long texts are chunked with a fixed delay per chunk
+        "summary_telugu_translated": measure(
+            uncached(lambda: translate_summary(handler, generate_summary(next(symptoms), "english", answers), telugu)),
+            max(1, iterations // 50), warmup=1, alloc_iterations=1)
+    }
+
+
+def bench_language_packs(iterations):
+    """Startup and first-use cost of the language packs with 2, 100 and 1,000 packs installed"""
+    import shutil
+    from language_packs import PACKS_DIR, PackRegistry
+
+    results = {}
+    for count in (2, 100, 1000):
+        directory = tempfile.mkdtemp(prefix='chatbot-packs-')
+        shutil.copy(os.path.join(PACKS_DIR, 'english.json'), directory)
+        # Copies of the Telugu pack stand in for the other languages
+        for number in range(count - 1):
+            shutil.copy(os.path.join(PACKS_DIR, 'telugu.json'), os.path.join(directory, f'language{number:04d}.json'))
+
+        def first_use():
+            registry = PackRegistry(directory)
+            registry.get('language0000')
+
+        def load_all():
+            registry = PackRegistry(directory)
+            for language in registry.installed_languages():
+                registry.get(language)
+
+        results[f"packs_{count}_startup"] = measure(lambda: PackRegistry(directory).installed_languages(), iterations)
+        results[f"packs_{count}_first_use"] = measure(first_use, iterations)
+        # What loading every installed pack up front would cost
+        results[f"packs_{count}_load_all"] = measure(load_all, max(1, iterations * 2 // count), warmup=1,
+                                                     alloc_iterations=1)
+        # An unknown voice code on a fresh registry: builds the code index, loads no pack
+        results[f"packs_{count}_code_index"] = measure(lambda: PackRegistry(directory).language_for_code('xx'),
+                                                       max(1, iterations * 2 // count), warmup=1, alloc_iterations=1)
+        shutil.rmtree(directory)
+    return results
+
+
+def bench_batch_triage(iterations):
+    """Records/s and peak allocation of batch triage over 2,000 and 20,000 record intake files"""
+    from evaluate_chatbot import generate_corpus
+    from triage_batch import run_batch
+
+    results = {}
+    directory = tempfile.mkdtemp(prefix='chatbot-batch-')
+    output = os.path.join(directory, 'results.jsonl')
+    workers = os.cpu_count() or 1
+    for count in (2000, 20000):
+        intake = os.path.join(directory, f'intake_{count}.jsonl')
+        generate_corpus(intake, count, telugu_rate=0.1)
+        runs = {"inline": dict(workers=1), "pool": dict(workers=max(2, workers)),
+                "pool_unordered": dict(workers=max(2, workers), ordered=False)}
+        for name, options in runs.items():
+            # Allocation of the inline run shows whether memory grows with the file
+            metrics = measure(lambda: run_batch(intake, output, restart=True, **options),
+                              max(1, iterations // (50 if count < 20000 else 500)), warmup=0, alloc_iterations=1)
+            metrics["records_per_second"] = round(count / (metrics["mean_ms"] / 1000), 1)
+            results[f"batch_{count}_{name}"] = metrics
+    return results
+
+
+def bench_auth(iterations):
+    """Benchmark the auth blueprint routes"""
+    from Ai_Healthcare_Chatbot import app
+
+    client = login_client(app, "bench-auth")
+    counter = iter(range(sys.maxsize))
+
+    def signup():
+        client.post('/auth/signup', json={'username': f"bench-user-{os.getpid()}-{next(counter)}",
+                                          'password': BENCH_PASSWORD})
+
+    def login():
+        client.post('/auth/login', json={'username': 'bench-auth', 'password': BENCH_PASSWORD})
+
+    def save_summary():
+        client.post('/auth/summary/save', json={'symptoms': SAMPLE_SYMPTOMS[0], 'summary': 'Benchmark summary'})
+
+    # Password hashing dominates signup/login, so they get fewer iterations
+    hashed_iterations = max(1, iterations // 10)
+    return {
+        "auth_signup": measure(signup, hashed_iterations, warmup=1, alloc_iterations=3),
+        "auth_login": measure(login, hashed_iterations, warmup=1, alloc_iterations=3),
+        "auth_check": measure(lambda: client.get('/auth/check-auth'), iterations),
+        "auth_summary_save": measure(save_summary, iterations),
+        "auth_profile_data": measure(lambda: client.get('/auth/profile/data'), iterations)
+    }
+
+
+def bench_voice(iterations):
+    """Benchmark translation and text-to-speech against the stub backends"""
+    from voice_language_handler import VoiceLanguageHandler
+    from triage_engine import generate_summary
+    from tts_cache import speech_file
+
+    handler = VoiceLanguageHandler()
+    short_text = "Drink plenty of fluids and rest."
+    long_text = generate_summary(SAMPLE_SYMPTOMS[2])
+
+    def tts():
+        handler.cleanup_temp_file(handler.process_voice_output(short_text, 'en'))
+
+    return {
+        "translate_short": measure(lambda: handler.translate_text(short_text, 'te'), iterations),
+        # Long texts are chunked with a fixed delay per chunk
+        "translate_long": measure(lambda: handler.translate_text(long_text, 'te'),
+                                  max(1, iterations // 50), warmup=1, alloc_iterations=1),
+        "tts_short": measure(tts, iterations),
+        # Replays are served from the speech cache without synthesizing again
+        "tts_cached_replay": measure(lambda: speech_file(handler, short_text, 'en'), iterations)
+    }
+
+
+SUITES = {
+    "pipeline": bench_pipeline,
+    "chatbot": bench_chatbot_flow,
+    "transport": bench_transport,
+    "socketio_scaling": bench_socketio_scaling,
+    "upload": bench_audio_upload,
+    "codecs": bench_codecs,
+    "pages": bench_pages,
+    "json": bench_json,
+    "catalogue": bench_catalogue,
+    "snapshot": bench_snapshot,
+    "fuzzy": bench_fuzzy,
+    "normalizer": bench_normalizer,
+    "localization": bench_localization,
+    "language_packs": bench_language_packs,
+    "batch": bench_batch_triage,
+    "auth": bench_auth,
+    "voice": bench_voice
+}
+
+
+def run_benchmarks(suites, iterations):
+    from stub_backends import install_stub_backends
+
+    # Repeated voice/translation calls from one benchmark user would otherwise be rate limited
+    os.environ.setdefault('ADMISSION_CONTROL', '0')
+
+    results = {}
+    with install_stub_backends():
+        for name in suites:
+            print(f"Running {name} benchmarks...", file=sys.stderr)
+            results.update(SUITES[name](iterations))
+    return {
+        "metadata": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "suites": list(suites)
+        },
+        "results": results
+    }
+
+
+def compare_results(baseline, current, tolerance):
+    """Return (operation, metric, old, new) for every metric that regressed beyond tolerance"""
+    regressions = []
+    for operation, metrics in current["results"].items():
+        previous = baseline.get("results", {}).get(operation)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), metrics.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append((operation, metric, old, new))
+    return regressions
+
+
+def print_results(report):
+    print(f"\n{'Operation':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'alloc KB':>11}")
+    for operation, metrics in report["results"].items():
+        print(f"{operation:<30}{metrics['p50_ms']:>10.3f}{metrics['p95_ms']:>10.3f}{metrics['p99_ms']:>10.3f}"
+              f"{metrics['throughput_ops']:>12.1f}{metrics.get('alloc_peak_kb', 0.0):>11.1f}")
+
+    traffic = {operation: metrics for operation, metrics in report["results"].items()
+               if "bytes_per_consultation" in metrics}
+    if traffic:
+        print(f"\n{'Transport':<30}{'msgs/consult':>14}{'bytes/consult':>15}{'msgs/s':>12}")
+        for operation, metrics in traffic.items():
+            print(f"{operation:<30}{metrics['messages_per_consultation']:>14}"
+                  f"{metrics['bytes_per_consultation']:>15}{metrics['messages_per_second']:>12.1f}")
+
+    scaling = {operation: metrics for operation, metrics in report["results"].items()
+               if "connections_per_core" in metrics}
+    if scaling:
+        print(f"\n{'Connections':<30}{'open':>8}{'CPU ms/consult':>16}{'RSS KB/conn':>13}{'conns/core':>12}")
+        for operation, metrics in scaling.items():
+            print(f"{operation:<30}{metrics['connections']:>8}{metrics['cpu_ms_per_consultation']:>16}"
+                  f"{metrics['rss_kb_per_connection']:>13}{metrics['connections_per_core']:>12}")
+
+    pages = {operation: metrics for operation, metrics in report["results"].items() if "response_bytes" in metrics}
+    if pages:
+        print(f"\n{'Response':<30}{'status':>8}{'bytes':>10}{'p50 ms':>10}")
+        for operation, metrics in pages.items():
+            print(f"{operation:<30}{metrics.get('status', 200):>8}{metrics['response_bytes']:>10}"
+                  f"{metrics['p50_ms']:>10.3f}")
+
+    uploads = {operation: metrics for operation, metrics in report["results"].items() if "upload_bytes" in metrics}
+    if uploads:
+        print(f"\n{'Upload':<30}{'body KB':>10}{'peak KB':>10}{'peak/body':>11}")
+        for operation, metrics in uploads.items():
+            body_kb = metrics['upload_bytes'] / 1024
+            print(f"{operation:<30}{body_kb:>10.1f}{metrics['alloc_peak_kb']:>10.1f}"
+                  f"{metrics['alloc_peak_kb'] / body_kb:>11.2f}")
+
+    throughput = {operation: metrics for operation, metrics in report["results"].items() if "tokens_per_second" in metrics}
+    if throughput:
+        print(f"\n{'Text processing':<30}{'tokens':>10}{'tokens/s':>12}")
+        for operation, metrics in throughput.items():
+            print(f"{operation:<30}{metrics['tokens']:>10}{metrics['tokens_per_second']:>12}")
+
+    workers = {operation: metrics for operation, metrics in report["results"].items() if "worker_rss_kb" in metrics}
+    if workers:
+        print(f"\n{'Per worker':<30}{'file KB':>10}{'load ms':>10}{'RSS KB':>10}{'PSS KB':>10}")
+        for operation, metrics in workers.items():
+            print(f"{operation:<30}{metrics['file_bytes'] / 1024:>10.1f}{metrics['p50_ms']:>10.3f}"
+                  f"{metrics['worker_rss_kb']:>10}{metrics['worker_pss_kb']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the healthcare chatbot pipeline")
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help='Benchmark suite to run (repeatable, default: all)')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Timed iterations per operation')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Fail if results regress against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed relative slowdown before a metric counts as a regression')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.suite or list(SUITES), args.iterations)
+    print_results(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fp:
+            baseline = json.load(fp)
+        regressions = compare_results(baseline, report, args.tolerance)
+        if regressions:
+            print("\n=== Performance regressions ===")
+            for operation, metric, old, new in regressions:
+                print(f"{operation} {metric}: {old} -> {new}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
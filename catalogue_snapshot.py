@@ -0,0 +1,401 @@
+"""
+Compact binary snapshot of the compiled symptom catalogue.
+
+Building a Catalogue parses the JSON file and builds the matchers and question plans.
+Every worker does this at startup, and each holds its own copy of the dicts. A
+snapshot stores the compiled catalogue once: a string table (offsets plus a UTF-8
+blob) and flat uint32 arrays for the symptoms, follow-up groups, questions, keywords
+and precomputed plans. SnapshotCatalogue memory-maps the file read-only. Loading only
+reads the header, and lookups decode just the entries they touch. Symptom and keyword
+lookups binary-search name-sorted indexes. The mapped pages come from the page cache,
+so every worker shares one physical copy.
+
+    python catalogue_snapshot.py build            # data/symptom_catalogue.snapshot
+    python catalogue_snapshot.py info
+
+The snapshot records a SHA-256 of the JSON file it was built from. symptom_catalogue
+only uses a snapshot that matches the current file. After the JSON is edited, it falls
+back to the JSON until the snapshot is rebuilt.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+
+from symptom_catalogue import (CATALOGUE_PATH, GENERAL_GROUP, MIN_PLAN_QUESTIONS, PLAN_LANGUAGES, QUESTION_ANIMATIONS,
+                               QUESTION_IMAGE, TIMING_GROUP, WORD_PATTERN, FollowUpQuestion, load_catalogue)
+
+MAGIC = b'SYMSNAP1'
+FORMAT_VERSION = 2
+NONE = 0xFFFFFFFF
+# magic, format version, byte order, catalogue version, longest symptom in words,
+# timing group, general group, empty plan, source SHA-256
+HEADER = struct.Struct('<8sHHIIIII32s')
+SECTIONS = ("string_offsets", "strings", "lists", "symptoms", "symptom_index", "groups", "questions",
+            "keywords", "keyword_index")
+# uint32 fields per row
+SYMPTOM_FIELDS = 9   # name, severity, urgency, causes, specific recs, general recs, group, plan, synonyms
+GROUP_FIELDS = 4     # name, english questions, telugu questions, question ids
+QUESTION_FIELDS = 3  # english, telugu, animation
+KEYWORD_FIELDS = 3   # word, group, plan
+BYTE_ORDER = 0 if sys.byteorder == 'little' else 1
+
+
+def snapshot_path_for(catalogue_path):
+    return os.path.splitext(catalogue_path)[0] + '.snapshot'
+
+
+def file_digest(path):
+    with open(path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).digest()
+
+
+class _Writer:
+    """String interning and the shared list pool used while building"""
+    def __init__(self):
+        self.strings = {}
+        self.lists = array('I')
+
+    def string(self, value):
+        return self.strings.setdefault(value, len(self.strings))
+
+    def list(self, items):
+        """Store a list of uint32 as [length, *items] in the pool; returns its offset"""
+        offset = len(self.lists)
+        self.lists.append(len(items))
+        self.lists.extend(items)
+        return offset
+
+    def string_list(self, values):
+        return self.list([self.string(value) for value in values])
+
+
+def build_snapshot(catalogue_path=CATALOGUE_PATH, output_path=None):
+    """Compile the catalogue file and write its snapshot; returns the output path"""
+    output_path = output_path or snapshot_path_for(catalogue_path)
+    digest = file_digest(catalogue_path)
+    catalogue = load_catalogue(catalogue_path)
+    writer = _Writer()
+
+    question_ids = {english: position for position, english in enumerate(catalogue.question_table)}
+    questions = array('I')
+    for english, translations in catalogue.question_table.items():
+        questions.extend((writer.string(translations["english"].question), writer.string(translations["telugu"].question),
+                          QUESTION_ANIMATIONS.index(translations["english"].animation)))
+
+    def plan_ids(plan):
+        return writer.list([question_ids[question.question] for question in plan])
+
+    group_ids = {}
+    groups = array('I')
+    for name, group in catalogue.groups.items():
+        group_ids[id(group)] = len(group_ids)
+        groups.extend((writer.string(name), writer.string_list(group["english"]), writer.string_list(group["telugu"]),
+                       writer.list([question_ids[english] for english in group["english"]])))
+
+    symptoms = array('I')
+    for name, info in catalogue.symptoms.items():
+        plan = catalogue.question_plans.get(((name,), "english"))
+        symptoms.extend((
+            writer.string(name), writer.string(info["severity"]), writer.string(info["urgency"]),
+            writer.string_list(info["causes"]),
+            writer.string_list(info["specific_recommendations"]) if "specific_recommendations" in info else NONE,
+            writer.string_list(info["general_recommendations"]) if "general_recommendations" in info else NONE,
+            group_ids[id(info["follow_up"])] if "follow_up" in info else NONE,
+            plan_ids(plan) if plan is not None else NONE,
+            # [language, synonym list, language, synonym list, ...]
+            writer.list([number for language, terms in info["synonyms"].items()
+                         for number in (writer.string(language), writer.string_list(terms))])
+            if "synonyms" in info else NONE
+        ))
+
+    keywords = array('I')
+    for keyword, group in catalogue.follow_up_keywords.items():
+        keywords.extend((writer.string(keyword), group_ids[id(group)],
+                         plan_ids(catalogue.question_plans[((keyword,), "english")])))
+
+    # Name-sorted indexes; sorted by UTF-8 bytes, the order lookups compare in
+    names = list(catalogue.symptoms)
+    symptom_index = array('I', sorted(range(len(names)), key=lambda i: names[i].encode('utf-8')))
+    words = list(catalogue.follow_up_keywords)
+    keyword_index = array('I', sorted(range(len(words)), key=lambda i: words[i].encode('utf-8')))
+
+    offsets = array('I', [0])
+    blob = bytearray()
+    for value in writer.strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    blob += b'\0' * (-len(blob) % 4)
+
+    empty_plan = plan_ids(catalogue.question_plans[((), "english")])
+    sections = [offsets.tobytes(), bytes(blob), writer.lists.tobytes(), symptoms.tobytes(), symptom_index.tobytes(),
+                groups.tobytes(), questions.tobytes(), keywords.tobytes(), keyword_index.tobytes()]
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, catalogue.version,
+                         max(name.count(' ') + 1 for name in names),
+                         group_ids[id(catalogue.groups[TIMING_GROUP])], group_ids[id(catalogue.groups[GENERAL_GROUP])],
+                         empty_plan, digest)
+    table = array('I')
+    position = HEADER.size + 8 * len(SECTIONS)
+    for section in sections:
+        table.extend((position, len(section)))
+        position += len(section)
+
+    temporary = f"{output_path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as fp:
+        fp.write(header)
+        fp.write(table.tobytes())
+        for section in sections:
+            fp.write(section)
+    # Workers that already mapped the old file keep it; new loads see the new one
+    os.replace(temporary, output_path)
+    return output_path
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a usable snapshot"""
+
+
+class _SymptomTable(Mapping):
+    """Read-only name -> entry mapping over the snapshot, decoding entries on access"""
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __len__(self):
+        return len(self._snapshot._symptoms) // SYMPTOM_FIELDS
+
+    def __iter__(self):
+        snapshot = self._snapshot
+        for row in range(len(self)):
+            yield snapshot._string(snapshot._symptoms[row * SYMPTOM_FIELDS])
+
+    def __getitem__(self, name):
+        row = self._snapshot._find_symptom(name)
+        if row is None:
+            raise KeyError(name)
+        return self._snapshot._symptom_entry(row)
+
+
+class SnapshotCatalogue:
+    """A memory-mapped catalogue snapshot with the Catalogue lookup interface"""
+    def __init__(self, path):
+        with open(path, 'rb') as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, format_version, byte_order, self.version, self._max_words, self._timing, self._general,
+             self._empty_plan, self.digest) = HEADER.unpack_from(self._mm)
+        except struct.error:
+            raise SnapshotError(f"{path}: truncated snapshot")
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotError(f"{path}: not a version {FORMAT_VERSION} catalogue snapshot")
+        if byte_order != BYTE_ORDER:
+            raise SnapshotError(f"{path}: built on a machine with a different byte order")
+        self.source = path
+        view = memoryview(self._mm)
+        table = view[HEADER.size:HEADER.size + 8 * len(SECTIONS)].cast('I')
+        sections = {}
+        for number, name in enumerate(SECTIONS):
+            start, length = table[2 * number], table[2 * number + 1]
+            sections[name] = (start, length)
+        self._strings_start = sections["strings"][0]
+
+        def uint32s(name):
+            start, length = sections[name]
+            return view[start:start + length].cast('I')
+        self._offsets = uint32s("string_offsets")
+        self._lists = uint32s("lists")
+        self._symptoms = uint32s("symptoms")
+        self._symptom_index = uint32s("symptom_index")
+        self._groups = uint32s("groups")
+        self._questions = uint32s("questions")
+        self._keywords = uint32s("keywords")
+        self._keyword_index = uint32s("keyword_index")
+        self.symptoms = _SymptomTable(self)
+        # Text words repeat across requests; remember recent lookups, found or not
+        self._find_symptom = lru_cache(maxsize=8192)(self._find_symptom)
+        self._question = lru_cache(maxsize=4096)(self._decode_question)
+        self._plan = lru_cache(maxsize=1024)(self._assemble_plan)
+
+    def _string_bytes(self, number):
+        start = self._strings_start
+        return self._mm[start + self._offsets[number]:start + self._offsets[number + 1]]
+
+    def _string(self, number):
+        return self._string_bytes(number).decode('utf-8')
+
+    def _list(self, offset):
+        if offset == NONE:
+            return None
+        return self._lists[offset + 1:offset + 1 + self._lists[offset]]
+
+    def _string_tuple(self, offset):
+        return tuple(self._string(number) for number in self._list(offset))
+
+    def _search(self, index, rows, fields, key):
+        """Binary search a name-sorted index for key; returns the row or None"""
+        encoded = key.encode('utf-8')
+        low, high = 0, len(index)
+        while low < high:
+            middle = (low + high) // 2
+            name = self._string_bytes(rows[index[middle] * fields])
+            if name == encoded:
+                return index[middle]
+            if name < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _find_symptom(self, name):
+        return self._search(self._symptom_index, self._symptoms, SYMPTOM_FIELDS, name)
+
+    def _find_keyword(self, word):
+        return self._search(self._keyword_index, self._keywords, KEYWORD_FIELDS, word)
+
+    def _group(self, number):
+        row = self._groups[number * GROUP_FIELDS:(number + 1) * GROUP_FIELDS]
+        return {"english": self._string_tuple(row[1]), "telugu": self._string_tuple(row[2])}
+
+    def _symptom_entry(self, row):
+        fields = self._symptoms[row * SYMPTOM_FIELDS:(row + 1) * SYMPTOM_FIELDS]
+        entry = {"causes": self._string_tuple(fields[3]), "severity": self._string(fields[1]),
+                 "urgency": self._string(fields[2])}
+        if fields[4] != NONE:
+            entry["specific_recommendations"] = self._string_tuple(fields[4])
+        if fields[5] != NONE:
+            entry["general_recommendations"] = self._string_tuple(fields[5])
+        if fields[6] != NONE:
+            entry["follow_up"] = self._group(fields[6])
+        if fields[8] != NONE:
+            pairs = self._list(fields[8])
+            entry["synonyms"] = {self._string(pairs[i]): self._string_tuple(pairs[i + 1])
+                                 for i in range(0, len(pairs), 2)}
+        return entry
+
+    @property
+    def follow_up_keywords(self):
+        return {self._string(self._keywords[row * KEYWORD_FIELDS]): self._group(self._keywords[row * KEYWORD_FIELDS + 1])
+                for row in range(len(self._keywords) // KEYWORD_FIELDS)}
+
+    @property
+    def groups(self):
+        return {self._string(self._groups[number * GROUP_FIELDS]): self._group(number)
+                for number in range(len(self._groups) // GROUP_FIELDS)}
+
+    def _identified_rows(self, text_lower):
+        """Symptom rows named in the text, in catalogue order"""
+        tokens = [(match.start(), match.end()) for match in WORD_PATTERN.finditer(text_lower)]
+        rows = set()
+        for first in range(len(tokens)):
+            start = tokens[first][0]
+            # Phrases match whole words separated exactly as in the catalogue
+            for last in range(first, min(first + self._max_words, len(tokens))):
+                row = self._find_symptom(text_lower[start:tokens[last][1]])
+                if row is not None:
+                    rows.add(row)
+        return sorted(rows)
+
+    def identify_symptoms(self, text):
+        """Return catalogue symptoms mentioned in text, in catalogue order"""
+        return [self._string(self._symptoms[row * SYMPTOM_FIELDS]) for row in self._identified_rows(text.lower())]
+
+    def _decode_question(self, number, language):
+        row = self._questions[number * QUESTION_FIELDS:(number + 1) * QUESTION_FIELDS]
+        text = self._string(row[0] if language == "english" else row[1])
+        return FollowUpQuestion(text, QUESTION_IMAGE, QUESTION_ANIMATIONS[row[2]])
+
+    def _group_questions(self, number):
+        return self._list(self._groups[number * GROUP_FIELDS + 3])
+
+    def _assemble_plan(self, plan_key, language):
+        """Question tuple for a stored plan (an int) or a tuple of group numbers"""
+        if isinstance(plan_key, int):
+            numbers = list(self._list(plan_key))
+        else:
+            numbers = list(self._group_questions(self._timing))
+            for group in plan_key:
+                numbers.extend(number for number in self._group_questions(group) if number not in numbers)
+            for number in self._group_questions(self._general):
+                if len(numbers) >= MIN_PLAN_QUESTIONS:
+                    break
+                if number not in numbers:
+                    numbers.append(number)
+        return tuple(self._question(number, language) for number in numbers)
+
+    def get_question_plan(self, symptoms, language="english"):
+        """Return the follow-up question plan for the given symptom text"""
+        language = language.lower()
+        if language not in PLAN_LANGUAGES:
+            language = "english"
+        text_lower = symptoms.lower()
+        # (stored plan, group) for each plan key, symptoms first and then keywords
+        keys = [(self._symptoms[row * SYMPTOM_FIELDS + 7], self._symptoms[row * SYMPTOM_FIELDS + 6])
+                for row in self._identified_rows(text_lower) if self._symptoms[row * SYMPTOM_FIELDS + 6] != NONE]
+        keyword_rows = {self._find_keyword(word) for word in set(WORD_PATTERN.findall(text_lower))}
+        keys.extend((self._keywords[row * KEYWORD_FIELDS + 2], self._keywords[row * KEYWORD_FIELDS + 1])
+                    for row in sorted(keyword_rows - {None}))
+        if not keys:
+            return self._plan(self._empty_plan, language)
+        if len(keys) == 1:
+            return self._plan(keys[0][0], language)
+        return self._plan(tuple(group for _, group in keys), language)
+
+    @property
+    def question_table(self):
+        return {self._string(self._questions[number * QUESTION_FIELDS]):
+                {language: self._question(number, language) for language in PLAN_LANGUAGES}
+                for number in range(len(self._questions) // QUESTION_FIELDS)}
+
+    @property
+    def question_plans(self):
+        plans = {((), language): self._plan(self._empty_plan, language) for language in PLAN_LANGUAGES}
+        for name in self.symptoms:
+            row = self._find_symptom(name)
+            if self._symptoms[row * SYMPTOM_FIELDS + 7] != NONE:
+                for language in PLAN_LANGUAGES:
+                    plans[((name,), language)] = self._plan(self._symptoms[row * SYMPTOM_FIELDS + 7], language)
+        for row in range(len(self._keywords) // KEYWORD_FIELDS):
+            word = self._string(self._keywords[row * KEYWORD_FIELDS])
+            for language in PLAN_LANGUAGES:
+                plans[((word,), language)] = self._plan(self._keywords[row * KEYWORD_FIELDS + 2], language)
+        return plans
+
+
+def load_snapshot(catalogue_path, snapshot_path=None):
+    """The snapshot for catalogue_path if one exists and matches the file, else None"""
+    snapshot_path = snapshot_path or snapshot_path_for(catalogue_path)
+    if not os.path.exists(snapshot_path):
+        return None
+    snapshot = SnapshotCatalogue(snapshot_path)
+    if snapshot.digest != file_digest(catalogue_path):
+        return None
+    return snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python catalogue_snapshot.py', description="Symptom catalogue snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('build', 'Compile the catalogue into a snapshot'), ('info', 'Describe a snapshot')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--catalogue', default=CATALOGUE_PATH, help='Catalogue JSON file')
+        command.add_argument('--output', help='Snapshot file (default: next to the catalogue)')
+    args = parser.parse_args(argv)
+    path = args.output or snapshot_path_for(args.catalogue)
+
+    if args.command == 'build':
+        build_snapshot(args.catalogue, path)
+        print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+    elif args.command == 'info':
+        snapshot = SnapshotCatalogue(path)
+        current = snapshot.digest == file_digest(args.catalogue)
+        print(f"{path}: catalogue version {snapshot.version}, {len(snapshot.symptoms)} symptoms, "
+              f"{os.path.getsize(path)} bytes, {'current' if current else 'stale'} for {args.catalogue}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
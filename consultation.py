@@ -0,0 +1,281 @@
+"""
+Final consultation step: summary generation, translation and saving the summary sheet.
+Shared by the /chatbot route, background summary jobs, the /chatbot/stream
+Server-Sent Events endpoint and the Socket.IO consultation channel.
+
+Summaries in another language are rendered from its language pack (language_packs).
+Only the user's own words go to the translation service, as far as the QoS tier
+allows. For a pack without templates, the English summary is translated as a whole.
+"""
+import json
+import logging
+import re
+import sqlite3
+
+from auth import DB_PATH
+from request_tracing import span
+from language_packs import pack_for
+from triage_engine import generate_summary, iter_summary_sections, URGENT_SECTIONS
+
+class SummarySaveError(Exception):
+    """Raised when the summary sheet cannot be stored"""
+
+
+def protect_terms(text, pack):
+    """Replace the pack's glossary terms with placeholders; returns (text, placeholder map)"""
+    term_map = {}
+    for i, (term, trans) in enumerate(pack.glossary.items()):
+        placeholder = f'__TERM_{i}__'
+        if term in text:
+            text = text.replace(term, placeholder)
+            term_map[placeholder] = trans
+            logging.debug(f"Preserved term: {term} -> {placeholder}")
+    return text, term_map
+
+
+def restore_terms(text, term_map):
+    for placeholder, trans in term_map.items():
+        text = text.replace(placeholder, trans)
+    return text
+
+
+def translation_status(language, summary):
+    pack = pack_for(language)
+    is_translation_complete = (
+        pack.base is None or not pack.script or
+        pack.writes_script(summary)
+    )
+    return "complete" if is_translation_complete else "partial"
+
+
+def translate_summary(voice_handler, summary, pack):
+    """Debuggable translation of a whole summary with step-by-step validation"""
+    try:
+        logging.info(f"Starting {pack.name} translation process")
+        logging.info(f"Preserving {len(pack.glossary)} medical terms")
+        
+        # Validate and replace terms with placeholders
+        original_length = len(summary)
+        summary, term_map = protect_terms(summary, pack)
+        
+        if len(summary) != original_length:
+            logging.warning(f"Term replacement altered text length ({original_length} -> {len(summary)})")
+        
+        # Validate translation service
+        if not hasattr(voice_handler, 'translate_text'):
+            raise AttributeError("Translation service not available")
+        
+        # Test translation with known phrase
+        test_phrase = "This is a test"
+        with span('chatbot.translate_probe'):
+            test_translation = voice_handler.translate_text(test_phrase, pack.translate_code)
+        if not test_translation or len(test_translation) < len(test_phrase)/2:
+            raise ValueError("Translation service test failed")
+        
+        # Translate the actual text
+        logging.info(f"Translating text (length: {len(summary)})")
+        with span('chatbot.translate'):
+            translated_summary = voice_handler.translate_text(summary, pack.translate_code)
+        logging.info(f"Received translation (length: {len(translated_summary)})")
+        
+        if translated_summary:
+            # Restore preserved terms
+            translated_summary = restore_terms(translated_summary, term_map)
+            
+        # Verify translation quality and add standard precautions
+        script_chars = len([c for c in translated_summary if pack.writes_script(c)])
+        if not pack.script or script_chars > len(translated_summary)*0.6:  # At least 60% in the language's script
+            summary = translated_summary + pack.message("precautions")
+        else:
+            logging.error(f"Low {pack.name} content in translation: {script_chars}/{len(translated_summary)}")
+            summary = f"English:\n{summary}\n\n{pack.name}:\n{translated_summary}{pack.message('short_precautions')}"
+        
+        if not summary:
+            raise ValueError("Empty translation result")
+        return summary
+            
+    except Exception as e:
+        logging.error(f"{pack.name} translation failed: {str(e)}")
+        # Generate bilingual summary as fallback
+        return f"English:\n{summary}\n\n{pack.name}:\n{voice_handler.translate_text(summary, pack.translate_code)}"
+
+
+def save_summary_sheet(user_id, symptoms, summary):
+    """Save the summary sheet to database"""
+    try:
+        with span('chatbot.db_insert'):
+            conn = sqlite3.connect(DB_PATH)
+            c = conn.cursor()
+            
+            c.execute('INSERT INTO summary_sheets (user_id, symptoms, summary) VALUES (?, ?, ?)',
+                      (user_id, symptoms, summary))
+            conn.commit()
+            conn.close()
+    except Exception as e:
+        logging.error(f"Error saving summary: {e}")
+        raise SummarySaveError('Failed to save consultation summary')
+
+
+def user_text_translator(voice_handler, tier, pack):
+    """translate(text) for the user's own words in a localized summary, as far as the QoS tier allows"""
+    def translate(text):
+        # Numbers and text already in the language's script need no translation
+        if pack.writes_script(text) or not any(c.isalpha() for c in text):
+            return text
+        return localize_section(voice_handler, text, tier, pack).strip()
+    return translate
+
+
+def native_summary(voice_handler, original_symptoms, follow_up_answers, tier, pack):
+    """Summary rendered from the language pack, translating only the user's words"""
+    summary = generate_summary(original_symptoms, pack.language, follow_up_answers,
+                               translate=user_text_translator(voice_handler, tier, pack))
+    if tier == "text_only":
+        return summary
+    return summary + pack.message("precautions")
+
+
+def degraded_summary(voice_handler, original_symptoms, follow_up_answers, tier, pack):
+    """Translated summary without the remote translation service, for degraded QoS tiers"""
+    if tier == "cached_translation":
+        sections = iter_summary_sections(original_symptoms, pack.language, follow_up_answers)
+        return (''.join(localize_section(voice_handler, text, tier, pack) for _, text in sections).strip()
+                + pack.message("precautions"))
+    summary = generate_summary(original_symptoms, pack.language, follow_up_answers)
+    if tier == "bilingual_fallback":
+        return summary + pack.message("precautions")
+    return summary
+
+
+def finalize_consultation(voice_handler, user_id, original_symptoms, language, follow_up_answers, progress=None,
+                          tier="full"):
+    """Generate, translate and save the final summary; returns the /chatbot response"""
+    report = progress or (lambda stage: None)
+    pack = pack_for(language)
+
+    if pack.base is not None and pack.localized:
+        report("summary")
+        summary = native_summary(voice_handler, original_symptoms, follow_up_answers, tier, pack)
+    elif pack.base is not None and tier not in ("full", "skip_tts"):
+        report("summary")
+        summary = degraded_summary(voice_handler, original_symptoms, follow_up_answers, tier, pack)
+    else:
+        # Generate final summary including all follow-up answers
+        report("summary")
+        summary = generate_summary(original_symptoms, language, follow_up_answers)
+        
+        if pack.base is not None:
+            report("translate")
+            summary = translate_summary(voice_handler, summary, pack)
+    
+    report("save")
+    save_summary_sheet(user_id, original_symptoms, summary)
+    
+    # Prepare response with translation status
+    return {
+        "is_follow_up": False,
+        "summary_sheet": summary,
+        "needs_audio": False,
+        "translation_status": translation_status(language, summary),
+        "qos_tier": tier
+    }
+
+
+def translate_section(voice_handler, text, pack):
+    """Translate one summary section, keeping the pack's glossary terms intact"""
+    protected, term_map = protect_terms(text, pack)
+    with span('chatbot.translate_section'):
+        translated = voice_handler.translate_text(protected, pack.translate_code)
+    if not translated:
+        return text
+    return restore_terms(translated, term_map).strip() + " "
+
+
+def localize_section(voice_handler, text, tier, pack):
+    """One summary section in the pack's language as far as the QoS tier allows; English otherwise"""
+    if tier in ("full", "skip_tts"):
+        return translate_section(voice_handler, text, pack)
+    if tier == "cached_translation":
+        protected, term_map = protect_terms(text, pack)
+        translated = voice_handler.cached_translation(protected, pack.translate_code)
+        if translated:
+            return restore_terms(translated, term_map).strip() + " "
+    return text
+
+
+# Stands in for a text awaiting translation in a rendered section
+PLACEHOLDER = re.compile(r'\ue000(\d+)\ue001')
+
+
+def deferred_translator(translate):
+    """
+    (defer, fill): defer(text) stands in for translate(text) while the summary renders and
+    returns a placeholder; fill(section) translates the placeholders of one section as it
+    is sent, each distinct text once
+    """
+    texts, positions, translated = [], {}, {}
+
+    def defer(text):
+        if text not in positions:
+            positions[text] = len(texts)
+            texts.append(text)
+        return f"\ue000{positions[text]}\ue001"
+
+    def fill(section):
+        def replace(match):
+            position = int(match.group(1))
+            if position >= len(texts):
+                return match.group(0)
+            if position not in translated:
+                translated[position] = translate(texts[position]) or texts[position]
+            return translated[position]
+        return PLACEHOLDER.sub(replace, section)
+    return defer, fill
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def iter_summary_updates(voice_handler, user_id, original_symptoms, language, follow_up_answers, tier="full"):
+    """
+    Produce the final summary as (event, data) updates, one per section. Sections are
+    rendered in the language's pack, or translated section by section for a pack without
+    templates. The user's words are only translated when the section holding them is
+    sent, so rendering takes microseconds and urgent warnings are sent first; each event
+    carries its position in the summary so the client can place it.
+    """
+    pack = pack_for(language)
+    translated = pack.base is not None
+    native = translated and pack.localized
+    defer = fill = None
+    if native:
+        defer, fill = deferred_translator(user_text_translator(voice_handler, tier, pack))
+    sections = list(enumerate(iter_summary_sections(original_symptoms, language, follow_up_answers, defer)))
+    sections.sort(key=lambda item: item[1][0] not in URGENT_SECTIONS)
+    
+    rendered = [None] * len(sections)
+    for order, (section, text) in sections:
+        if native:
+            text = fill(text)
+        elif translated:
+            text = localize_section(voice_handler, text, tier, pack)
+        rendered[order] = text
+        yield "section", {"section": section, "order": order, "text": text.strip()}
+    
+    summary = ''.join(rendered).strip()
+    if translated and tier != "text_only" and pack.message("precautions"):
+        summary += pack.message("precautions")
+        yield "section", {"section": "precautions", "order": len(rendered), "text": pack.message("precautions").strip()}
+    
+    try:
+        save_summary_sheet(user_id, original_symptoms, summary)
+    except SummarySaveError as e:
+        yield "error", {"error": str(e)}
+        return
+    yield "complete", {
+        "summary_sheet": summary,
+        "translation_status": translation_status(language, summary),
+        "qos_tier": tier
+    }
@@ -0,0 +1,78 @@
+"""
+Consultation state shared by every worker process.
+
+The Socket.IO channel keeps the consultation in memory while a connection is open. It
+also saves the consultation here after every step. A client that reconnects to another
+worker, or an HTTP request served by any worker, can then pick up where it left off.
+State is stored per user in the same SQLite database as the user accounts. The database
+uses WAL mode so that concurrent readers in other processes do not block the writer.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from auth import DB_PATH
+from request_tracing import span
+
+# Unfinished consultations older than this are ignored
+STATE_TTL = int(os.getenv('CONSULTATION_STATE_TTL', 1800))
+
+
+def init_state_db():
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('PRAGMA journal_mode=WAL')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS consultation_state (
+            user_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+init_state_db()
+
+
+def save_consultation_state(user_id, state):
+    """Store the user's in-progress consultation (a JSON-serializable dict)"""
+    try:
+        with span('consultation_state.save'):
+            conn = sqlite3.connect(DB_PATH)
+            conn.execute('INSERT OR REPLACE INTO consultation_state (user_id, state, updated_at) VALUES (?, ?, ?)',
+                         (user_id, json.dumps(state, ensure_ascii=False), time.time()))
+            conn.commit()
+            conn.close()
+    except sqlite3.Error as e:
+        # The consultation continues on this connection even if it cannot be shared
+        logging.error(f"Error saving consultation state: {e}")
+
+
+def load_consultation_state(user_id):
+    """The user's in-progress consultation, or None if there is none or it expired"""
+    try:
+        with span('consultation_state.load'):
+            conn = sqlite3.connect(DB_PATH)
+            row = conn.execute('SELECT state, updated_at FROM consultation_state WHERE user_id = ?',
+                               (user_id,)).fetchone()
+            conn.close()
+    except sqlite3.Error as e:
+        logging.error(f"Error loading consultation state: {e}")
+        return None
+    if row is None or row[1] < time.time() - STATE_TTL:
+        return None
+    return json.loads(row[0])
+
+
+def clear_consultation_state(user_id):
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute('DELETE FROM consultation_state WHERE user_id = ?', (user_id,))
+        conn.commit()
+        conn.close()
+    except sqlite3.Error as e:
+        logging.error(f"Error clearing consultation state: {e}")
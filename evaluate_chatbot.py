@@ -1,6 +1,3 @@
-import difflib
-import time
-
 """
 Test Case Design Rationale:
 1. Case 1: Validates perfect symptom recognition and handling
@@ -11,7 +8,32 @@ Weights:
 - 20% Translation accuracy
 - 20% Voice input
 - 15% Voice output
+
+Corpora written by --generate take their labels and wordings from the symptom catalogue
+the matcher uses, so they score close to 100% and only catch regressions. Marked cases
+("source": "generated") are counted in the report; accuracy claims need a held-out,
+hand-labelled corpus.
 """
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from symptom_catalogue import common_symptoms, match_symptoms
+from triage_engine import generate_summary
+
 test_data = [
     {
         "id": 1,
@@ -52,9 +74,34 @@ def keyword_match_score(keywords, summary):
     hits = sum(1 for kw in keywords if kw.lower() in summary.lower())
     return round((hits / len(keywords)) * 100, 2) if keywords else 0
 
+def char_ngrams(text, order):
+    """Character n-gram counts of text with whitespace removed (as in chrF)"""
+    text = ''.join(text.split())
+    return Counter(text[i:i + order] for i in range(len(text) - order + 1))
+
+def chrf_score(reference, hypothesis, max_order=6, beta=2.0):
+    """chrF character n-gram F-score in [0, 1]; linear in the text length for each order"""
+    precisions = []
+    recalls = []
+    for order in range(1, max_order + 1):
+        ref_counts = char_ngrams(reference, order)
+        hyp_counts = char_ngrams(hypothesis, order)
+        if not ref_counts or not hyp_counts:
+            continue
+        matches = sum((ref_counts & hyp_counts).values())
+        precisions.append(matches / sum(hyp_counts.values()))
+        recalls.append(matches / sum(ref_counts.values()))
+    if not precisions:
+        return 1.0 if reference == hypothesis else 0.0
+    precision = sum(precisions) / len(precisions)
+    recall = sum(recalls) / len(recalls)
+    if precision + recall == 0:
+        return 0.0
+    beta_sq = beta * beta
+    return (1 + beta_sq) * precision * recall / (beta_sq * precision + recall)
+
 def translation_score(expected, actual):
-    seq = difflib.SequenceMatcher(None, expected, actual)
-    return round(seq.ratio() * 100, 2)
+    return round(chrf_score(expected, actual) * 100, 2)
 
 def evaluate_tests(test_cases):
     total_response_time = 0
@@ -103,8 +150,338 @@ def evaluate_tests(test_cases):
         "Average Response Time (seconds)": round(avg_response_time, 2)
     }
 
+# === Corpus evaluation engine ===
+# Streams a labelled JSONL corpus through the real symptom matcher and summary generator.
+# One case per line:
+#   {"id": 1, "input_text": "...", "expected_symptoms": [...], "summary_keywords": [...],
+#    "language": "english", "follow_up_answers": [...],
+#    "expected_translation": "...", "generated_translation": "...", "source": "generated"}
+# Only input_text and expected_symptoms are required; metrics whose inputs are missing
+# are recorded as NaN and left out of the averages.
+
+CASE_METRICS = ("precision", "recall", "f1", "keyword_recall", "translation_chrf")
+DEFAULT_BATCH_SIZE = 256
+
+def iter_corpus(path):
+    """Yield raw case lines from a JSONL corpus; workers parse them"""
+    with open(path, encoding='utf-8') as fp:
+        for line in fp:
+            if line.strip():
+                yield line
+
+def iter_batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def evaluate_batch(cases):
+    """Score a batch of cases with the real pipeline; runs inside worker processes"""
+    columns = {metric: array('d') for metric in CASE_METRICS}
+    confusion = {}  # symptom -> [true positives, false positives, false negatives]
+    confused_pairs = Counter()  # (missed expected symptom, extra recognized symptom)
+    generated = 0
+
+    for case in cases:
+        if isinstance(case, str):
+            case = json.loads(case)
+        if case.get("source") == "generated":
+            generated += 1
+        text = case["input_text"]
+        expected = set(case.get("expected_symptoms", []))
+        recognized = {match.symptom for match in match_symptoms(text)}
+        true_positives = len(expected & recognized)
+        precision = true_positives / len(recognized) if recognized else float(not expected)
+        recall = true_positives / len(expected) if expected else float(not recognized)
+        f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0.0
+        columns["precision"].append(precision)
+        columns["recall"].append(recall)
+        columns["f1"].append(f1)
+
+        summary = generate_summary(text, case.get("language", "english"), case.get("follow_up_answers")).lower()
+        keywords = case.get("summary_keywords")
+        if keywords:
+            columns["keyword_recall"].append(sum(1 for kw in keywords if kw.lower() in summary) / len(keywords))
+        else:
+            columns["keyword_recall"].append(math.nan)
+
+        if "expected_translation" in case and "generated_translation" in case:
+            columns["translation_chrf"].append(chrf_score(case["expected_translation"], case["generated_translation"]))
+        else:
+            columns["translation_chrf"].append(math.nan)
+
+        missed = expected - recognized
+        extra = recognized - expected
+        for symptom in expected | recognized:
+            counts = confusion.setdefault(symptom, [0, 0, 0])
+            if symptom in missed:
+                counts[2] += 1
+            elif symptom in extra:
+                counts[1] += 1
+            else:
+                counts[0] += 1
+        for missed_symptom in missed:
+            for extra_symptom in extra:
+                confused_pairs[(missed_symptom, extra_symptom)] += 1
+
+    return len(cases), generated, columns, confusion, confused_pairs
+
+def _map_batches(batches, workers):
+    """Yield evaluate_batch results, keeping at most 2 * workers batches in flight"""
+    if workers <= 1:
+        for batch in batches:
+            yield evaluate_batch(batch)
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, wait
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for batch in batches:
+            pending.add(executor.submit(evaluate_batch, batch))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+def _column_stats(values):
+    """Mean and 5th percentile of a metric column, ignoring NaN entries"""
+    if np is not None:
+        column = np.frombuffer(values, dtype=np.float64)
+        column = column[~np.isnan(column)]
+        if not column.size:
+            return None
+        return {"mean": round(float(column.mean()) * 100, 2),
+                "p5": round(float(np.percentile(column, 5)) * 100, 2),
+                "count": int(column.size)}
+    column = sorted(value for value in values if not math.isnan(value))
+    if not column:
+        return None
+    return {"mean": round(math.fsum(column) / len(column) * 100, 2),
+            "p5": round(column[max(0, math.ceil(0.05 * len(column)) - 1)] * 100, 2),
+            "count": len(column)}
+
+def evaluate_cases(cases, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Evaluate an iterable of cases and return aggregate metrics and per-symptom confusion tables"""
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    start_time = time.perf_counter()
+    total = 0
+    generated = 0
+    columns = {metric: array('d') for metric in CASE_METRICS}
+    confusion = {}
+    confused_pairs = Counter()
+
+    for count, batch_generated, batch_columns, batch_confusion, batch_pairs in _map_batches(iter_batches(cases, batch_size), workers):
+        total += count
+        generated += batch_generated
+        for metric, values in batch_columns.items():
+            columns[metric].extend(values)
+        for symptom, counts in batch_confusion.items():
+            totals = confusion.setdefault(symptom, [0, 0, 0])
+            for i, value in enumerate(counts):
+                totals[i] += value
+        confused_pairs.update(batch_pairs)
+
+    elapsed = time.perf_counter() - start_time
+    table = {}
+    for symptom in sorted(confusion):
+        tp, fp, fn = confusion[symptom]
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        table[symptom] = {
+            "true_positives": tp,
+            "false_positives": fp,
+            "false_negatives": fn,
+            "true_negatives": total - tp - fp - fn,
+            "precision": round(precision * 100, 2),
+            "recall": round(recall * 100, 2),
+            "f1": round(2 * precision * recall / (precision + recall) * 100, 2) if precision + recall else 0.0,
+            "confused_with": {extra: n for (missed, extra), n in confused_pairs.most_common() if missed == symptom}
+        }
+
+    tp_total = sum(counts[0] for counts in confusion.values())
+    fp_total = sum(counts[1] for counts in confusion.values())
+    fn_total = sum(counts[2] for counts in confusion.values())
+    micro_precision = tp_total / (tp_total + fp_total) if tp_total + fp_total else 0.0
+    micro_recall = tp_total / (tp_total + fn_total) if tp_total + fn_total else 0.0
+    micro_f1 = (2 * micro_precision * micro_recall / (micro_precision + micro_recall)
+                if micro_precision + micro_recall else 0.0)
+
+    return {
+        "Total Cases": total,
+        "Generated Cases": generated,
+        "Elapsed (seconds)": round(elapsed, 2),
+        "Cases per Second": round(total / elapsed, 1) if elapsed else 0.0,
+        "Micro Symptom F1 (%)": round(micro_f1 * 100, 2),
+        "Case Metrics (%)": {metric: _column_stats(values) for metric, values in columns.items()},
+        "Confusion Table": table
+    }
+
+def evaluate_corpus(path, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    return evaluate_cases(iter_corpus(path), workers, batch_size)
+
+def write_confusion_csv(report, path):
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(["symptom", "tp", "fp", "fn", "tn", "precision", "recall", "f1", "confused_with"])
+        for symptom, row in report["Confusion Table"].items():
+            writer.writerow([symptom, row["true_positives"], row["false_positives"], row["false_negatives"],
+                             row["true_negatives"], row["precision"], row["recall"], row["f1"],
+                             "; ".join(f"{other} ({n})" for other, n in row["confused_with"].items())])
+
+# Phrasings used to synthesize a labelled corpus from the symptom catalogue
+CORPUS_TEMPLATES = [
+    "I have {symptoms}",
+    "I'm suffering from {symptoms} since yesterday",
+    "Doctor, my main problems are {symptoms}",
+    "For the last 3 days I have had {symptoms} and it is getting worse",
+    "{symptoms}"
+]
+# Everyday wordings and misspellings of catalogue symptoms; fuzzy matching recovers the misspellings
+CORPUS_VARIANTS = {
+    "fever": ["feverish", "feaver", "high temperature"],
+    "headache": ["head ache", "headaches", "pounding head"],
+    "cough": ["coughing", "coughs"],
+    "stomach pain": ["stomach ache", "tummy pain"],
+    "shortness of breath": ["can't breathe", "breathlessness"],
+    "dizziness": ["dizzy", "feeling dizzy"],
+    "nausea": ["nauseous", "nausia"],
+    "fatigue": ["tired all the time", "fatigued"]
+}
+# Telugu phrasings; symptoms are named with the catalogue's first Telugu synonym
+TELUGU_CORPUS_TEMPLATES = [
+    "నాకు {symptoms} ఉంది",
+    "మూడు రోజులుగా {symptoms}తో బాధపడుతున్నాను",
+    "డాక్టర్, నాకు {symptoms} ఎక్కువగా ఉన్నాయి",
+    "{symptoms}"
+]
+NO_SYMPTOM_INPUTS = [
+    "I just want a general health check",
+    "I feel fine but want advice on diet",
+    "Can you tell me about vaccinations?"
+]
+# Everyday words one edit away from a symptom name ("never" ~ fever, "tough" ~ cough),
+# which fuzzy matching must leave alone
+NEAR_MISS_INPUTS = [
+    ("I have a headache, never had one this bad", ["headache"]),
+    ("It has been a tough week", []),
+    ("I feel rough after sleeping on the couch", []),
+    ("My job is selling cars and I have back pain", ["back pain"]),
+    ("We are breeding dogs and I have a fever", ["fever"]),
+    ("The dwelling was cold and now I have a cough", ["cough"]),
+    ("Whatever I eat gives me nausea", ["nausea"]),
+    ("It is a threat to my health", []),
+    ("I have fewer problems than last week", [])
+]
+
+def generate_corpus(path, count, seed=0, variant_rate=0.15, telugu_rate=0.0, near_miss_rate=0.05):
+    """
+    Write a synthetic labelled corpus built from the symptom catalogue. Its labels come
+    from the same catalogue the matcher uses, so it measures regressions, not accuracy.
+    """
+    rng = random.Random(seed)
+    symptoms = list(common_symptoms)
+    telugu_names = {symptom: info["synonyms"]["telugu"][0] for symptom, info in common_symptoms.items()
+                    if info.get("synonyms", {}).get("telugu")}
+    with open(path, 'w', encoding='utf-8') as fp:
+        for case_id in range(1, count + 1):
+            if rng.random() < 0.05:
+                case = {"id": case_id, "input_text": rng.choice(NO_SYMPTOM_INPUTS), "expected_symptoms": []}
+            elif rng.random() < near_miss_rate:
+                text, expected = rng.choice(NEAR_MISS_INPUTS)
+                case = {"id": case_id, "input_text": text, "expected_symptoms": expected}
+            elif telugu_names and rng.random() < telugu_rate:
+                chosen = rng.sample(list(telugu_names), rng.randint(1, 3))
+                case = {
+                    "id": case_id,
+                    "input_text": rng.choice(TELUGU_CORPUS_TEMPLATES).format(
+                        symptoms=" మరియు ".join(telugu_names[symptom] for symptom in chosen)),
+                    "expected_symptoms": chosen,
+                    "language": "telugu"
+                }
+            else:
+                chosen = rng.sample(symptoms, rng.randint(1, 3))
+                phrases = [rng.choice(CORPUS_VARIANTS[symptom])
+                           if symptom in CORPUS_VARIANTS and rng.random() < variant_rate else symptom
+                           for symptom in chosen]
+                joined = phrases[0] if len(phrases) == 1 else ", ".join(phrases[:-1]) + " and " + phrases[-1]
+                keywords = [rec for symptom in chosen for rec in common_symptoms[symptom].get("general_recommendations", [])[:1]]
+                case = {
+                    "id": case_id,
+                    "input_text": rng.choice(CORPUS_TEMPLATES).format(symptoms=joined),
+                    "expected_symptoms": chosen,
+                    "summary_keywords": keywords or ["See a doctor for proper medical care"]
+                }
+            case["source"] = "generated"
+            fp.write(json.dumps(case, ensure_ascii=False) + "\n")
+
+def print_report(report):
+    print("\n=== Corpus Evaluation Summary ===")
+    for key in ("Total Cases", "Elapsed (seconds)", "Cases per Second", "Micro Symptom F1 (%)"):
+        print(f"{key}: {report[key]}")
+    if report["Generated Cases"]:
+        print(f"Note: {report['Generated Cases']} cases were generated from the symptom catalogue; "
+              "their labels come from the data the matcher uses, so scores on them are an upper bound")
+    for metric, stats in report["Case Metrics (%)"].items():
+        if stats:
+            print(f"Average {metric} (%): {stats['mean']} (p5 {stats['p5']}, n={stats['count']})")
+    print(f"\n{'Symptom':<22}{'TP':>8}{'FP':>8}{'FN':>8}{'Prec':>8}{'Recall':>8}{'F1':>8}")
+    for symptom, row in report["Confusion Table"].items():
+        print(f"{symptom:<22}{row['true_positives']:>8}{row['false_positives']:>8}{row['false_negatives']:>8}"
+              f"{row['precision']:>8}{row['recall']:>8}{row['f1']:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate the chatbot against a labelled JSONL corpus",
+        epilog="Corpora from --generate are labelled from the symptom catalogue the matcher uses and "
+               "score close to 100%; use them to catch regressions and a held-out, hand-labelled "
+               "corpus to measure accuracy.")
+    parser.add_argument('corpus', nargs='?',
+                        help='Labelled JSONL corpus (default: two built-in cases with fixed outputs)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--report', help='Write the full report as JSON')
+    parser.add_argument('--confusion', help='Write the per-symptom confusion table as CSV')
+    parser.add_argument('--min-f1', type=float, help='Exit with status 1 if micro symptom F1 (%%) is below this')
+    parser.add_argument('--generate', type=int, metavar='N',
+                        help='Write a synthetic corpus of N cases to the corpus path and exit; its labels '
+                             'come from the symptom catalogue, so it is not a held-out evaluation')
+    parser.add_argument('--telugu-rate', type=float, default=0.0,
+                        help='Share of generated cases written in Telugu script')
+    parser.add_argument('--near-miss-rate', type=float, default=0.05,
+                        help='Share of generated cases with everyday words close to a symptom name')
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        if not args.corpus:
+            parser.error('--generate needs a corpus path to write to')
+        generate_corpus(args.corpus, args.generate, telugu_rate=args.telugu_rate,
+                        near_miss_rate=args.near_miss_rate)
+        print(f"Wrote {args.generate} cases to {args.corpus}")
+        return 0
+
+    if not args.corpus:
+        evaluation = evaluate_tests(test_data)
+        print("\n=== System Accuracy Summary ===")
+        for key, value in evaluation.items():
+            print(f"{key}: {value}")
+        return 0
+
+    report = evaluate_corpus(args.corpus, args.workers, args.batch_size)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2, ensure_ascii=False)
+    if args.confusion:
+        write_confusion_csv(report, args.confusion)
+    if args.min_f1 is not None and report["Micro Symptom F1 (%)"] < args.min_f1:
+        print(f"\nMicro symptom F1 {report['Micro Symptom F1 (%)']} is below the required {args.min_f1}")
+        return 1
+    return 0
+
 if __name__ == "__main__":
-    evaluation = evaluate_tests(test_data)
-    print("\n=== System Accuracy Summary ===")
-    for key, value in evaluation.items():
-        print(f"{key}: {value}")
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Fuzzy symptom matching for misspelled and speech-transcribed input.
+
+Exact matching misses "feaver", "head ache" or "chestpain". FuzzyMatcher indexes every
+word of the catalogue's symptom names SymSpell-style: each word is stored under all
+the strings that can be made from its first PREFIX_LENGTH characters by deleting up to
+MAX_DISTANCE characters. To look up a misspelled word, the same deletes are generated
+and looked up. Only the few words found that way are compared with an edit distance
+(optimal string alignment), so lookups stay fast with tens of thousands of terms. The
+distance allowed grows with word length: short words must match exactly, because one
+edit turns too many of them into other words. A symptom name of one word ("fever") has
+no other words to confirm it, so a word matched to it alone needs six letters before
+one edit is allowed, and must not be a common English word (COMMON_WORDS_PATH):
+"never", "tough" and "selling" stay as written, while "feaver" becomes fever.
+
+The words of the text form a lattice, and phrases are matched through it. A word can
+be corrected, or two adjacent words can be joined ("head ache" -> headache), or one
+word can be split in two ("chestpain" -> chest pain). Each join, split, or separator
+other than a single space counts as one edit. A match's confidence is
+1 - edits / letters in the symptom name. Exact matches have confidence 1.0.
+
+match_symptoms(catalogue, text) combines these with exact matches and the synonyms and
+inflected forms of text_normalizer, in catalogue order, as identify_symptoms returns.
+Set FUZZY_MATCHING=0 for exact matching only, and FUZZY_MIN_CONFIDENCE for the
+threshold.
+"""
+import os
+import threading
+import weakref
+from collections import namedtuple
+from functools import lru_cache
+
+import text_normalizer
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+ENABLED = os.getenv('FUZZY_MATCHING', '1') != '0'
+MIN_CONFIDENCE = float(os.getenv('FUZZY_MIN_CONFIDENCE', 0.75))
+COMMON_WORDS_PATH = os.getenv('FUZZY_COMMON_WORDS_PATH',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'common_words.txt'))
+
+SymptomMatch = namedtuple('SymptomMatch', ['symptom', 'confidence', 'text'])
+
+
+def allowed_distance(length, standalone=False):
+    """Edits tolerated in a word of this many characters, one letter more when it is matched alone"""
+    if length < (6 if standalone else 5):
+        return 0
+    return 1 if length < 8 else MAX_DISTANCE
+
+
+_common_words = None
+_common_words_lock = threading.Lock()
+
+
+def common_words():
+    """The set of common English words in COMMON_WORDS_PATH, read on first use"""
+    global _common_words
+    if _common_words is None:
+        with _common_words_lock:
+            if _common_words is None:
+                try:
+                    with open(COMMON_WORDS_PATH, encoding='utf-8') as f:
+                        _common_words = frozenset(line.strip() for line in f if line.strip() and not line.startswith('#'))
+                except OSError:
+                    _common_words = frozenset()
+    return _common_words
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word, distance):
+    """Every string made from word by deleting up to distance characters, with word itself"""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+        found |= frontier
+    return found
+
+
+class FuzzyMatcher:
+    """Deletion index over the words of a set of terms, with phrase matching through a word trie"""
+    def __init__(self, terms):
+        self.terms = list(terms)
+        self.vocabulary = {}
+        self.index = {}
+        # word -> (child nodes, term ending here or None)
+        self.trie = {}
+        for term in self.terms:
+            words = term.split()
+            node = self.trie
+            for position, word in enumerate(words):
+                self._add_word(word)
+                children, ending = node.get(word, ({}, None))
+                if position == len(words) - 1:
+                    ending = term
+                node[word] = (children, ending)
+                node = children
+        self.order = {term: position for position, term in enumerate(self.terms)}
+        self.lookup = lru_cache(maxsize=8192)(self._lookup)
+
+    def _add_word(self, word):
+        if word in self.vocabulary:
+            return
+        self.vocabulary[word] = len(self.vocabulary)
+        for deleted in _deletes(word[:PREFIX_LENGTH], MAX_DISTANCE):
+            self.index.setdefault(deleted, []).append(word)
+
+    def _lookup(self, word):
+        """((vocabulary word, distance), ...) closest to word, within its allowed distance"""
+        if word in self.vocabulary:
+            return ((word, 0),)
+        limit = allowed_distance(len(word))
+        if limit == 0:
+            return ()
+        best, candidates = limit, {}
+        for deleted in _deletes(word[:PREFIX_LENGTH], limit):
+            for candidate in self.index.get(deleted, ()):
+                if candidate in candidates or abs(len(candidate) - len(word)) > best:
+                    continue
+                distance = edit_distance(word, candidate, best)
+                candidates[candidate] = distance
+                best = min(best, distance)
+        return tuple((candidate, distance) for candidate, distance in candidates.items() if distance == best)
+
+    def _edges(self, tokens):
+        """
+        Lattice edges from each token position: (end position, words, edits, standalone),
+        where standalone edges may match a one-word symptom name by themselves
+        """
+        edges = [[] for _ in tokens]
+        common = common_words()
+        for i, (word, _, _) in enumerate(tokens):
+            # A real word is only corrected as part of a longer symptom name
+            real_word = word in common and word not in self.vocabulary
+            limit = 0 if real_word else allowed_distance(len(word), standalone=True)
+            edges[i].extend((i + 1, (candidate,), distance, distance <= limit)
+                            for candidate, distance in self.lookup(word))
+            # Two words written as one
+            if len(word) >= 6 and not real_word:
+                for split in range(2, len(word) - 1):
+                    left, right = self.lookup(word[:split]), self.lookup(word[split:])
+                    for left_word, left_distance in left:
+                        for right_word, right_distance in right:
+                            edits = left_distance + right_distance + 1
+                            if edits <= allowed_distance(len(word)):
+                                edges[i].append((i + 1, (left_word, right_word), edits, True))
+            # One word written as two
+            if i + 1 < len(tokens):
+                joined = word + tokens[i + 1][0]
+                for candidate, distance in self.lookup(joined):
+                    if distance + 1 <= allowed_distance(len(joined)):
+                        edges[i].append((i + 2, (candidate,), distance + 1,
+                                         distance + 1 <= allowed_distance(len(joined), standalone=True)))
+        return edges
+
+    def match(self, text, min_confidence=MIN_CONFIDENCE):
+        """SymptomMatch for every term found in text, best confidence per term, in term order"""
+        text = text_normalizer.normalize_text(text)
+        tokens = text_normalizer.tokenize(text, normalized=True)
+        edges = self._edges(tokens)
+        best = {}
+
+        def walk(node, position, edits, start, words):
+            for end, edge_words, edge_edits, standalone in edges[position] if position < len(tokens) else ():
+                current, total, ending = node, edits + edge_edits, None
+                if words and text[tokens[position - 1][2]:tokens[position][1]] != ' ':
+                    total += 1
+                for word in edge_words:
+                    if word not in current:
+                        break
+                    current, ending = current[word]
+                else:
+                    if ending is not None and (standalone or words or len(edge_words) > 1):
+                        confidence = 1 - total / max(1, len(ending.replace(' ', '')))
+                        if confidence >= min_confidence and confidence > best.get(ending, (-1,))[0]:
+                            best[ending] = (round(confidence, 3), text[tokens[start][1]:tokens[end - 1][2]])
+                    if current:
+                        walk(current, end, total, start, words + len(edge_words))
+
+        for start in range(len(tokens)):
+            walk(self.trie, start, 0, start, 0)
+        return [SymptomMatch(term, *best[term]) for term in sorted(best, key=self.order.__getitem__)]
+
+
+_matchers = weakref.WeakKeyDictionary()
+_matchers_lock = threading.Lock()
+
+
+def matcher_for(catalogue):
+    """The FuzzyMatcher over a catalogue snapshot's symptom names, built on first use"""
+    matcher = _matchers.get(catalogue)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(catalogue)
+            if matcher is None:
+                matcher = _matchers[catalogue] = FuzzyMatcher(catalogue.symptoms)
+    return matcher
+
+
+def match_symptoms(catalogue, text, min_confidence=MIN_CONFIDENCE):
+    """
+    Exact matches (confidence 1.0), then synonyms and inflected forms
+    (text_normalizer.CONFIDENCE), then misspellings, in catalogue order
+    """
+    found, order = {}, None
+    if ENABLED:
+        matcher = matcher_for(catalogue)
+        found.update((match.symptom, match) for match in matcher.match(text, min_confidence))
+        order = matcher.order
+    if text_normalizer.ENABLED and text_normalizer.CONFIDENCE >= min_confidence:
+        normalizer = text_normalizer.normalizer_for(catalogue)
+        found.update((symptom, SymptomMatch(symptom, text_normalizer.CONFIDENCE, matched))
+                     for symptom, matched in normalizer.match(text))
+        order = normalizer.order
+    found.update((symptom, SymptomMatch(symptom, 1.0, symptom)) for symptom in catalogue.identify_symptoms(text))
+    if order is None:
+        # Exact matches only, already in catalogue order
+        return list(found.values())
+    return sorted(found.values(), key=lambda match: order[match.symptom])
@@ -0,0 +1,106 @@
+"""
+Content-encoding negotiation and compression helpers.
+
+gzip is always available. Brotli is used when the optional brotli package is
+installed. Clients that accept both get br, since it is smaller for text. Variants are
+only kept when they are actually smaller than the original.
+
+init_response_compression compresses JSON responses of COMPRESS_MIN_SIZE bytes or
+more on the fly. Streamed responses, such as Server-Sent Events, and file downloads
+are left alone.
+"""
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first when the client accepts several with the same q-value
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+# Too small to be worth compressing
+MIN_SIZE = 256
+# Dynamic responses are compressed once per request, so trade some ratio for speed
+DYNAMIC_LEVELS = {"br": 5, "gzip": 6}
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESSED_MIMETYPES = ("application/json",)
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in (header or "").split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(header, available=ENCODINGS):
+    """Best of the available encodings for this Accept-Encoding header, or 'identity'"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = "identity", 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, coding, level=None):
+    if coding == "br":
+        return brotli.compress(body, quality=11 if level is None else level)
+    if coding == "gzip":
+        # mtime=0 keeps the output, and so its ETag, stable across restarts
+        return gzip.compress(body, compresslevel=9 if level is None else level, mtime=0)
+    return body
+
+
+def precompress(body):
+    """{coding: bytes} with identity and every encoding that makes body smaller"""
+    variants = {"identity": body}
+    if len(body) >= MIN_SIZE:
+        for coding in ENCODINGS:
+            compressed = compress(body, coding)
+            if len(compressed) < len(body):
+                variants[coding] = compressed
+    return variants
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def init_response_compression(app, min_size=COMPRESS_MIN_SIZE, mimetypes=COMPRESSED_MIMETYPES):
+    """Compress buffered responses of the given types above min_size bytes"""
+    from flask import request
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.mimetype not in mimetypes or response.direct_passthrough or response.is_streamed
+                or response.status_code != 200 or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        coding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        if coding == "identity":
+            return response
+        response.set_data(compress(body, coding, DYNAMIC_LEVELS[coding]))
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong ETag names the uncompressed bytes
+            response.set_etag(f"{etag}-{coding}")
+        return response
@@ -0,0 +1,138 @@
+"""
+Background job executor for slow consultation steps.
+
+Jobs run on a bounded thread pool; the work they do (remote translation, TTS, SQLite)
+is I/O-bound, so threads keep shared state such as the voice handler without
+pickling. Submitting beyond the queue limit raises QueueFull so callers can shed load.
+Finished jobs are kept for result_ttl seconds so clients can poll or long-poll them.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from request_tracing import register_metric
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    """A unit of background work with per-stage progress"""
+    def __init__(self, owner=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.status = "queued"
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def set_stage(self, stage):
+        """Mark the start of a new processing stage"""
+        self.stages.append((stage, time.time()))
+
+    def wait(self, timeout):
+        """Block until the job finishes or timeout seconds pass; returns True if finished"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        stages = []
+        for i, (stage, started) in enumerate(self.stages):
+            ended = self.stages[i + 1][1] if i + 1 < len(self.stages) else self.finished_at
+            stages.append({
+                "stage": stage,
+                "elapsed_ms": round(((ended or time.time()) - started) * 1000, 1),
+                "complete": ended is not None
+            })
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stages[-1][0] if self.stages else None,
+            "stages": stages
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and retains their results for a while"""
+    def __init__(self, max_workers=4, max_pending=64, result_ttl=600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, func, *args, owner=None, **kwargs):
+        """Queue func(*args, progress=job.set_stage, **kwargs) and return its Job"""
+        self._purge_expired()
+        job = Job(owner)
+        with self._lock:
+            if self.queued + self.running >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(retry_after=max(1, self.queued // self.max_workers))
+            self.queued += 1
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        job.status = "running"
+        try:
+            job.result = func(*args, progress=job.set_stage, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            logging.error(f"Background job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self.running -= 1
+                if job.status == "done":
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            job._done.set()
+
+    def get(self, job_id):
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def register_metrics(self, prefix):
+        """Export queue depth and job outcome counters on /metrics"""
+        register_metric(f"{prefix}_queued", "gauge", "Jobs waiting for a worker.", lambda: self.queued)
+        register_metric(f"{prefix}_running", "gauge", "Jobs currently running.", lambda: self.running)
+        register_metric(f"{prefix}_retained", "gauge", "Jobs whose results are retained.", lambda: len(self._jobs))
+        register_metric(f"{prefix}_total", "counter", "Finished jobs by outcome.",
+                        lambda: [({"outcome": "done"}, self.completed), ({"outcome": "failed"}, self.failed),
+                                 ({"outcome": "rejected"}, self.rejected)])
@@ -0,0 +1,80 @@
+"""
+JSON provider for the Flask apps.
+
+Flask's default provider escapes every non-ASCII character. A Telugu letter then costs
+6 bytes (\\u0c15) instead of its 3 bytes of UTF-8. Both providers here write UTF-8 and
+omit whitespace:
+- OrjsonProvider uses orjson when it is installed. json.dumps arguments that orjson
+  cannot honour (an indent other than 2, ensure_ascii, cls, ...) go to the standard
+  library instead, so it behaves like Flask's DefaultJSONProvider.
+- CompactJSONProvider is the pure-Python fallback, built on the standard json module.
+
+JSON_PROVIDER selects one explicitly ('orjson' or 'stdlib'). By default orjson is used
+when it is available.
+"""
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """Standard library json, UTF-8 output without escapes or whitespace"""
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+
+class OrjsonProvider(CompactJSONProvider):
+    """orjson for dumps/loads and responses; other types go through Flask's default()"""
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def orjson_options(self, kwargs):
+        """orjson options equivalent to json.dumps kwargs, or None if orjson cannot honour them"""
+        kwargs = dict(kwargs)
+        option = self.options
+        if kwargs.pop("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        indent = kwargs.pop("indent", None)
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        elif indent is not None:
+            return None
+        # orjson writes ", " nowhere and ": " only when indenting
+        separators = kwargs.pop("separators", None)
+        if separators is not None and tuple(separators) != ((",", ": ") if indent else (",", ":")):
+            return None
+        if kwargs.pop("ensure_ascii", self.ensure_ascii) or kwargs.pop("default", self.default) != self.default or kwargs:
+            return None
+        return option
+
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a str; kwargs are json.dumps arguments"""
+        option = self.orjson_options(kwargs)
+        if option is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def provider_class(name=None):
+    name = (name or os.getenv('JSON_PROVIDER', 'auto')).lower()
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+    if name == 'stdlib' or orjson is None:
+        return CompactJSONProvider
+    return OrjsonProvider
+
+
+def init_json(app, name=None):
+    """Install the fast JSON provider on app"""
+    app.json = provider_class(name)(app)
+    return app.json
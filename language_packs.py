@@ -0,0 +1,262 @@
+"""
+Language packs: everything the chatbot needs to serve one language.
+
+Each data/language_packs/<language>.json (LANGUAGE_PACKS_DIR) holds:
+- codes: the translate, tts and stt codes of the voice backends ("te", "te", "te-IN"),
+- script: the Unicode ranges of the language's script, to tell text already in it,
+- messages: the greeting, precautions and error messages,
+- glossary: medical terms kept out of machine translation, with their rendering,
+- templates: the summary's sentence templates, with {named} fields,
+- strings: the lexicon, from the English catalogue text (symptom names, severity,
+  urgency and recommendations) to the language.
+
+Summaries are assembled directly in a language that has templates: the templates and
+catalogue strings are plain dict lookups. Only the user's own words (the symptom text
+and the follow-up answers) and catalogue strings missing from the lexicon go through
+the translate function given to the renderer. A pack without templates gets the
+English summary translated as a whole.
+
+english.json is the base pack and defines the template ids. Every other pack with
+templates must define the same ids with the same fields; a pack that does not is
+logged and left out. Messages missing from a pack come from the base pack.
+
+Installing a pack only adds a file name to a directory listing. A pack is read on
+first use and then cached, so memory and startup time grow with the languages actually
+served, not with the packs installed. Voice language codes are resolved through a small
+index of every pack's codes, read once without keeping the rest of the packs. Adding a
+language means adding its pack file.
+"""
+import json
+import logging
+import os
+import string
+import threading
+
+PACKS_DIR = os.getenv('LANGUAGE_PACKS_DIR',
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'language_packs'))
+BASE_LANGUAGE = "english"
+CODE_KINDS = ("translate", "tts", "stt")
+
+
+class LanguagePackError(ValueError):
+    """Raised when a language pack is missing or malformed"""
+
+
+def template_fields(template):
+    return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+
+
+class LanguagePack:
+    """Codes, messages, glossary, templates and lexicon of one language; treat as read-only"""
+    def __init__(self, language, data, base=None):
+        self.language = language
+        self.name = data.get("name", language.title())
+        self.translate_code, self.tts_code, self.stt_code = (data["codes"][kind] for kind in CODE_KINDS)
+        self.script = tuple(tuple(bounds) for bounds in data.get("script", ()))
+        self.messages = data.get("messages", {})
+        self.glossary = data.get("glossary", {})
+        self.templates = data.get("templates", {})
+        self.strings = data.get("strings", {})
+        self.base = base
+
+    @property
+    def localized(self):
+        """True if summaries can be rendered in this language rather than translated"""
+        return bool(self.templates)
+
+    def message(self, key):
+        if key in self.messages or self.base is None:
+            return self.messages[key]
+        return self.base.message(key)
+
+    def writes_script(self, text):
+        """True if text has characters of this language's script"""
+        return any(first <= ord(c) <= last for c in text for first, last in self.script)
+
+    def render(self, template_id, **fields):
+        return self.templates[template_id].format(**fields)
+
+    def join(self, items, separator="list_separator"):
+        return self.templates[separator].join(items)
+
+    def string(self, text, translate=None):
+        """Catalogue text in this language; translate() or the English text when it has no entry"""
+        localized = self.strings.get(text)
+        if localized is None and translate is not None and self.base is not None:
+            localized = translate(text)
+        return localized or text
+
+
+def _string_map(data, field, language):
+    value = data.get(field, {})
+    if not isinstance(value, dict) or not all(isinstance(item, str) for item in value.values()):
+        raise LanguagePackError(f"{language}: {field} must be an object of strings")
+    return value
+
+
+def _read_json(language, directory):
+    path = os.path.join(directory, f"{language}.json")
+    try:
+        with open(path, encoding='utf-8') as fp:
+            data = json.load(fp)
+    except (OSError, ValueError) as e:
+        raise LanguagePackError(f"cannot read language pack {language}: {e}")
+    if not isinstance(data, dict):
+        raise LanguagePackError(f"{language}: a language pack must be a JSON object")
+    codes = data.get("codes")
+    if not isinstance(codes, dict) or not all(isinstance(codes.get(kind), str) and codes[kind] for kind in CODE_KINDS):
+        raise LanguagePackError(f"{language}: codes must give the {', '.join(CODE_KINDS)} codes")
+    return data
+
+
+def read_codes(language, directory=PACKS_DIR):
+    """The codes of data/language_packs/<language>.json, without checking or keeping the rest"""
+    return {kind: _read_json(language, directory)["codes"][kind] for kind in CODE_KINDS}
+
+
+def read_pack(language, directory=PACKS_DIR):
+    """Parse and check data/language_packs/<language>.json; returns its data"""
+    data = _read_json(language, directory)
+    for field in ("messages", "glossary", "templates", "strings"):
+        _string_map(data, field, language)
+    if not all(data.get("strings", {}).values()):
+        raise LanguagePackError(f"{language}: strings must not be empty")
+    script = data.get("script", [])
+    if not isinstance(script, list) or not all(isinstance(bounds, list) and len(bounds) == 2
+                                               and all(isinstance(code, int) for code in bounds) for bounds in script):
+        raise LanguagePackError(f"{language}: script must be a list of [first, last] code points")
+    return data
+
+
+def load_pack(language, base=None, directory=PACKS_DIR):
+    """Read a pack and check its templates against the base pack's"""
+    data = read_pack(language, directory)
+    if base is not None and data.get("templates"):
+        templates = data["templates"]
+        missing = sorted(set(base.templates) - set(templates))
+        if missing:
+            raise LanguagePackError(f"{language}: missing templates {', '.join(missing)}")
+        for template_id, template in base.templates.items():
+            if template_fields(templates[template_id]) != template_fields(template):
+                raise LanguagePackError(f"{language}: template {template_id} must use the fields "
+                                        f"{sorted(template_fields(template))}")
+    return LanguagePack(language, data, base)
+
+
+class PackRegistry:
+    """The packs installed in a directory, each read on first use"""
+    def __init__(self, directory=PACKS_DIR):
+        self.directory = directory
+        self._installed = None
+        self._packs = {}
+        self._codes = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def installed_languages(self):
+        """Names of the installed packs, from the directory listing alone"""
+        if self._installed is None:
+            self._installed = frozenset(os.path.splitext(name)[0] for name in os.listdir(self.directory)
+                                        if name.endswith(".json"))
+        return self._installed
+
+    def get(self, language):
+        """The pack of language (case-insensitive), or None if none is installed or it is invalid"""
+        language = (language or BASE_LANGUAGE).lower()
+        if language not in self.installed_languages():
+            return None
+        if language not in self._packs:
+            base = None if language == BASE_LANGUAGE else self.get(BASE_LANGUAGE)
+            with self._lock:
+                if language not in self._packs:
+                    try:
+                        self._packs[language] = load_pack(language, base, self.directory)
+                    except LanguagePackError as e:
+                        # Without the base pack nothing can be rendered at all
+                        if base is None:
+                            raise
+                        logging.error(f"Language pack {language} not loaded: {e}")
+                        self._packs[language] = None
+        return self._packs[language]
+
+    def _pack_codes(self):
+        """{installed language: {kind: code}}, built once from the packs' codes alone"""
+        if self._codes is None:
+            with self._lock:
+                loaded = dict(self._packs)
+            codes = {}
+            for language in sorted(self.installed_languages()):
+                if language in loaded:
+                    pack = loaded[language]
+                    if pack is not None:
+                        codes[language] = dict(zip(CODE_KINDS, (pack.translate_code, pack.tts_code, pack.stt_code)))
+                    continue
+                try:
+                    codes[language] = read_codes(language, self.directory)
+                except LanguagePackError as e:
+                    logging.error(f"Language pack {language} not indexed: {e}")
+            index = {}
+            for language, pack_codes in codes.items():
+                for kind in ("translate", "tts"):
+                    index.setdefault(pack_codes[kind].lower(), language)
+            self._index = index
+            self._codes = codes
+        return self._codes
+
+    def _code_index(self):
+        """translate or tts code -> installed language"""
+        self._pack_codes()
+        return self._index
+
+    def _usable(self, language):
+        # A pack found invalid when it was loaded serves no code
+        with self._lock:
+            return not (language in self._packs and self._packs[language] is None)
+
+    def translate_codes(self):
+        """{language: translate code} for the installed packs, without loading them"""
+        return {language: codes["translate"] for language, codes in self._pack_codes().items()
+                if self._usable(language)}
+
+    def language_for_code(self, code):
+        """The installed language whose translate or tts code is code, or None"""
+        language = self._code_index().get((code or "").lower())
+        if language is None or not self._usable(language):
+            return None
+        return language
+
+    def loaded_languages(self):
+        with self._lock:
+            return sorted(language for language, pack in self._packs.items() if pack is not None)
+
+
+packs = PackRegistry()
+
+
+def installed_languages():
+    return packs.installed_languages()
+
+
+def get_pack(language):
+    return packs.get(language)
+
+
+def pack_for(language):
+    """The pack of language, or the base pack for languages without a usable one"""
+    return packs.get(language) or packs.get(BASE_LANGUAGE)
+
+
+def needs_translation(language):
+    """
+    True if language has a pack other than the base pack, so its summaries need the
+    translation service (see LanguagePack.localized for whether it has templates)
+    """
+    return pack_for(language).base is not None
+
+
+def language_for_code(code):
+    return packs.language_for_code(code)
+
+
+def translate_codes():
+    return packs.translate_codes()
@@ -0,0 +1,304 @@
+"""
+Concurrent synthetic load generator for multi-turn consultations.
+
+Each virtual user signs up, logs in with its own session cookie and follows the real
+/chatbot protocol: initial symptoms (text or voice), one request per follow-up answer
+(echoing is_follow_up, current_question_index, all_questions and original_symptoms)
+and the final request that generates and saves the summary. Latencies are recorded
+per step and reported as percentiles and histograms.
+
+Run against the Flask app in-process (translation/TTS/STT replaced by local stubs):
+
+    python load_generator.py --users 2000 --concurrency 200 --telugu-ratio 0.3 --voice-input-ratio 0.2
+
+or against a running deployment over HTTP:
+
+    python load_generator.py --url https://localhost:5001 --users 500 --concurrency 50
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import ssl
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib import request as urllib_request
+from urllib.error import HTTPError
+
+# Keep load-test users out of the real database; must be set before importing auth
+os.environ.setdefault('USERS_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='chatbot-load-'), 'users.db'))
+
+from benchmark_chatbot import SAMPLE_ANSWERS, SAMPLE_SYMPTOMS, percentile
+
+STEPS = ("signup", "login", "initial", "follow_up", "summary")
+# Histogram bucket upper bounds in milliseconds
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+LOAD_PASSWORD = "load-test-password"
+
+
+class StepStats:
+    """Thread-safe latency samples and error counts for each consultation step"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.tiers = {}
+
+    def record(self, step, seconds, ok=True):
+        with self._lock:
+            self.samples[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def record_tier(self, tier):
+        """Count the quality-of-service tier a response was served at"""
+        with self._lock:
+            self.tiers[tier] = self.tiers.get(tier, 0) + 1
+
+    def summary(self):
+        report = {}
+        for step in STEPS:
+            samples = sorted(self.samples[step])
+            if not samples:
+                continue
+            counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+            for seconds in samples:
+                millis = seconds * 1000
+                index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if millis <= bound),
+                             len(HISTOGRAM_BOUNDS_MS))
+                counts[index] += 1
+            report[step] = {
+                "count": len(samples),
+                "errors": self.errors[step],
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+                "histogram": {
+                    (f"<={bound}ms" if i < len(HISTOGRAM_BOUNDS_MS) else f">{HISTOGRAM_BOUNDS_MS[-1]}ms"): count
+                    for i, (bound, count) in enumerate(zip(HISTOGRAM_BOUNDS_MS + (None,), counts))
+                }
+            }
+        return report
+
+
+class InProcessTransport:
+    """Talks to the Flask app through a test client; one cookie jar per virtual user"""
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def post_json(self, path, payload):
+        response = self.client.post(path, json=payload)
+        if response.mimetype == 'application/json':
+            return response.status_code, response.get_json()
+        return response.status_code, None
+
+
+class _AnyTransportCookiePolicy(DefaultCookiePolicy):
+    """Return Secure session cookies over plain http so local deployments can be targeted"""
+    def return_ok_secure(self, cookie, request):
+        return True
+
+
+class HttpTransport:
+    """Talks to a running server over HTTP(S) with a private cookie jar"""
+    def __init__(self, base_url, verify_tls=True, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        handlers = [urllib_request.HTTPCookieProcessor(CookieJar(policy=_AnyTransportCookiePolicy()))]
+        if not verify_tls:
+            handlers.append(urllib_request.HTTPSHandler(context=ssl._create_unverified_context()))
+        self.opener = urllib_request.build_opener(*handlers)
+
+    def post_json(self, path, payload):
+        req = urllib_request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                body = response.read()
+                if response.headers.get_content_type() == 'application/json':
+                    return response.status, json.loads(body)
+                return response.status, None
+        except HTTPError as e:
+            return e.code, None
+
+
+def synthetic_recording(seconds=2.0, sample_rate=44100, seed=0):
+    """Base64 16-bit PCM noise in the format the /chatbot voice path expects"""
+    frames = random.Random(seed).randbytes(int(seconds * sample_rate) * 2)
+    return base64.b64encode(frames).decode('ascii')
+
+
+def run_virtual_user(transport_factory, user_number, config, stats, run_id, rng):
+    """Run one complete consultation and record the latency of every step"""
+    transport = transport_factory()
+    username = f"load-{run_id}-{user_number}"
+    language = "telugu" if rng.random() < config.telugu_ratio else "english"
+    voice_input = rng.random() < config.voice_input_ratio
+    voice_output = rng.random() < config.voice_output_ratio
+
+    def timed(step, path, payload, expect=200):
+        start = time.perf_counter()
+        try:
+            status, data = transport.post_json(path, payload)
+        except Exception:
+            stats.record(step, time.perf_counter() - start, ok=False)
+            return None, None
+        stats.record(step, time.perf_counter() - start, ok=(status == expect))
+        if isinstance(data, dict) and "qos_tier" in data:
+            stats.record_tier(data["qos_tier"])
+        return status, data
+
+    credentials = {'username': username, 'password': LOAD_PASSWORD}
+    timed("signup", '/auth/signup', credentials, expect=201)
+    status, _ = timed("login", '/auth/login', credentials)
+    if status != 200:
+        return False
+
+    payload = {"language": language, "input_type": "text", "symptoms": rng.choice(SAMPLE_SYMPTOMS)}
+    if voice_input:
+        payload.update({"input_type": "voice", "audio": config.recording})
+    status, data = timed("initial", '/chatbot', payload)
+    if status != 200 or not data:
+        return False
+
+    # Follow the protocol with client-side state, as the browser does; voice replies
+    # to follow-ups come back as audio rather than JSON
+    all_questions = data["all_questions"]
+    original_symptoms = data["original_symptoms"]
+    follow_up_answers = []
+    index = data["current_question_index"]
+    while True:
+        answer = rng.choice(SAMPLE_ANSWERS)
+        last = index + 1 >= len(all_questions)
+        status, data = timed("summary" if last else "follow_up", '/chatbot', {
+            "language": language,
+            "input_type": "text",
+            "is_follow_up": True,
+            "current_question_index": index,
+            "all_questions": all_questions,
+            "original_symptoms": original_symptoms,
+            "follow_up_answers": follow_up_answers,
+            "answer": answer,
+            "voice_response": voice_output
+        })
+        if status != 200:
+            return False
+        follow_up_answers.append({"question": all_questions[index]["question"], "answer": answer})
+        if last:
+            return bool(data and "summary_sheet" in data)
+        index += 1
+        if config.think_time:
+            time.sleep(rng.uniform(0, config.think_time))
+
+
+def run_load(config):
+    """Run config.users virtual users with at most config.concurrency in flight"""
+    stats = StepStats()
+    run_id = uuid.uuid4().hex[:8]
+    config.recording = synthetic_recording()
+
+    if config.url:
+        def transport_factory():
+            return HttpTransport(config.url, verify_tls=not config.insecure)
+        stubs = None
+    else:
+        from stub_backends import install_stub_backends
+        from Ai_Healthcare_Chatbot import app
+
+        def transport_factory():
+            return InProcessTransport(app)
+        stubs = install_stub_backends(translate_latency=config.translate_latency,
+                                      tts_latency=config.tts_latency,
+                                      stt_latency=config.stt_latency)
+
+    completed = 0
+    start = time.perf_counter()
+    if stubs:
+        stubs.__enter__()
+    try:
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+            futures = []
+            for user_number in range(config.users):
+                rng = random.Random(config.seed * 1000003 + user_number)
+                futures.append(executor.submit(run_virtual_user, transport_factory, user_number,
+                                               config, stats, run_id, rng))
+                if config.ramp_up:
+                    time.sleep(config.ramp_up / config.users)
+            for future in futures:
+                try:
+                    completed += bool(future.result())
+                except Exception as e:
+                    print(f"Virtual user failed: {e}", file=sys.stderr)
+    finally:
+        if stubs:
+            stubs.__exit__(None, None, None)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "users": config.users,
+        "concurrency": config.concurrency,
+        "completed_consultations": completed,
+        "elapsed_seconds": round(elapsed, 2),
+        "consultations_per_second": round(completed / elapsed, 2) if elapsed else 0.0,
+        "steps": stats.summary(),
+        "qos_tiers": dict(stats.tiers)
+    }
+
+
+def print_report(report):
+    print(f"\n{report['completed_consultations']}/{report['users']} consultations completed in "
+          f"{report['elapsed_seconds']}s ({report['consultations_per_second']}/s, "
+          f"concurrency {report['concurrency']})")
+    print(f"\n{'Step':<12}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, row in report["steps"].items():
+        print(f"{step:<12}{row['count']:>8}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}")
+    if report["qos_tiers"]:
+        print("\nResponses per QoS tier: " + ", ".join(f"{tier} {count}" for tier, count in report["qos_tiers"].items()))
+    for step, row in report["steps"].items():
+        print(f"\n{step} latency histogram")
+        peak = max(row["histogram"].values()) or 1
+        for bucket, count in row["histogram"].items():
+            if count:
+                print(f"  {bucket:>9} {count:>7} {'#' * max(1, int(40 * count / peak))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent multi-turn consultations")
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process app with stub backends)')
+    parser.add_argument('--insecure', action='store_true', help='Skip TLS certificate verification')
+    parser.add_argument('--users', type=int, default=100, help='Number of virtual users')
+    parser.add_argument('--concurrency', type=int, default=20, help='Virtual users running at once')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which to start users')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Maximum pause between answers (seconds)')
+    parser.add_argument('--telugu-ratio', type=float, default=0.0, help='Fraction of users consulting in Telugu')
+    parser.add_argument('--voice-input-ratio', type=float, default=0.0, help='Fraction of users speaking symptoms')
+    parser.add_argument('--voice-output-ratio', type=float, default=0.0, help='Fraction of users requesting audio replies')
+    parser.add_argument('--translate-latency', type=float, default=0.0, help='Stub translator delay per call (seconds)')
+    parser.add_argument('--tts-latency', type=float, default=0.0, help='Stub TTS delay per call (seconds)')
+    parser.add_argument('--stt-latency', type=float, default=0.0, help='Stub STT delay per call (seconds)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the report as JSON')
+    config = parser.parse_args(argv)
+
+    report = run_load(config)
+    print_report(report)
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2)
+    return 0 if report["completed_consultations"] == config.users else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Message-queue adapter for running the Socket.IO server in several worker processes.
+
+With more than one worker, an event emitted in one process may be addressed to a client
+connected to another. python-socketio solves this with a pub/sub client manager: every
+emit is published to a message queue and each worker delivers the events for its own
+clients. Production deployments use Redis (SOCKETIO_MESSAGE_QUEUE=redis://host:6379/0)
+or any other URL Flask-SocketIO supports. For local testing there are two stand-ins:
+
+    local://                     in-process broker (several managers in one process)
+    local:///tmp/chatbot.sock    broker on a Unix socket, shared by processes on one host
+
+Start the socket broker with:
+
+    python message_broker.py --path /tmp/chatbot.sock
+
+The socket broker forwards every frame to every subscriber. Frames are a 4-byte length
+followed by a pickled message; each connection first sends a frame naming its role
+(publisher or subscriber), like the pickled payloads of the Redis and Kombu managers.
+The socket is created with owner-only permissions. The broker is not meant to replace
+Redis across hosts.
+"""
+import argparse
+import logging
+import os
+import pickle
+import queue
+import socket
+import struct
+import threading
+import time
+
+from socketio import PubSubManager
+
+FRAME_HEADER = struct.Struct('!I')
+# First frame on every broker connection
+PUBLISHER, SUBSCRIBER = b'P', b'S'
+RECONNECT_DELAY = 1.0
+
+
+def _read_exact(conn, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Broker connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def read_frame(conn):
+    (size,) = FRAME_HEADER.unpack(_read_exact(conn, FRAME_HEADER.size))
+    return _read_exact(conn, size)
+
+
+def write_frame(conn, payload):
+    conn.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+class InProcessBroker:
+    """Fan-out to every subscriber queue in this process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self):
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+
+in_process_broker = InProcessBroker()
+
+
+class LocalBroker:
+    """Unix-socket broker that forwards every published frame to all subscribers"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connections = set()
+        # Subscriber connection -> lock serializing frames written to it
+        self._subscribers = {}
+        self._server = None
+
+    def start(self):
+        """Listen on the socket path and serve connections in background threads"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._server.listen(128)
+        threading.Thread(target=self._accept_loop, name='broker-accept', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._subscribers.clear()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _accept_loop(self):
+        while self._server is not None:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), name='broker-conn', daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            if read_frame(conn) == SUBSCRIBER:
+                with self._lock:
+                    self._subscribers[conn] = threading.Lock()
+                # Subscribers only receive; wait here until they disconnect
+                while conn.recv(4096):
+                    pass
+                return
+            while True:
+                payload = read_frame(conn)
+                with self._lock:
+                    targets = list(self._subscribers.items())
+                for target, target_lock in targets:
+                    try:
+                        with target_lock:
+                            write_frame(target, payload)
+                    except OSError:
+                        pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(conn)
+                self._subscribers.pop(conn, None)
+            conn.close()
+
+
+class LocalBrokerManager(PubSubManager):
+    """Socket.IO client manager using the in-process or Unix-socket broker"""
+    name = 'localbroker'
+
+    def __init__(self, url='local://', channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = url[len('local://'):] or None
+        self._publish_lock = threading.Lock()
+        self._publish_conn = None
+        # Subscribe up front so messages published before the listener starts are kept
+        self._subscriber = in_process_broker.subscribe() if self.path is None and not write_only else None
+
+    def _connect(self, role):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.path)
+        write_frame(conn, role)
+        return conn
+
+    def _publish(self, data):
+        if self.path is None:
+            in_process_broker.publish(data)
+            return
+        payload = pickle.dumps(data)
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_conn is None:
+                        self._publish_conn = self._connect(PUBLISHER)
+                    write_frame(self._publish_conn, payload)
+                    return
+                except OSError:
+                    if self._publish_conn is not None:
+                        self._publish_conn.close()
+                    self._publish_conn = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        if self.path is None:
+            return self._listen_in_process()
+        return self._listen_socket()
+
+    def _listen_in_process(self):
+        while True:
+            yield self._subscriber.get()
+
+    def _listen_socket(self):
+        while True:
+            try:
+                conn = self._connect(SUBSCRIBER)
+            except OSError as e:
+                logging.error(f"Cannot reach message broker at {self.path}: {e}")
+                time.sleep(RECONNECT_DELAY)
+                continue
+            try:
+                while True:
+                    yield pickle.loads(read_frame(conn))
+            except (ConnectionError, OSError):
+                logging.warning("Message broker connection lost, reconnecting")
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                conn.close()
+
+
+def message_queue_options(url=None):
+    """SocketIO.init_app keyword arguments for SOCKETIO_MESSAGE_QUEUE (or url)"""
+    url = url if url is not None else os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalBrokerManager(url)}
+    return {'message_queue': url}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local Socket.IO message broker")
+    parser.add_argument('--path', default='/tmp/chatbot-socketio.sock', help='Unix socket path')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    broker = LocalBroker(args.path).start()
+    logging.info(f"Message broker listening on {args.path} (SOCKETIO_MESSAGE_QUEUE=local://{args.path})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
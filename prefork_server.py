@@ -0,0 +1,322 @@
+"""
+Prefork launcher.
+
+    python -m prefork_server serve --workers 4 --port 8001
+    python -m prefork_server serve --app Ai_Healthcare_Chatbot_optimized:app --workers 8
+
+The master process imports the app once. That loads the symptom catalogue, the
+precomputed question plans and translations and the compiled patterns, and warms the
+triage caches. It then freezes the garbage collector's view of those objects
+(gc.freeze) so that collections in the workers do not write to pages shared with the
+master. Workers are forked from the master and all accept connections on the same
+listening socket, so the preloaded data is shared copy-on-write. Workers that exit
+unexpectedly are restarted. Every --report-interval seconds the master logs each
+worker's RSS and PSS from /proc so the sharing can be checked: a low PSS next to a
+high RSS means most pages are still shared.
+
+The workers are gunicorn's: gthread workers (--threads per worker), or sync workers
+with --no-threads, with the preloaded app. Threaded workers also serve Socket.IO's
+websocket transport. gunicorn is optional. Without it, or with --server werkzeug, the
+master forks its own workers running werkzeug's development server, which is not
+meant for production traffic; use that only for local runs and memory measurements.
+The werkzeug master also logs the memory report on SIGUSR1.
+
+Socket.IO long-polling needs every request of a session to reach the same worker, but
+workers share one socket. Socket.IO clients of a prefork server must therefore connect
+with the websocket transport only. With more than one worker, the master also starts
+a local message broker for cross-worker events unless SOCKETIO_MESSAGE_QUEUE is set
+(see message_broker).
+"""
+import argparse
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import gunicorn
+except ImportError:
+    gunicorn = None
+
+# Workers that exit within this many seconds of starting are restarted after a delay
+MIN_WORKER_LIFETIME = 1.0
+RESTART_DELAY = 1.0
+
+
+def load_app(spec):
+    """Import 'module:attribute' and return the WSGI app"""
+    module_name, _, attribute = spec.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute or 'app')
+
+
+def preload(spec):
+    """Import the app in the master and warm everything workers should share"""
+    app = load_app(spec)
+    app.config.update(DEBUG=False, TEMPLATES_AUTO_RELOAD=False)
+
+    from symptom_catalogue import common_symptoms
+    from triage_engine import ask_follow_up, generate_summary
+    for symptom in common_symptoms:
+        for language in ("english", "telugu"):
+            ask_follow_up(symptom, language)
+        generate_summary(symptom)
+
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def memory_usage(pid):
+    """RSS, PSS and shared/private sizes in KB from /proc/<pid>/smaps_rollup"""
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fp:
+            for line in fp:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    usage[key.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def log_memory(workers):
+    """Log the master's and each (label, pid, started) worker's memory"""
+    master = memory_usage(os.getpid())
+    logging.info(f"master pid {os.getpid()}: rss {master.get('rss', 0)} KB, pss {master.get('pss', 0)} KB")
+    for label, pid, started in workers:
+        usage = memory_usage(pid)
+        shared = usage.get('shared_clean', 0) + usage.get('shared_dirty', 0)
+        private = usage.get('private_clean', 0) + usage.get('private_dirty', 0)
+        logging.info(f"worker {label} pid {pid}: rss {usage.get('rss', 0)} KB, pss {usage.get('pss', 0)} KB, "
+                     f"shared {shared} KB, private {private} KB, up {int(time.time() - started)}s")
+
+
+def exit_with_master():
+    """Exit this child process when the master goes away instead of running orphaned"""
+    master_pid = os.getppid()
+
+    def watch():
+        while os.getppid() == master_pid:
+            time.sleep(1)
+        os._exit(0)
+    threading.Thread(target=watch, name='master-watch', daemon=True).start()
+
+
+def start_broker():
+    """Fork a message broker process; returns (pid, SOCKETIO_MESSAGE_QUEUE url)"""
+    path = os.path.join(tempfile.mkdtemp(prefix='chatbot-prefork-'), 'broker.sock')
+    pid = os.fork()
+    if pid == 0:
+        from message_broker import LocalBroker
+        LocalBroker(path).start()
+        signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+        exit_with_master()
+        while True:
+            time.sleep(3600)
+    deadline = time.time() + 5
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    return pid, f"local://{path}"
+
+
+def run_worker(app, listener, threaded):
+    """Serve requests on the inherited listening socket until SIGTERM"""
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    exit_with_master()
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, threaded=threaded, fd=listener.fileno())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class Master:
+    """Forks workers on a shared socket, restarts them and reports their memory"""
+    def __init__(self, app, listener, workers, threaded=True, report_interval=60):
+        self.app = app
+        self.listener = listener
+        self.workers = workers
+        self.threaded = threaded
+        self.report_interval = report_interval
+        self.children = {}
+        self.running = True
+        self.report_requested = False
+
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.app, self.listener, self.threaded)
+            except SystemExit:
+                pass
+            except Exception as e:
+                logging.error(f"Worker {os.getpid()} failed: {e}")
+                os._exit(1)
+            os._exit(0)
+        self.children[pid] = (slot, time.time())
+        logging.info(f"Worker {slot} started (pid {pid})")
+
+    def report(self):
+        log_memory(sorted(((slot, pid, started) for pid, (slot, started) in self.children.items()),
+                          key=lambda worker: worker[0]))
+
+    def stop(self, signum=None, frame=None):
+        self.running = False
+
+    def request_report(self, signum=None, frame=None):
+        self.report_requested = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.request_report)
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        next_report = time.time() + self.report_interval
+        while self.running:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid and pid in self.children:
+                slot, started = self.children.pop(pid)
+                logging.warning(f"Worker {slot} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+                if self.running:
+                    if time.time() - started < MIN_WORKER_LIFETIME:
+                        time.sleep(RESTART_DELAY)
+                    self.spawn(slot)
+                continue
+            if self.report_requested or (self.report_interval and time.time() >= next_report):
+                self.report_requested = False
+                next_report = time.time() + self.report_interval
+                self.report()
+            time.sleep(0.2)
+
+        logging.info("Stopping workers")
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in list(self.children):
+            os.waitpid(pid, 0)
+        self.children.clear()
+
+
+def run_gunicorn(app, args):
+    """Serve the preloaded app with gunicorn's arbiter and workers"""
+    from gunicorn.app.base import BaseApplication
+
+    started = {}
+
+    def when_ready(server):
+        if not args.report_interval:
+            return
+
+        def report():
+            while True:
+                time.sleep(args.report_interval)
+                workers = sorted((worker.age, pid, started.get(worker.age, time.time()))
+                                 for pid, worker in list(server.WORKERS.items()))
+                log_memory(workers)
+        threading.Thread(target=report, name='memory-report', daemon=True).start()
+
+    # Runs in the master; workers are told apart by their age (spawn count)
+    def pre_fork(server, worker):
+        started[worker.age] = time.time()
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": [f"{args.host}:{args.port}"],
+                "workers": args.workers,
+                "worker_class": "sync" if args.no_threads else "gthread",
+                "threads": args.threads,
+                "backlog": args.backlog,
+                "preload_app": True,
+                "when_ready": when_ready,
+                "pre_fork": pre_fork
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    PreloadedApplication().run()
+
+
+def serve(args):
+    broker_pid = None
+    if args.workers > 1 and not os.getenv('SOCKETIO_MESSAGE_QUEUE'):
+        # Must happen before the app is imported, since SocketIO reads it in init_app
+        broker_pid, broker_url = start_broker()
+        os.environ['SOCKETIO_MESSAGE_QUEUE'] = broker_url
+
+    app = preload(args.app)
+    if args.workers > 1:
+        logging.info("Socket.IO clients must use the websocket transport with several workers")
+    if args.server == 'gunicorn' or (args.server == 'auto' and gunicorn is not None):
+        try:
+            run_gunicorn(app, args)
+        finally:
+            stop_broker(broker_pid)
+        return
+
+    logging.warning("Serving with werkzeug's development server; install gunicorn for production traffic")
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog, reuse_port=False)
+    listener.set_inheritable(True)
+    logging.info(f"Serving {args.app} on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        Master(app, listener, args.workers, threaded=not args.no_threads,
+               report_interval=args.report_interval).run()
+    finally:
+        listener.close()
+        stop_broker(broker_pid)
+
+
+def stop_broker(pid):
+    if pid:
+        os.kill(pid, signal.SIGTERM)
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m prefork_server', description="Prefork server")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='Run the app with forked workers on one port')
+    serve_parser.add_argument('--app', default='Ai_Healthcare_Chatbot:app', help='module:attribute of the Flask app')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8001)))
+    serve_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    serve_parser.add_argument('--backlog', type=int, default=1024, help='Listen backlog of the shared socket')
+    serve_parser.add_argument('--server', choices=('auto', 'gunicorn', 'werkzeug'), default='auto',
+                              help='Worker server (default: gunicorn when installed, else werkzeug for development)')
+    serve_parser.add_argument('--threads', type=int, default=8, help='Request threads per gunicorn worker')
+    serve_parser.add_argument('--no-threads', action='store_true', help='Handle one request at a time per worker')
+    serve_parser.add_argument('--report-interval', type=float, default=60.0,
+                              help='Seconds between worker memory reports (0 to report only on SIGUSR1)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+    if args.command == 'serve':
+        serve(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Load-aware quality-of-service tiers for the voice and translation features.
+
+Each request gets a degradation tier. The tier is chosen from how loaded the server is
+right now:
+
+    full                translate and synthesize speech as usual
+    skip_tts            translate, but send text instead of synthesized audio
+    cached_translation  translate only from the translation cache (misses stay English)
+    bilingual_fallback  English summary with the pre-translated Telugu precautions
+    text_only           English text only
+
+For a language pack with templates (language_packs), summaries are rendered locally in
+every tier, and the tiers only limit translating the user's own words.
+
+Load is measured as a pressure value. It is the highest of these, each relative to its
+target:
+- mean translation latency over the last QOS_WINDOW seconds (QOS_TRANSLATE_TARGET),
+- mean TTS latency over the same window (QOS_TTS_TARGET),
+- utilization of the queues registered with add_queue_source.
+
+Latencies come from the request_tracing stages, so REQUEST_TRACING must be on for them
+to count. A tier is entered when the pressure reaches its threshold. It is left only
+when the pressure falls below 70% of that threshold and the tier has been held for
+QOS_MIN_DWELL seconds, so the tier does not flap. Degraded tiers stop calling the slow
+backend, which empties its latency window. The tier then steps down one level at a
+time, and each step probes the backend again.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from request_tracing import add_stage_listener, register_metric
+
+TIERS = ("full", "skip_tts", "cached_translation", "bilingual_fallback", "text_only")
+# Pressure at which each tier is entered
+ENTER_PRESSURE = (0.0, 1.0, 1.5, 2.0, 3.0)
+EXIT_RATIO = 0.7
+
+WINDOW = float(os.getenv('QOS_WINDOW', 30))
+MIN_DWELL = float(os.getenv('QOS_MIN_DWELL', 5))
+LATENCY_TARGETS = {
+    "voice.translate_text": float(os.getenv('QOS_TRANSLATE_TARGET', 5.0)),
+    "voice.text_to_speech": float(os.getenv('QOS_TTS_TARGET', 1.5)),
+    "voice.process_voice_output": float(os.getenv('QOS_TTS_TARGET', 1.5))
+}
+# Re-evaluate the tier at most this often
+EVALUATE_INTERVAL = 0.5
+QOS_ENABLED = os.getenv('QOS_CONTROL', '1').lower() not in ('0', 'false', 'no')
+
+
+class QosController:
+    """Chooses the degradation tier from recent latencies and queue utilization"""
+    def __init__(self, window=WINDOW, min_dwell=MIN_DWELL, latency_targets=None):
+        self.window = window
+        self.min_dwell = min_dwell
+        self.latency_targets = dict(latency_targets or LATENCY_TARGETS)
+        self._lock = threading.Lock()
+        self._samples = {stage: deque() for stage in self.latency_targets}
+        self._queue_sources = []
+        self.level = 0
+        self.pressure = 0.0
+        self.changed_at = time.monotonic()
+        self.evaluated_at = 0.0
+        self.selected = {tier: 0 for tier in TIERS}
+
+    def record(self, stage, seconds):
+        """Stage listener: keep latencies of the stages that drive QoS"""
+        samples = self._samples.get(stage)
+        if samples is not None:
+            with self._lock:
+                samples.append((time.monotonic(), seconds))
+
+    def add_queue_source(self, utilization):
+        """Register a callable returning queue utilization (1.0 = full)"""
+        self._queue_sources.append(utilization)
+
+    def current_pressure(self, now):
+        pressure = 0.0
+        cutoff = now - self.window
+        with self._lock:
+            for stage, samples in self._samples.items():
+                while samples and samples[0][0] < cutoff:
+                    samples.popleft()
+                if samples:
+                    mean = sum(seconds for _, seconds in samples) / len(samples)
+                    pressure = max(pressure, mean / self.latency_targets[stage])
+        for utilization in self._queue_sources:
+            # A full queue counts as entering cached_translation: new translations would only
+            # wait behind the backlog, so they are served from the cache
+            pressure = max(pressure, utilization() * ENTER_PRESSURE[2])
+        return pressure
+
+    def evaluate(self, now=None):
+        """Jump up to the tier the pressure calls for; step down one tier at a time"""
+        now = time.monotonic() if now is None else now
+        pressure = self.current_pressure(now)
+        with self._lock:
+            self.pressure = pressure
+            self.evaluated_at = now
+            target = max(level for level, threshold in enumerate(ENTER_PRESSURE) if pressure >= threshold)
+            if target > self.level:
+                self.level = target
+                self.changed_at = now
+            elif (self.level > 0 and pressure < ENTER_PRESSURE[self.level] * EXIT_RATIO
+                  and now - self.changed_at >= self.min_dwell):
+                self.level -= 1
+                self.changed_at = now
+            return self.level
+
+    def select_tier(self):
+        """Tier for the current request"""
+        if not QOS_ENABLED:
+            return TIERS[0]
+        now = time.monotonic()
+        level = self.evaluate(now) if now - self.evaluated_at >= EVALUATE_INTERVAL else self.level
+        tier = TIERS[level]
+        self.selected[tier] += 1
+        return tier
+
+    def register_metrics(self, prefix="chatbot_qos"):
+        register_metric(f"{prefix}_tier", "gauge", "Current degradation tier (0 = full).", lambda: self.level)
+        register_metric(f"{prefix}_pressure", "gauge", "Load pressure driving the tier (1.0 = at target).",
+                        lambda: round(self.pressure, 3))
+        register_metric(f"{prefix}_requests_total", "counter", "Requests served per degradation tier.",
+                        lambda: [({"tier": tier}, count) for tier, count in self.selected.items()])
+
+
+def tier_allows_tts(tier):
+    return tier == "full"
+
+
+qos = QosController()
+add_stage_listener(qos.record)
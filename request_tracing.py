@@ -0,0 +1,194 @@
+"""
+Lightweight per-stage request tracing.
+
+Stages are timed with `span(name)` (or the `traced(name)` decorator). Each finished span
+is added to an in-memory histogram for its stage and, inside a Flask request, to that
+request's Server-Timing header. Histograms, plus any gauges and counters registered with
+`register_metric`, are exposed in Prometheus text format on /metrics by `init_tracing(app)`.
+
+Set REQUEST_TRACING=0 to disable tracing; spans then become a shared no-op object.
+"""
+import functools
+import os
+import threading
+import time
+
+try:
+    from flask import Response, g, has_request_context, request
+except ImportError:
+    # Worker processes and CLIs can use the timers without Flask installed
+    Response = g = request = None
+
+    def has_request_context():
+        return False
+
+TRACING_ENABLED = os.getenv('REQUEST_TRACING', '1').lower() not in ('0', 'false', 'no')
+
+# Histogram bucket upper bounds in seconds
+HISTOGRAM_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_METRIC = "chatbot_stage_duration_seconds"
+
+
+class StageHistogram:
+    """Cumulative-bucket latency histogram for one stage"""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(HISTOGRAM_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_stage_listeners = []
+
+
+def add_stage_listener(callback):
+    """Call callback(stage, seconds) for every finished stage"""
+    _stage_listeners.append(callback)
+
+
+def _record(stage, seconds):
+    with _histograms_lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = StageHistogram()
+        histogram.observe(seconds)
+    for listener in _stage_listeners:
+        listener(stage, seconds)
+
+
+def observe(stage, seconds):
+    """Record a finished stage in its histogram and the current request's timings"""
+    _record(stage, seconds)
+    if has_request_context():
+        g.setdefault('_server_timings', []).append((stage, seconds))
+
+
+class _Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(stage):
+    """Context manager timing one stage of the current request"""
+    if not TRACING_ENABLED:
+        return NOOP_SPAN
+    return _Span(stage)
+
+
+def traced(stage):
+    """Decorator timing every call of the wrapped function as a stage"""
+    def decorator(func):
+        if not TRACING_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_metrics = {}
+
+
+def register_metric(name, kind, help_text, callback):
+    """Export a gauge or counter on /metrics; callback returns a number or (labels, value) pairs"""
+    _metrics[name] = (kind, help_text, callback)
+
+
+def _format_labels(labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels.items())) + '}' if labels else ''
+
+
+def server_timing_header(timings):
+    """Format (stage, seconds) pairs as a Server-Timing header value"""
+    return ', '.join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings)
+
+
+def render_metrics():
+    """Render all stage histograms in Prometheus text exposition format"""
+    with _histograms_lock:
+        snapshot = {stage: (list(h.counts), h.total, h.count) for stage, h in _histograms.items()}
+
+    lines = [
+        f"# HELP {STAGE_METRIC} Time spent in each request processing stage.",
+        f"# TYPE {STAGE_METRIC} histogram"
+    ]
+    for stage in sorted(snapshot):
+        counts, total, count = snapshot[stage]
+        cumulative = 0
+        for bound, bucket_count in zip(HISTOGRAM_BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'{STAGE_METRIC}_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{STAGE_METRIC}_count{{stage="{stage}"}} {count}')
+
+    for name in sorted(_metrics):
+        kind, help_text, callback = _metrics[name]
+        value = callback()
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        samples = [({}, value)] if isinstance(value, (int, float)) else value
+        for labels, sample in samples:
+            lines.append(f"{name}{_format_labels(labels)} {sample}")
+    return '\n'.join(lines) + '\n'
+
+
+def init_tracing(app):
+    """Time every request, add Server-Timing headers and register the /metrics endpoint"""
+    if TRACING_ENABLED:
+        @app.before_request
+        def _start_request_timer():
+            g._request_started = time.perf_counter()
+
+        @app.after_request
+        def _add_server_timing(response):
+            timings = g.get('_server_timings', [])
+            started = g.get('_request_started')
+            if started is not None:
+                elapsed = time.perf_counter() - started
+                _record(f"http.{request.endpoint or 'unmatched'}", elapsed)
+                timings.append(('total', elapsed))
+            if timings:
+                response.headers['Server-Timing'] = server_timing_header(timings)
+            return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
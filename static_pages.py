@@ -0,0 +1,126 @@
+"""
+Pre-rendered HTML pages and fingerprinted static assets.
+
+The home, chat, login, signup and profile pages have no per-request content. They are
+rendered once at startup and kept with gzip (and brotli, if installed) variants. Each
+request picks a variant by Accept-Encoding. The response carries a strong ETag per
+variant and Vary: Accept-Encoding, and a matching If-None-Match gets 304. Pages are
+sent with Cache-Control: no-cache: browsers revalidate them, which costs a 304 and no
+body when nothing has changed.
+
+Files in the app's static folder can be linked with asset_url('css/app.css') from
+templates. That gives /assets/<content hash>/css/app.css, which is cached as immutable
+for SEND_FILE_MAX_AGE_DEFAULT (one year if unset) because a changed file gets a new
+URL. Text assets are served compressed in the same way as pages.
+
+In debug mode, or when a template cannot be rendered at startup, pages are rendered
+on every request as before.
+"""
+import logging
+import mimetypes
+import os
+
+from flask import Response, abort, current_app, render_template, request, send_from_directory
+from jinja2 import TemplateNotFound
+from werkzeug.security import safe_join
+
+from http_compression import content_hash, negotiate_encoding, precompress
+
+PAGES = ("home.html", "index.html", "login.html", "signup.html", "profile.html")
+ASSET_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+_pages = {}
+_assets = {}
+
+
+class Variants:
+    """One resource with its precompressed variants and their ETags"""
+    def __init__(self, body, mimetype):
+        self.mimetype = mimetype
+        self.variants = precompress(body)
+        digest = content_hash(body)
+        self.etags = {coding: digest if coding == "identity" else f"{digest}-{coding}" for coding in self.variants}
+
+    def response(self, cache_control):
+        coding = negotiate_encoding(request.headers.get('Accept-Encoding'), tuple(self.variants))
+        etag = self.etags[coding]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[coding], mimetype=self.mimetype)
+            if coding != "identity":
+                response.headers['Content-Encoding'] = coding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def prerender_pages(app, names=PAGES):
+    """Render the static pages once and store their compressed variants"""
+    with app.test_request_context('/'):
+        for name in names:
+            try:
+                html = render_template(name)
+            except TemplateNotFound:
+                logging.warning(f"Template {name} not found; it will be rendered per request")
+                continue
+            _pages[name] = Variants(html.encode('utf-8'), 'text/html')
+
+
+def page_response(name):
+    """Pre-rendered page with content negotiation and ETag validation"""
+    page = _pages.get(name)
+    if page is None or current_app.debug:
+        return render_template(name)
+    return page.response('no-cache')
+
+
+def _asset(filename):
+    """(mtime, fingerprint, path, variants) for a static file, recomputed when it changes"""
+    # safe_join rejects paths that would leave the static folder
+    path = safe_join(current_app.static_folder or '', filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    mtime = os.stat(path).st_mtime_ns
+    cached = _assets.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as fp:
+            body = fp.read()
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        variants = Variants(body, mimetype) if mimetype.startswith(COMPRESSIBLE_TYPES) else None
+        cached = _assets[filename] = (mtime, content_hash(body)[:12], path, variants)
+    return cached
+
+
+def asset_url(filename):
+    """Fingerprinted URL of a file in the static folder"""
+    cached = _asset(filename)
+    if cached is None:
+        return f"/static/{filename}"
+    return f"/assets/{cached[1]}/{filename}"
+
+
+def serve_asset(fingerprint, filename):
+    cached = _asset(filename)
+    if cached is None:
+        abort(404)
+    _, current, _, variants = cached
+    if fingerprint != current:
+        # An old URL: serve the current file, but don't let it be cached as immutable
+        return send_from_directory(current_app.static_folder, filename, max_age=0)
+    max_age = current_app.config.get('SEND_FILE_MAX_AGE_DEFAULT') or ASSET_MAX_AGE
+    if variants is not None:
+        return variants.response(f'public, max-age={int(max_age)}, immutable')
+    response = send_from_directory(current_app.static_folder, filename, max_age=max_age)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_static_pages(app):
+    """Pre-render the pages and add the /assets route and asset_url template helper"""
+    app.add_url_rule('/assets/<fingerprint>/<path:filename>', 'assets', serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+    prerender_pages(app)
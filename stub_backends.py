@@ -0,0 +1,92 @@
+"""
+Local stand-ins for the remote translation, text-to-speech and speech-to-text backends.
+
+Used by the benchmark and load tools so that the chatbot pipeline can be exercised
+without network access. The stubs keep the interfaces of translate.Translator, gTTS
+and Recognizer.recognize_google, and can simulate a fixed backend latency.
+"""
+import time
+from contextlib import contextmanager
+
+import speech_recognition as sr
+
+import voice_language_handler
+
+# Telugu block letters used to fake translated output
+TELUGU_LETTERS = [chr(code) for code in range(0x0C15, 0x0C39)]
+DEFAULT_TRANSCRIPT = "I have fever and headache"
+
+
+def fake_translation(text):
+    """Map Latin letters onto Telugu letters so translated text looks like Telugu"""
+    return ''.join(
+        TELUGU_LETTERS[ord(char) % len(TELUGU_LETTERS)] if char.isascii() and char.isalpha() else char
+        for char in text
+    )
+
+
+def make_stub_translator(latency=0.0):
+    class StubTranslator:
+        """Drop-in replacement for translate.Translator"""
+        def __init__(self, to_lang, from_lang='en', **kwargs):
+            self.to_lang = to_lang
+            self.from_lang = from_lang
+
+        def translate(self, text):
+            if latency:
+                time.sleep(latency)
+            if self.to_lang == 'en':
+                return text
+            return fake_translation(text)
+
+    return StubTranslator
+
+
+def make_stub_tts(latency=0.0):
+    class StubTTS:
+        """Drop-in replacement for gtts.gTTS that writes a silent MP3-sized payload"""
+        def __init__(self, text, lang='en', slow=False, **kwargs):
+            self.text = text
+            self.lang = lang
+
+        def save(self, filename):
+            if latency:
+                time.sleep(latency)
+            # Roughly 1 KB of audio per 12 characters, similar to gTTS output
+            with open(filename, 'wb') as fp:
+                fp.write(b'ID3\x03\x00\x00\x00\x00\x00\x00')
+                fp.write(b'\x00' * max(1024, len(self.text) * 85))
+
+    return StubTTS
+
+
+def make_stub_recognizer(transcript=DEFAULT_TRANSCRIPT, latency=0.0):
+    def recognize_google(self, audio_data, key=None, language='en-US', **kwargs):
+        """Drop-in replacement for Recognizer.recognize_google"""
+        if latency:
+            time.sleep(latency)
+        if not audio_data.get_raw_data():
+            raise sr.UnknownValueError()
+        return transcript
+
+    return recognize_google
+
+
+@contextmanager
+def install_stub_backends(translate_latency=0.0, tts_latency=0.0, stt_latency=0.0,
+                          transcript=DEFAULT_TRANSCRIPT):
+    """Patch the voice/language backends with local stubs for the duration of the block"""
+    originals = (
+        voice_language_handler.Translator,
+        voice_language_handler.gTTS,
+        sr.Recognizer.recognize_google
+    )
+    voice_language_handler.Translator = make_stub_translator(translate_latency)
+    voice_language_handler.gTTS = make_stub_tts(tts_latency)
+    sr.Recognizer.recognize_google = make_stub_recognizer(transcript, stt_latency)
+    try:
+        yield
+    finally:
+        (voice_language_handler.Translator,
+         voice_language_handler.gTTS,
+         sr.Recognizer.recognize_google) = originals
@@ -0,0 +1,339 @@
+"""
+Symptom catalogue: symptoms, causes, severity, urgency, recommendations and bilingual
+follow-up questions, loaded from data/symptom_catalogue.json (SYMPTOM_CATALOGUE_PATH).
+
+The file is validated and compiled into a Catalogue snapshot. Compiling builds the
+symptom matchers, the question table and the precomputed question plans. At most once
+every CATALOGUE_CHECK_INTERVAL seconds, the file's mtime is checked. When the file has
+changed, a new snapshot is built and swapped in with a single assignment. A request
+that already holds a snapshot from current_catalogue() keeps using it until it
+finishes. If the new file does not validate, the error is logged and the previous
+snapshot stays active.
+
+When data/symptom_catalogue.snapshot (see catalogue_snapshot.py) was built from the
+current file, it is memory-mapped instead of compiling the JSON. Set
+SYMPTOM_SNAPSHOT=0 to always use the JSON.
+
+The module-level common_symptoms, follow_up_keywords, QUESTION_TABLE and
+QUESTION_PLANS names, and identify_symptoms(), match_symptoms() and
+get_question_plan(), refer to the current snapshot.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import fuzzy_matcher
+
+# Presentation metadata shared by every follow-up question
+QUESTION_IMAGE = "/static/images/medical-bot.svg"
+QUESTION_ANIMATIONS = (
+    "fadeIn", "slideInRight", "bounceIn", "fadeInUp", "slideInLeft", "bounceInRight",
+    "fadeInDown", "slideInUp", "bounceInLeft", "fadeInRight", "slideInDown", "bounceInUp",
+    "fadeInLeft"
+)
+PLAN_LANGUAGES = ("english", "telugu")
+MIN_PLAN_QUESTIONS = 4
+
+CATALOGUE_PATH = os.getenv('SYMPTOM_CATALOGUE_PATH',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symptom_catalogue.json'))
+CHECK_INTERVAL = float(os.getenv('CATALOGUE_CHECK_INTERVAL', 2.0))
+USE_SNAPSHOT = os.getenv('SYMPTOM_SNAPSHOT', '1') != '0'
+# Follow-up groups asked in every consultation, before and after the symptom-specific ones
+TIMING_GROUP = "timing"
+GENERAL_GROUP = "general"
+
+FollowUpQuestion = namedtuple('FollowUpQuestion', ['question', 'image', 'animation'])
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+
+class CatalogueError(ValueError):
+    """Raised when a catalogue file is malformed"""
+
+
+def _string_list(value, where):
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise CatalogueError(f"{where} must be a list of non-empty strings")
+    return tuple(value)
+
+
+def _object(value, where):
+    """value if it is a JSON object; a missing one is empty"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise CatalogueError(f"{where} must be an object")
+    return value
+
+
+def validate_catalogue(data):
+    """Check a parsed catalogue file; returns (version, groups, symptoms, keywords)"""
+    if not isinstance(data, dict):
+        raise CatalogueError("catalogue must be a JSON object")
+    version = data.get("version")
+    if not isinstance(version, int) or version < 1:
+        raise CatalogueError("version must be a positive integer")
+
+    groups = {}
+    for name, group in _object(data.get("follow_up_groups"), "follow_up_groups").items():
+        if not isinstance(group, dict):
+            raise CatalogueError(f"follow_up_groups.{name} must be an object")
+        lists = {language: _string_list(group.get(language), f"follow_up_groups.{name}.{language}")
+                 for language in PLAN_LANGUAGES}
+        if len({len(questions) for questions in lists.values()}) != 1:
+            raise CatalogueError(f"follow_up_groups.{name} needs the same number of questions in every language")
+        groups[name] = lists
+    for required in (TIMING_GROUP, GENERAL_GROUP):
+        if required not in groups:
+            raise CatalogueError(f"follow_up_groups.{required} is required")
+
+    symptoms = {}
+    raw_symptoms = data.get("symptoms")
+    if not isinstance(raw_symptoms, dict) or not raw_symptoms:
+        raise CatalogueError("symptoms must be a non-empty object")
+    for name, info in raw_symptoms.items():
+        where = f"symptoms.{name}"
+        if not isinstance(info, dict):
+            raise CatalogueError(f"{where} must be an object")
+        if name != name.lower().strip() or not name:
+            raise CatalogueError(f"{where}: symptom names must be lower case")
+        entry = {"causes": _string_list(info.get("causes"), f"{where}.causes")}
+        for field in ("severity", "urgency"):
+            if not isinstance(info.get(field), str) or not info[field]:
+                raise CatalogueError(f"{where}.{field} must be a non-empty string")
+            entry[field] = info[field]
+        for field in ("specific_recommendations", "general_recommendations"):
+            if field in info:
+                entry[field] = _string_list(info[field], f"{where}.{field}")
+        if "synonyms" in info:
+            # Other names for the symptom, per language
+            if not isinstance(info["synonyms"], dict):
+                raise CatalogueError(f"{where}.synonyms must be an object")
+            entry["synonyms"] = {language: _string_list(terms, f"{where}.synonyms.{language}")
+                                 for language, terms in info["synonyms"].items()}
+        if "follow_up" in info:
+            if not isinstance(info["follow_up"], str):
+                raise CatalogueError(f"{where}.follow_up must be the name of a follow-up group")
+            if info["follow_up"] not in groups:
+                raise CatalogueError(f"{where}.follow_up refers to unknown group {info['follow_up']!r}")
+            entry["follow_up"] = groups[info["follow_up"]]
+        symptoms[name] = entry
+
+    keywords = {}
+    for keyword, group in _object(data.get("follow_up_keywords"), "follow_up_keywords").items():
+        if not isinstance(group, str):
+            raise CatalogueError(f"follow_up_keywords.{keyword} must be the name of a follow-up group")
+        if group not in groups:
+            raise CatalogueError(f"follow_up_keywords.{keyword} refers to unknown group {group!r}")
+        keywords[keyword] = groups[group]
+    return version, groups, symptoms, keywords
+
+
+class Catalogue:
+    """One validated, compiled version of the symptom catalogue; treat as read-only"""
+    def __init__(self, data, source=None):
+        self.version, self.groups, self.symptoms, self.follow_up_keywords = validate_catalogue(data)
+        self.source = source
+        self.timing_follow_up = self.groups[TIMING_GROUP]
+        self.general_follow_up = self.groups[GENERAL_GROUP]
+        # Pre-compile symptom matchers (single words use token lookup, phrases use a regex)
+        self.matchers = tuple(
+            (symptom, None if ' ' not in symptom else re.compile(r'\b' + re.escape(symptom) + r'\b'))
+            for symptom in self.symptoms
+        )
+        self.question_table = self._build_question_table()
+        # Precompute the plan for every single symptom/keyword in both languages
+        self.question_plans = {
+            (keys, language): self._assemble_plan(keys, language)
+            for keys in [()] + [(key,) for key in list(self.symptoms) + list(self.follow_up_keywords)
+                                if key in self.follow_up_keywords or "follow_up" in self.symptoms[key]]
+            for language in PLAN_LANGUAGES
+        }
+        self._combined_plan = lru_cache(maxsize=1024)(self._assemble_plan)
+
+    def identify_symptoms(self, text):
+        """Return catalogue symptoms mentioned in text, in catalogue order"""
+        text_lower = text.lower()
+        words = set(WORD_PATTERN.findall(text_lower))
+        identified = []
+        for symptom, pattern in self.matchers:
+            if pattern is None:
+                if symptom in words:
+                    identified.append(symptom)
+            elif pattern.search(text_lower):
+                identified.append(symptom)
+        return identified
+
+    def _plan_keys(self, text):
+        """Return the catalogue symptoms and keywords that select follow-up questions"""
+        keys = [symptom for symptom in self.identify_symptoms(text) if "follow_up" in self.symptoms[symptom]]
+        words = set(WORD_PATTERN.findall(text.lower()))
+        keys.extend(keyword for keyword in self.follow_up_keywords if keyword in words)
+        return tuple(keys)
+
+    def _build_question_table(self):
+        """Build one immutable question per (language, English text), sharing presentation metadata"""
+        groups = [self.timing_follow_up, self.general_follow_up]
+        groups.extend(info["follow_up"] for info in self.symptoms.values() if "follow_up" in info)
+        groups.extend(self.follow_up_keywords.values())
+
+        table = {}
+        for group in groups:
+            for position, english in enumerate(group["english"]):
+                if english in table:
+                    continue
+                animation = QUESTION_ANIMATIONS[len(table) % len(QUESTION_ANIMATIONS)]
+                table[english] = {
+                    language: FollowUpQuestion(group[language][position], QUESTION_IMAGE, animation)
+                    for language in PLAN_LANGUAGES
+                }
+        return table
+
+    def _group_for_key(self, key):
+        if key in self.symptoms:
+            return self.symptoms[key]["follow_up"]
+        return self.follow_up_keywords[key]
+
+    def _assemble_plan(self, keys, language):
+        """Assemble the ordered question tuple for a combination of plan keys"""
+        english_questions = list(self.timing_follow_up["english"])
+        for key in keys:
+            for question in self._group_for_key(key)["english"]:
+                if question not in english_questions:
+                    english_questions.append(question)
+        for question in self.general_follow_up["english"]:
+            if len(english_questions) >= MIN_PLAN_QUESTIONS:
+                break
+            if question not in english_questions:
+                english_questions.append(question)
+        return tuple(self.question_table[question][language] for question in english_questions)
+
+    def get_question_plan(self, symptoms, language="english"):
+        """Return the precomputed follow-up question plan for the given symptom text"""
+        language = language.lower()
+        if language not in PLAN_LANGUAGES:
+            language = "english"
+        keys = self._plan_keys(symptoms)
+        plan = self.question_plans.get((keys, language))
+        if plan is None:
+            plan = self._combined_plan(keys, language)
+        return plan
+
+
+def load_catalogue(path=CATALOGUE_PATH):
+    """Read, validate and compile a catalogue file"""
+    with open(path, encoding='utf-8') as fp:
+        try:
+            data = json.load(fp)
+        except json.JSONDecodeError as e:
+            raise CatalogueError(f"{path}: {e}")
+    return Catalogue(data, source=path)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _signatures(path):
+    """Signature of the catalogue file and of its snapshot, if any"""
+    snapshot = None
+    if USE_SNAPSHOT:
+        from catalogue_snapshot import snapshot_path_for
+        try:
+            snapshot = _file_signature(snapshot_path_for(path))
+        except FileNotFoundError:
+            pass
+    return _file_signature(path), snapshot
+
+
+def _load(path, use_snapshot):
+    """The current snapshot of path if there is one, else the compiled JSON"""
+    if use_snapshot:
+        from catalogue_snapshot import SnapshotError, load_snapshot
+        try:
+            catalogue = load_snapshot(path)
+        except (OSError, SnapshotError) as e:
+            logging.warning(f"Ignoring symptom catalogue snapshot: {e}")
+            catalogue = None
+        if catalogue is not None:
+            return catalogue
+        logging.info(f"Symptom catalogue snapshot is older than {path}; loading the JSON")
+    return load_catalogue(path)
+
+
+_current = None
+_signature = None
+_next_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def reload_catalogue(path=None, force=False):
+    """Load the catalogue file if it changed; returns the active snapshot"""
+    global _current, _signature
+    path = path or CATALOGUE_PATH
+    with _reload_lock:
+        signature = _signatures(path)
+        if force or _current is None or signature != _signature:
+            # Recorded first, so a broken file is reported once rather than on every check
+            _signature = signature
+            started = time.perf_counter()
+            catalogue = _load(path, signature[1] is not None)
+            _current = catalogue
+            logging.info(f"Loaded symptom catalogue version {catalogue.version} ({len(catalogue.symptoms)} symptoms) "
+                         f"from {os.path.basename(catalogue.source)} "
+                         f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return _current
+
+
+def current_catalogue():
+    """The active catalogue snapshot; checks the file for changes at most every CHECK_INTERVAL"""
+    global _next_check
+    if _current is None:
+        # Loaded on first use, so that catalogue_snapshot can import this module first
+        return reload_catalogue()
+    now = time.monotonic()
+    if now >= _next_check and _reload_lock.acquire(blocking=False):
+        # Only one thread checks; the others carry on with the current snapshot
+        try:
+            _next_check = now + CHECK_INTERVAL
+        finally:
+            _reload_lock.release()
+        try:
+            reload_catalogue()
+        except (OSError, CatalogueError) as e:
+            logging.error(f"Keeping symptom catalogue version {_current.version}: {e}")
+    return _current
+
+
+def identify_symptoms(text):
+    return current_catalogue().identify_symptoms(text)
+
+
+def match_symptoms(text, min_confidence=fuzzy_matcher.MIN_CONFIDENCE):
+    """SymptomMatch(symptom, confidence, text) for exact and misspelled mentions, in catalogue order"""
+    return fuzzy_matcher.match_symptoms(current_catalogue(), text, min_confidence)
+
+
+def get_question_plan(symptoms, language="english"):
+    return current_catalogue().get_question_plan(symptoms, language)
+
+
+_SNAPSHOT_ATTRIBUTES = {
+    "common_symptoms": "symptoms",
+    "follow_up_keywords": "follow_up_keywords",
+    "QUESTION_TABLE": "question_table",
+    "QUESTION_PLANS": "question_plans"
+}
+
+
+def __getattr__(name):
+    if name in _SNAPSHOT_ATTRIBUTES:
+        return getattr(current_catalogue(), _SNAPSHOT_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
@@ -0,0 +1,89 @@
+import pytest
+
+import admission_control
+from admission_control import (AdmissionRejected, BackendLimiter, MemoryBucketStore, SQLiteBucketStore,
+                               rejection_response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(admission_control.time, "sleep", slept.append)
+    return slept
+
+
+def limiter(store=None, user_rate=0.001, user_burst=2, global_rate=1000.0, global_burst=100, **options):
+    return BackendLimiter("tts", store or MemoryBucketStore(), user_rate, user_burst, global_rate, global_burst,
+                          **options)
+
+
+def test_user_burst_then_429(sleeps):
+    backend = limiter()
+    backend.admit("alice")
+    backend.admit("alice")
+    with pytest.raises(AdmissionRejected) as rejected:
+        backend.admit("alice")
+    assert rejected.value.status == 429 and rejected.value.scope == "user"
+    # One token at 0.001/s is 1,000 s away
+    assert rejected.value.retry_after == 1000
+    # Other users have their own buckets
+    backend.admit("bob")
+    assert backend.admitted == 3 and backend.rejected["user"] == 1 and sleeps == []
+
+
+def test_rejection_refunds_the_user_token(sleeps):
+    store = MemoryBucketStore()
+    backend = limiter(store, user_burst=1)
+    backend.admit("alice")
+    for _ in range(3):
+        with pytest.raises(AdmissionRejected):
+            backend.admit("alice")
+    # Rejected calls did not drive the bucket further into debt
+    tokens, _ = store._buckets["tts:user:alice"]
+    assert tokens == pytest.approx(0, abs=0.01)
+
+
+def test_global_bucket_waits_in_turn(sleeps):
+    backend = limiter(user_burst=10, global_rate=10.0, global_burst=1, max_wait=1.0)
+    backend.admit("alice")
+    backend.admit("bob")
+    backend.admit("carol")
+    assert sleeps == [pytest.approx(0.1, abs=0.01), pytest.approx(0.2, abs=0.01)]
+    assert backend.waited == 2 and backend.waiting == 0
+
+
+def test_global_wait_too_long_is_503_and_refunded(sleeps):
+    store = MemoryBucketStore()
+    backend = limiter(store, user_burst=10, global_rate=1.0, global_burst=1, max_wait=0.5)
+    backend.admit("alice")
+    with pytest.raises(AdmissionRejected) as rejected:
+        backend.admit("bob")
+    assert rejected.value.status == 503 and rejected.value.retry_after == 1
+    assert backend.rejected["global"] == 1
+    # Both reservations were given back
+    assert store._buckets["tts:user:bob"][0] == pytest.approx(10)
+    assert store._buckets["tts:global"][0] == pytest.approx(0, abs=0.01)
+
+
+def test_full_queue_is_rejected(sleeps):
+    backend = limiter(user_burst=10, global_rate=10.0, global_burst=1, max_wait=1.0, max_queue=1)
+    backend.admit("alice")
+    backend.waiting = 1
+    with pytest.raises(AdmissionRejected) as rejected:
+        backend.admit("bob")
+    assert rejected.value.status == 503 and backend.rejected["queue"] == 1
+
+
+def test_sqlite_store_is_shared(tmp_path, sleeps):
+    path = str(tmp_path / "admission.db")
+    first, second = limiter(SQLiteBucketStore(path), user_burst=1), limiter(SQLiteBucketStore(path), user_burst=1)
+    first.admit("alice")
+    with pytest.raises(AdmissionRejected):
+        second.admit("alice")
+
+
+def test_rejection_response():
+    body, status, headers = rejection_response(AdmissionRejected("stt", "user", 2.2))
+    assert status == 429 and headers == {"Retry-After": "3"} and body["retry_after"] == 3
+    body, status, headers = rejection_response(AdmissionRejected("stt", "global", 0.1))
+    assert status == 503 and headers == {"Retry-After": "1"}
@@ -0,0 +1,80 @@
+import io
+import math
+import struct
+import wave
+from array import array
+
+import pytest
+
+import audio_codecs
+from audio_codecs import TARGET_RATE, UnsupportedAudio, decode_wav, to_16bit, to_mono_16k
+
+
+def tone(rate, seconds=0.5, frequency=440, amplitude=10000, channels=1):
+    """16-bit little-endian PCM of a sine tone"""
+    samples = [round(amplitude * math.sin(2 * math.pi * frequency * i / rate)) for i in range(int(rate * seconds))]
+    return struct.pack(f"<{len(samples) * channels}h", *(value for value in samples for _ in range(channels)))
+
+
+def rms_error(frames, frequency=440, amplitude=10000, skip=50):
+    samples = array("h", frames)
+    errors = [samples[i] - amplitude * math.sin(2 * math.pi * frequency * i / TARGET_RATE)
+              for i in range(skip, len(samples) - skip)]
+    return math.sqrt(sum(error * error for error in errors) / len(errors))
+
+
+def wav(frames, rate, channels=1, width=2):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(width)
+        writer.setframerate(rate)
+        writer.writeframes(frames)
+    return buffer.getvalue()
+
+
+def test_to_16bit():
+    assert to_16bit(bytes([0, 128, 255]), 1) == struct.pack("<3h", -32768, 0, 32512)
+    # 24- and 32-bit samples keep their top two bytes
+    assert to_16bit(bytes([0x11, 0x34, 0x12, 0xff, 0xff, 0x80]), 3) == struct.pack("<2h", 0x1234, -32513)
+    assert to_16bit(bytes([0, 0, 0x34, 0x12]), 4) == struct.pack("<h", 0x1234)
+    assert to_16bit(b"\x01\x02", 2) == b"\x01\x02"
+
+
+@pytest.mark.parametrize("rate", [44100, 48000, 22050, 8000])
+def test_resampled_tone_stays_close(rate):
+    frames = to_mono_16k(tone(rate), 1, rate)
+    assert len(frames) // 2 == TARGET_RATE // 2
+    # Within 1% of the amplitude, outside the edges
+    assert rms_error(frames) < 100
+
+
+def test_stereo_is_mixed_to_mono():
+    frames = to_mono_16k(tone(48000, channels=2), 2, 48000)
+    assert len(frames) // 2 == TARGET_RATE // 2 and rms_error(frames) < 100
+
+
+def test_constant_signal_is_preserved():
+    frames = to_mono_16k(struct.pack("<1000h", *[1234] * 1000), 1, 44100)
+    assert set(array("h", frames)) == {1234}
+
+
+@pytest.mark.parametrize("rate", [44100, 8000])
+def test_block_size_does_not_change_the_output(monkeypatch, rate):
+    frames = tone(rate, 0.1)
+    expected = to_mono_16k(frames, 1, rate)
+    monkeypatch.setattr(audio_codecs, "RESAMPLE_BLOCK", 7)
+    assert to_mono_16k(frames, 1, rate) == expected
+
+
+def test_decode_wav(monkeypatch):
+    monkeypatch.setattr(audio_codecs, "FFMPEG", None)
+    pcm = tone(TARGET_RATE)
+    # 16 kHz mono 16-bit is passed through as is
+    assert decode_wav(wav(pcm, TARGET_RATE)) == pcm
+    stereo = decode_wav(wav(tone(44100, channels=2), 44100, channels=2))
+    assert len(stereo) // 2 == TARGET_RATE // 2 and rms_error(stereo) < 100
+    with pytest.raises(UnsupportedAudio):
+        decode_wav(wav(tone(TARGET_RATE, channels=3), TARGET_RATE, channels=3))
+    with pytest.raises(UnsupportedAudio):
+        decode_wav(b"RIFF\x00\x00\x00\x00WAVEjunk")
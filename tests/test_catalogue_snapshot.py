@@ -0,0 +1,45 @@
+import pytest
+
+from catalogue_snapshot import SnapshotCatalogue, build_snapshot
+from fuzzy_matcher import match_symptoms
+from symptom_catalogue import CATALOGUE_PATH, load_catalogue
+
+TEXTS = [
+    "I have a fever and a headache",
+    "chest pain and shortness of breath since yesterday",
+    "feaver, head ache and a bad cough",
+    "my stomach hurts and I feel dizzy",
+    "I am coughing and feeling feverish",
+    "నాకు జ్వరం మరియు దగ్గు ఉంది",
+    "తలనొప్పిగా ఉంది",
+    "It has been a tough week, never had one this bad",
+    "I just want a general health check",
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def catalogues(tmp_path_factory):
+    path = build_snapshot(CATALOGUE_PATH, str(tmp_path_factory.mktemp("snapshot") / "catalogue.snapshot"))
+    return load_catalogue(CATALOGUE_PATH), SnapshotCatalogue(path)
+
+
+def test_same_symptoms(catalogues):
+    catalogue, snapshot = catalogues
+    assert list(snapshot.symptoms) == list(catalogue.symptoms)
+    for name in catalogue.symptoms:
+        assert dict(snapshot.symptoms[name]) == dict(catalogue.symptoms[name])
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_match_symptoms(catalogues, text):
+    catalogue, snapshot = catalogues
+    assert match_symptoms(snapshot, text) == match_symptoms(catalogue, text)
+    assert snapshot.identify_symptoms(text) == catalogue.identify_symptoms(text)
+
+
+@pytest.mark.parametrize("language", ["english", "telugu"])
+@pytest.mark.parametrize("text", TEXTS)
+def test_question_plan(catalogues, text, language):
+    catalogue, snapshot = catalogues
+    assert snapshot.get_question_plan(text, language) == catalogue.get_question_plan(text, language)
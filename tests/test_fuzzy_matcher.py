@@ -0,0 +1,66 @@
+import pytest
+
+from fuzzy_matcher import FuzzyMatcher, allowed_distance, edit_distance, match_symptoms
+from symptom_catalogue import CATALOGUE_PATH, load_catalogue
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return load_catalogue(CATALOGUE_PATH)
+
+
+def symptoms(catalogue, text):
+    return [match.symptom for match in match_symptoms(catalogue, text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("feaver", ["fever"]),
+    ("nausia since the morning", ["nausea"]),
+    ("a bad head ache", ["headache"]),
+    ("chestpain", ["chest pain"]),
+    ("shortnes of breth", ["shortness of breath"]),
+    ("sweling in my ankle", ["swelling"]),
+    ("dizzyness and feaver", ["fever", "dizziness"]),
+])
+def test_misspellings(catalogue, text, expected):
+    assert symptoms(catalogue, text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have a headache, never had one this bad", ["headache"]),
+    ("it has been a tough week", []),
+    ("I fell asleep on the couch", []),
+    ("I feel rough today", []),
+    ("my job is selling cars", []),
+    ("we are breeding dogs", []),
+    ("I have fewer problems now", []),
+])
+def test_common_words_are_not_corrected(catalogue, text, expected):
+    assert symptoms(catalogue, text) == expected
+
+
+def test_confidence(catalogue):
+    exact, = match_symptoms(catalogue, "fever")
+    fuzzy, = match_symptoms(catalogue, "feaver")
+    assert exact.confidence == 1.0
+    assert fuzzy.confidence == 0.8 and fuzzy.text == "feaver"
+    assert match_symptoms(catalogue, "feaver", min_confidence=0.9) == []
+
+
+def test_allowed_distance():
+    assert allowed_distance(4) == 0
+    assert allowed_distance(5) == 1 and allowed_distance(5, standalone=True) == 0
+    assert allowed_distance(6, standalone=True) == 1
+    assert allowed_distance(8) == 2
+
+
+def test_edit_distance():
+    assert edit_distance("feaver", "fever", 2) == 1
+    assert edit_distance("nuasea", "nausea", 2) == 1
+    assert edit_distance("cough", "headache", 2) == 3
+
+
+def test_phrases_of_one_matcher():
+    matcher = FuzzyMatcher(["sore throat", "throat", "ear pain"])
+    assert [match.symptom for match in matcher.match("sore throath and earpain")] == ["sore throat", "throat",
+                                                                                     "ear pain"]
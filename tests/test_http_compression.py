@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from http_compression import (compress, init_response_compression, negotiate_encoding, parse_accept_encoding,
+                              precompress)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.8, *;q=0") == {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    assert parse_accept_encoding("gzip;q=oops") == {"gzip": 0.0}
+    assert parse_accept_encoding(None) == {}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("deflate", "identity"),
+    ("", "identity"),
+])
+def test_negotiation_prefers_brotli_at_equal_q(header, expected):
+    assert negotiate_encoding(header, available=("br", "gzip")) == expected
+
+
+def test_negotiation_without_brotli():
+    assert negotiate_encoding("br, gzip", available=("gzip",)) == "gzip"
+    assert negotiate_encoding("br", available=("gzip",)) == "identity"
+
+
+def test_gzip_is_stable():
+    body = "జ్వరం మరియు దగ్గు ".encode("utf-8") * 50
+    assert compress(body, "gzip") == compress(body, "gzip")
+    assert gzip.decompress(compress(body, "gzip")) == body
+
+
+def test_precompress_keeps_only_smaller_variants():
+    assert set(precompress(b"x" * 10)) == {"identity"}
+    variants = precompress(b"fever " * 200)
+    assert "gzip" in variants and len(variants["gzip"]) < len(variants["identity"])
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_response_compression(app, min_size=100)
+
+    @app.route("/large")
+    def large():
+        return jsonify(summary="జ్వరం " * 100)
+
+    @app.route("/small")
+    def small():
+        return jsonify(ok=True)
+
+    @app.route("/tagged")
+    def tagged():
+        response = jsonify(summary="fever " * 100)
+        response.set_etag("abc")
+        return response
+
+    return app.test_client()
+
+
+def test_large_json_is_gzipped(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.get_data())) == {"summary": "జ్వరం " * 100}
+
+
+def test_uncompressed_when_small_or_not_accepted(client):
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers and "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_strong_etag_names_the_encoding(client):
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["ETag"] == '"abc-gzip"'
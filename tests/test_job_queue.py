@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from job_queue import JobManager, QueueFull
+
+
+def blocked(release):
+    def work(progress):
+        progress("waiting")
+        release.wait(5)
+        return "done"
+    return work
+
+
+def test_job_result_and_stages():
+    manager = JobManager(max_workers=1)
+
+    def work(value, progress):
+        progress("first")
+        progress("second")
+        return value * 2
+
+    job = manager.submit(work, 21, owner="alice")
+    assert job.wait(5)
+    data = job.to_dict()
+    assert data["status"] == "done" and data["result"] == 42
+    assert [stage["stage"] for stage in data["stages"]] == ["first", "second"]
+    assert all(stage["complete"] for stage in data["stages"])
+    assert manager.get(job.id) is job and job.owner == "alice"
+
+
+def test_failed_job():
+    manager = JobManager(max_workers=1)
+
+    def work(progress):
+        raise RuntimeError("translation failed")
+
+    job = manager.submit(work)
+    assert job.wait(5)
+    data = job.to_dict()
+    assert data["status"] == "failed" and data["error"] == "translation failed" and "result" not in data
+    assert manager.failed == 1
+
+
+def test_queue_full():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, max_pending=2)
+    jobs = [manager.submit(blocked(release)) for _ in range(2)]
+    with pytest.raises(QueueFull) as full:
+        manager.submit(blocked(release))
+    assert full.value.retry_after >= 1 and manager.rejected == 1
+    release.set()
+    assert all(job.wait(5) for job in jobs)
+    # Finished jobs free their slots
+    assert manager.submit(blocked(release)).wait(5)
+
+
+def test_finished_jobs_expire():
+    manager = JobManager(max_workers=1, result_ttl=60)
+    job = manager.submit(lambda progress: "done")
+    assert job.wait(5)
+    assert manager.get(job.id) is job
+    job.finished_at -= 61
+    assert manager.get(job.id) is None
+
+
+def test_running_jobs_never_expire():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, result_ttl=0)
+    job = manager.submit(blocked(release))
+    job.created_at -= 3600
+    assert manager.get(job.id) is job
+    release.set()
+    assert job.wait(5)
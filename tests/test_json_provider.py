@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from json_provider import CompactJSONProvider, OrjsonProvider, init_json, orjson
+
+PROVIDERS = [CompactJSONProvider] + ([OrjsonProvider] if orjson else [])
+PAYLOAD = {"summary": "జ్వరం మరియు దగ్గు", "b": [1, 2.5, None], "a": True}
+
+
+@pytest.fixture(params=[provider.__name__ for provider in PROVIDERS])
+def app(request):
+    app = Flask(__name__)
+    app.json = {provider.__name__: provider for provider in PROVIDERS}[request.param](app)
+    return app
+
+
+def test_utf8_without_escapes(app):
+    with app.app_context():
+        body = jsonify(PAYLOAD).get_data()
+    assert "జ్వరం".encode("utf-8") in body and b"\\u0c" not in body
+    assert body == json.dumps(PAYLOAD, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def test_response_takes_args_or_kwargs(app):
+    with app.app_context():
+        assert json.loads(jsonify(1, 2).get_data()) == [1, 2]
+        assert json.loads(jsonify(text="దగ్గు").get_data()) == {"text": "దగ్గు"}
+        assert jsonify().get_data() == b"null\n"
+        with pytest.raises(TypeError):
+            jsonify(1, text="దగ్గు")
+
+
+def test_indented_when_not_compact(app):
+    app.json.compact = False
+    with app.app_context():
+        body = jsonify(PAYLOAD).get_data()
+    assert body == (json.dumps(PAYLOAD, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
+
+@pytest.mark.parametrize("kwargs", [{"separators": (",", ":")}, {"separators": (",", ":"), "sort_keys": True},
+                                    {"indent": 2, "sort_keys": True}, {"indent": 4}, {"separators": (", ", ": ")},
+                                    {"separators": (",", ":"), "ensure_ascii": True}])
+def test_dumps_honours_json_arguments(app, kwargs):
+    assert app.json.dumps(PAYLOAD, **kwargs) == json.dumps(PAYLOAD, **{"ensure_ascii": False, **kwargs})
+
+
+def test_loads(app):
+    assert app.json.loads('{"a": "దగ్గు"}') == {"a": "దగ్గు"}
+
+
+def test_init_json_fallback():
+    app = Flask(__name__)
+    assert type(init_json(app, "stdlib")) is CompactJSONProvider
+    assert app.json is not None
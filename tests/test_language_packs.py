@@ -0,0 +1,95 @@
+import json
+import shutil
+
+import pytest
+
+from language_packs import PACKS_DIR, LanguagePackError, PackRegistry, load_pack, read_pack
+
+with open(f"{PACKS_DIR}/english.json", encoding="utf-8") as fp:
+    ENGLISH = json.load(fp)
+
+
+def hindi(**changes):
+    data = {"name": "Hindi", "codes": {"translate": "hi", "tts": "hi", "stt": "hi-IN"},
+            "script": [[2304, 2431]], "messages": {"greeting": "नमस्ते"},
+            "templates": dict(ENGLISH["templates"]), "strings": {"fever": "बुखार"}}
+    data.update(changes)
+    return data
+
+
+@pytest.fixture
+def packs_dir(tmp_path):
+    shutil.copy(f"{PACKS_DIR}/english.json", tmp_path)
+    return tmp_path
+
+
+def write(directory, language, data):
+    (directory / f"{language}.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_shipped_packs_are_valid():
+    registry = PackRegistry()
+    for language in registry.installed_languages():
+        assert registry.get(language) is not None
+
+
+@pytest.mark.parametrize("data, message", [
+    ([], "must be a JSON object"),
+    (hindi(codes={"translate": "hi", "tts": "hi"}), "codes must give"),
+    (hindi(codes={"translate": "hi", "tts": "", "stt": "hi-IN"}), "codes must give"),
+    (hindi(messages={"greeting": 1}), "messages must be an object of strings"),
+    (hindi(strings={"fever": ""}), "strings must not be empty"),
+    (hindi(script=[[2304]]), "script must be a list"),
+])
+def test_malformed_packs(packs_dir, data, message):
+    write(packs_dir, "hindi", data)
+    with pytest.raises(LanguagePackError, match=message):
+        read_pack("hindi", str(packs_dir))
+
+
+def test_templates_checked_against_the_base(packs_dir):
+    base = load_pack("english", directory=str(packs_dir))
+    templates = dict(ENGLISH["templates"])
+    del templates["opening"]
+    write(packs_dir, "hindi", hindi(templates=templates))
+    with pytest.raises(LanguagePackError, match="missing templates opening"):
+        load_pack("hindi", base, str(packs_dir))
+    write(packs_dir, "hindi", hindi(templates={**ENGLISH["templates"], "opening": "लक्षण: {text}"}))
+    with pytest.raises(LanguagePackError, match="template opening must use the fields"):
+        load_pack("hindi", base, str(packs_dir))
+    # A pack without templates is translated as a whole and need not match
+    write(packs_dir, "hindi", hindi(templates={}))
+    assert not load_pack("hindi", base, str(packs_dir)).localized
+
+
+def test_invalid_pack_is_left_out(packs_dir):
+    write(packs_dir, "hindi", hindi(templates={"opening": "{symptoms}"}))
+    registry = PackRegistry(str(packs_dir))
+    assert registry.get("hindi") is None
+    assert registry.loaded_languages() == ["english"]
+    assert registry.language_for_code("hi") is None
+
+
+def test_packs_load_on_first_use(packs_dir):
+    write(packs_dir, "hindi", hindi())
+    registry = PackRegistry(str(packs_dir))
+    assert registry.installed_languages() == {"english", "hindi"}
+    assert registry.loaded_languages() == []
+    pack = registry.get("Hindi")
+    assert pack.localized and pack.base is registry.get("english")
+    assert pack.message("greeting") == "नमस्ते"
+    # Messages missing from a pack come from the base pack
+    assert pack.message("precautions") == registry.get("english").message("precautions")
+    assert pack.string("fever") == "बुखार" and pack.string("cough") == "cough"
+    assert pack.string("cough", translate=lambda text: "खांसी") == "खांसी"
+    assert registry.get("tamil") is None
+
+
+def test_codes_resolve_without_loading_packs(packs_dir):
+    write(packs_dir, "hindi", hindi())
+    registry = PackRegistry(str(packs_dir))
+    assert registry.language_for_code("HI") == "hindi"
+    assert registry.language_for_code("en") == "english"
+    assert registry.language_for_code("xx") is None
+    assert registry.translate_codes() == {"english": "en", "hindi": "hi"}
+    assert registry.loaded_languages() == []
@@ -0,0 +1,65 @@
+import time
+
+from qos_controller import TIERS, QosController, tier_allows_tts
+
+STAGE = "voice.translate_text"
+
+
+def controller(load):
+    """QosController whose pressure is load[0], through a queue source"""
+    qos = QosController(window=30, min_dwell=5, latency_targets={STAGE: 5.0})
+    # A full queue is pressure 1.5
+    qos.add_queue_source(lambda: load[0] / 1.5)
+    return qos
+
+
+def test_latency_sets_the_tier():
+    qos = QosController(window=30, min_dwell=5, latency_targets={STAGE: 5.0})
+    now = time.monotonic()
+    assert TIERS[qos.evaluate(now)] == "full"
+    qos.record(STAGE, 8.0)
+    qos.record(STAGE, 12.0)
+    # Mean 10 s against a 5 s target
+    assert TIERS[qos.evaluate(now)] == "bilingual_fallback" and qos.pressure == 2.0
+    # Stages that do not drive QoS are ignored
+    qos.record("voice.other", 100.0)
+    assert qos.pressure == 2.0
+
+
+def test_old_samples_leave_the_window():
+    qos = QosController(window=30, min_dwell=0, latency_targets={STAGE: 5.0})
+    qos.record(STAGE, 10.0)
+    later = time.monotonic() + 31
+    assert qos.current_pressure(later) == 0.0
+
+
+def test_full_queue_enters_cached_translation():
+    qos = controller([1.5])
+    assert TIERS[qos.evaluate(time.monotonic())] == "cached_translation"
+
+
+def test_hysteresis():
+    load = [3.0]
+    qos = controller(load)
+    start = time.monotonic()
+    assert TIERS[qos.evaluate(start)] == "text_only"
+    # Below the threshold but above 70% of it: held
+    load[0] = 2.5
+    assert TIERS[qos.evaluate(start + 60)] == "text_only"
+    # Well below, but not held long enough
+    load[0] = 0.0
+    assert TIERS[qos.evaluate(start + 1)] == "text_only"
+    # Then one tier per dwell period
+    assert TIERS[qos.evaluate(start + 6)] == "bilingual_fallback"
+    assert TIERS[qos.evaluate(start + 7)] == "bilingual_fallback"
+    assert TIERS[qos.evaluate(start + 12)] == "cached_translation"
+    # Rising pressure jumps straight up
+    load[0] = 2.0
+    assert TIERS[qos.evaluate(start + 13)] == "bilingual_fallback"
+
+
+def test_select_tier_counts_requests():
+    qos = controller([1.0])
+    assert qos.select_tier() == "skip_tts"
+    assert qos.selected["skip_tts"] == 1
+    assert not tier_allows_tts("skip_tts") and tier_allows_tts("full")
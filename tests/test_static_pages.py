@@ -0,0 +1,71 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from static_pages import asset_url, init_static_pages, page_response, prerender_pages
+
+PAGE = "<html><body>" + "<p>జ్వరం మరియు దగ్గు</p>" * 50 + "</body></html>"
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "test_page.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "static" / "css").mkdir(parents=True)
+    (tmp_path / "static" / "css" / "app.css").write_text("body { color: black; }\n" * 40)
+    app = Flask(__name__, template_folder=str(tmp_path / "templates"), static_folder=str(tmp_path / "static"))
+    init_static_pages(app)
+    prerender_pages(app, ["test_page.html", "missing.html"])
+    app.add_url_rule("/page", "page", lambda: page_response("test_page.html"))
+    return app
+
+
+def test_page_variants(app):
+    client = app.test_client()
+    plain = client.get("/page")
+    assert plain.status_code == 200 and plain.get_data(as_text=True) == PAGE
+    assert plain.headers["Cache-Control"] == "no-cache" and "Accept-Encoding" in plain.headers["Vary"]
+    compressed = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.get_data()).decode("utf-8") == PAGE
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+
+
+def test_matching_etag_gets_304(app):
+    client = app.test_client()
+    etag = client.get("/page", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    revalidated = client.get("/page", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.get_data() == b""
+    assert revalidated.headers["ETag"] == etag
+    # The gzip ETag does not validate the uncompressed variant
+    assert client.get("/page", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_debug_renders_per_request(app):
+    app.debug = True
+    response = app.test_client().get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200 and "ETag" not in response.headers
+
+
+def test_fingerprinted_assets(app, tmp_path):
+    client = app.test_client()
+    with app.test_request_context():
+        url = asset_url("css/app.css")
+    assert url.startswith("/assets/") and url.endswith("/css/app.css")
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200 and "immutable" in response.headers["Cache-Control"]
+    assert response.headers["Content-Encoding"] == "gzip"
+    # A changed file gets a new URL; the old one is still served, but not as immutable
+    css = tmp_path / "static" / "css" / "app.css"
+    mtime = css.stat().st_mtime_ns
+    css.write_text("body { color: red; }\n" * 40)
+    os.utime(css, ns=(mtime + 10**9, mtime + 10**9))
+    with app.test_request_context():
+        assert asset_url("css/app.css") != url
+    stale = client.get(url)
+    assert stale.status_code == 200 and "immutable" not in stale.headers.get("Cache-Control", "")
+    stale.close()
+    assert client.get("/assets/0/../../secret.txt").status_code == 404
+    assert client.get("/assets/0/missing.css").status_code == 404
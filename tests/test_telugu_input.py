@@ -0,0 +1,50 @@
+import pytest
+
+from fuzzy_matcher import match_symptoms
+from symptom_catalogue import CATALOGUE_PATH, load_catalogue
+from text_normalizer import SymptomNormalizer, telugu_forms, telugu_roots, tokenize
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return load_catalogue(CATALOGUE_PATH)
+
+
+@pytest.fixture(scope="module")
+def normalizer(catalogue):
+    return SymptomNormalizer(catalogue)
+
+
+def symptoms(normalizer, text):
+    return [symptom for symptom, _ in normalizer.match(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("నాకు జ్వరం ఉంది", ["fever"]),
+    ("రెండు రోజులుగా జ్వరము", ["fever"]),
+    ("జ్వరానికి మందు వేసుకున్నాను", ["fever"]),
+    ("ఉదయం నుండి తలనొప్పిగా ఉంది", ["headache"]),
+    ("దగ్గుతో బాధపడుతున్నాను", ["cough"]),
+    ("కడుపులో నొప్పి లేదు, కడుపునొప్పితో ఉన్నాను", ["stomach pain"]),
+])
+def test_telugu_inflections(normalizer, text, expected):
+    assert symptoms(normalizer, text) == expected
+
+
+def test_matched_text(normalizer):
+    assert normalizer.match("దగ్గుతో బాధపడుతున్నాను") == [("cough", "దగ్గుతో")]
+
+
+def test_code_mixed_input(catalogue):
+    assert [match.symptom for match in match_symptoms(catalogue, "నాకు fever మరియు దగ్గు ఉంది")] == ["fever", "cough"]
+
+
+def test_telugu_rules():
+    assert "జ్వరము" in telugu_forms("జ్వరం")
+    assert "తలనొప్పిగా" in telugu_forms("తలనొప్పి")
+    assert telugu_roots("జ్వరము") == {"జ్వరం"}
+
+
+def test_tokens_keep_their_signs():
+    # Vowel signs and the virama are part of the word, and joiners are dropped
+    assert [token for token, _, _ in tokenize("కీళ్‍ల నొప్పి")] == ["కీళ్ల", "నొప్పి"]
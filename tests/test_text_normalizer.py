@@ -0,0 +1,50 @@
+import pytest
+
+from symptom_catalogue import CATALOGUE_PATH, load_catalogue
+from text_normalizer import SymptomNormalizer, english_forms, english_roots, normalize_text
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return SymptomNormalizer(load_catalogue(CATALOGUE_PATH))
+
+
+def symptoms(normalizer, text):
+    return [symptom for symptom, _ in normalizer.match(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I keep coughing", ["cough"]),
+    ("feeling feverish and dizzy", ["fever", "dizziness"]),
+    ("my ankles are swelling", ["swelling"]),
+    ("my tummy pain is back", ["stomach pain"]),
+    ("I can't breathe", ["shortness of breath"]),
+    ("I keep a diary of my meals", []),
+])
+def test_english_forms_and_synonyms(normalizer, text, expected):
+    assert symptoms(normalizer, text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I cant breathe", ["shortness of breath"]),
+    ("I can’t breathe", ["shortness of breath"]),
+    ("i can not breathe", ["shortness of breath"]),
+    ("my head hurts", ["headache"]),
+    ("my head is hurting", ["headache"]),
+    ("vomiting since the morning", ["nausea"]),
+    ("I keep throwing up", ["nausea"]),
+    ("I threw up twice", ["nausea"]),
+])
+def test_spoken_phrasings(normalizer, text, expected):
+    assert symptoms(normalizer, text) == expected
+
+
+def test_longest_phrase_wins(normalizer):
+    assert normalizer.match("I am tired all the time") == [("fatigue", "tired all the time")]
+
+
+def test_english_rules():
+    assert {"coughing", "coughs"} <= english_forms("cough")
+    assert "throbbing" in english_forms("throb")
+    assert english_roots("dizziness") == {"dizzy"}
+    assert normalize_text("FEVER") == "fever"
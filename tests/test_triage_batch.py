@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import triage_batch
+from triage_batch import CheckpointError, checkpoint_path_for, read_checkpoint, run_batch
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt(state, rate):
+    raise Interrupted
+
+
+@pytest.fixture
+def intake(tmp_path):
+    path = tmp_path / "intake.jsonl"
+    lines = [json.dumps({"id": number, "symptoms": "fever and cough" if number % 2 else "feaver"})
+             for number in range(1, 11)]
+    lines[4] = "not json"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def results(path):
+    with open(path, encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp]
+
+
+def test_results_in_input_order(intake, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    totals = run_batch(intake, output, workers=1, batch_size=3)
+    assert totals["records"] == 10 and totals["errors"] == 1 and totals["complete"]
+    lines = results(output)
+    assert [line["line"] for line in lines] == list(range(1, 11))
+    assert "error" in lines[4] and "id" not in lines[4]
+    assert [match["symptom"] for match in lines[0]["symptoms"]] == ["fever", "cough"]
+    assert lines[1]["symptoms"][0]["symptom"] == "fever" and lines[1]["summary"]
+
+
+def test_resume_after_a_crash(intake, tmp_path, monkeypatch):
+    output = str(tmp_path / "results.jsonl")
+    monkeypatch.setattr(triage_batch, "CHECKPOINT_INTERVAL", 0.0)
+
+    def crash(state, rate):
+        if state["records"] >= 6:
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        run_batch(intake, output, workers=1, batch_size=3, progress=crash)
+    state = read_checkpoint(checkpoint_path_for(output))
+    assert state["records"] == 6 and state["line"] == 6 and not state["complete"]
+    # Output written after the checkpoint is dropped on resume
+    with open(output, "a", encoding="utf-8") as fp:
+        fp.write('{"line": 7, "partial')
+
+    totals = run_batch(intake, output, workers=1, batch_size=3)
+    assert totals["resumed"] and totals["processed"] == 4 and totals["records"] == 10
+    assert [line["line"] for line in results(output)] == list(range(1, 11))
+    # A finished run is not repeated
+    assert run_batch(intake, output, workers=1, batch_size=3)["processed"] == 0
+
+
+def test_checkpoint_of_another_run(intake, tmp_path, monkeypatch):
+    output = str(tmp_path / "results.jsonl")
+    monkeypatch.setattr(triage_batch, "CHECKPOINT_INTERVAL", 0.0)
+    with pytest.raises(Interrupted):
+        run_batch(intake, output, workers=1, batch_size=3, progress=interrupt)
+    with pytest.raises(CheckpointError):
+        run_batch(intake, output, workers=1, batch_size=5)
+    assert run_batch(intake, output, workers=1, batch_size=5, restart=True)["records"] == 10
+
+
+def test_unordered_pool_writes_each_record_once(intake, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    totals = run_batch(intake, output, workers=2, batch_size=2, ordered=False)
+    assert totals["complete"] and sorted(line["line"] for line in results(output)) == list(range(1, 11))
@@ -0,0 +1,78 @@
+import os
+import stat
+
+import pytest
+
+import tts_cache
+from tts_cache import UnsafeCacheDir, cached_audio, speech_file
+
+
+class FakeVoiceHandler:
+    def __init__(self, directory):
+        self.directory = directory
+        self.calls = 0
+
+    def process_voice_output(self, text, lang_code):
+        self.calls += 1
+        path = os.path.join(self.directory, f"speech{self.calls}.mp3")
+        with open(path, "wb") as fp:
+            fp.write(b"ID3" + text.encode("utf-8"))
+        return path
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "tts_cache"
+    monkeypatch.setattr(tts_cache, "CACHE_DIR", str(directory))
+    monkeypatch.setattr(tts_cache, "_dir_checked", False)
+    return directory
+
+
+def mode(path):
+    return stat.S_IMODE(os.lstat(path).st_mode)
+
+
+@pytest.mark.skipif("TTS_CACHE_DIR" in os.environ, reason="cache directory set in the environment")
+def test_default_is_next_to_the_app():
+    assert os.path.dirname(tts_cache.CACHE_DIR) == os.path.dirname(tts_cache.__file__)
+
+
+def test_directory_is_created_private(cache_dir):
+    tts_cache._ensure_cache_dir()
+    assert cache_dir.is_dir()
+    assert mode(cache_dir) & 0o077 == 0
+
+
+def test_existing_directory_is_tightened(cache_dir):
+    cache_dir.mkdir(mode=0o755)
+    os.chmod(cache_dir, 0o755)
+    tts_cache._ensure_cache_dir()
+    assert mode(cache_dir) == 0o700
+
+
+def test_symlink_is_refused(cache_dir, tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir()
+    cache_dir.symlink_to(target)
+    with pytest.raises(UnsafeCacheDir):
+        tts_cache._ensure_cache_dir()
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs POSIX ownership")
+def test_directory_of_another_user_is_refused(cache_dir, monkeypatch):
+    cache_dir.mkdir()
+    monkeypatch.setattr(os, "getuid", lambda: os.lstat(cache_dir).st_uid + 1)
+    with pytest.raises(UnsafeCacheDir):
+        speech_file(FakeVoiceHandler(str(cache_dir.parent)), "hello", "en")
+    assert cached_audio("0" * 32 + ".mp3") is None
+
+
+def test_speech_is_synthesized_once(cache_dir, tmp_path):
+    handler = FakeVoiceHandler(str(tmp_path))
+    path, profile = speech_file(handler, "hello", "en")
+    again, _ = speech_file(handler, "hello", "en")
+    assert profile == "standard"
+    assert again == path
+    assert handler.calls == 1
+    assert os.path.dirname(path) == str(cache_dir)
+    assert cached_audio(os.path.basename(path)) == (path, "audio/mpeg")
@@ -0,0 +1,187 @@
+"""
+Normalization of symptom text to canonical catalogue symptoms.
+
+Exact matching misses inflected forms ("coughing", "feverish", "headaches") and other
+names for a symptom ("tummy pain", "can't breathe"). SymptomNormalizer builds two maps
+from a catalogue snapshot:
+- lemmas: each inflected form of a catalogue word, mapped to that word. Forms are
+  generated by suffix rules: cough -> coughs, coughing, coughed; fever -> feverish;
+  swelling -> swell, swells; dizziness -> dizzy.
+- phrases: the lemmatized words of every symptom name and synonym, mapped to the
+  symptom.
+Matching lemmatizes each token with one dict lookup, then looks up the n-grams of
+those lemmas, up to the longest phrase, in the phrase map. Synonyms are kept per
+language in the catalogue, and the phrase map takes every language. Telugu input
+(జ్వరం, తలనొప్పిగా, దగ్గుతో) and input that mixes Telugu and English are
+therefore recognized locally, with no translation call. There are suffix rules for
+English and for Telugu noun endings and case suffixes. Words of other languages,
+such as romanized Telugu, are matched as written.
+
+Text is NFC-normalized before tokenizing, and zero-width joiners and non-joiners are
+removed. Tokens are runs of letters, digits and Indic combining marks. A plain \w+
+breaks Telugu words at every vowel sign and virama; these runs keep each grapheme
+cluster, and so each word, whole.
+
+Set SYMPTOM_NORMALIZATION=0 to turn this off.
+"""
+import os
+import re
+import threading
+import unicodedata
+import weakref
+
+ENABLED = os.getenv('SYMPTOM_NORMALIZATION', '1') != '0'
+# Confidence reported for symptoms found through a synonym or an inflected form
+CONFIDENCE = 0.95
+# \w plus the Indic blocks (Devanagari to Sinhala, without the danda punctuation)
+TOKEN_PATTERN = re.compile(r'[\w\u0900-\u0963\u0966-\u0DFF]+')
+# Zero-width non-joiner, zero-width joiner and soft hyphen only affect rendering
+INVISIBLE = dict.fromkeys(map(ord, '\u200c\u200d\u00ad'))
+# Inflections are only generated for words at least this long
+MIN_INFLECTED_LENGTH = 3
+VOWELS = set("aeiou")
+
+
+def normalize_text(text):
+    """NFC, without invisible joiners, lower-cased; token offsets refer to this text"""
+    return unicodedata.normalize('NFC', text).translate(INVISIBLE).lower()
+
+
+def tokenize(text, normalized=False):
+    """(token, start, end) for each word of the normalized text"""
+    if not normalized:
+        text = normalize_text(text)
+    return [(found.group(), found.start(), found.end()) for found in TOKEN_PATTERN.finditer(text)]
+
+
+def english_forms(word):
+    """Inflected and derived forms of an English word"""
+    forms = {word + "s", word + "es", word + "ing", word + "ed", word + "ish", word + "ful"}
+    if word.endswith("e"):
+        forms |= {word[:-1] + "ing", word + "d", word[:-1] + "ish"}
+    if word.endswith("y") and word[-2:-1] not in VOWELS:
+        forms |= {word[:-1] + "ies", word[:-1] + "ied", word[:-1] + "iness"}
+    if len(word) >= 3 and word[-1] not in VOWELS | {"w", "x", "y"} and word[-2] in VOWELS and word[-3] not in VOWELS:
+        # Short consonant-vowel-consonant words double the final consonant: throb -> throbbing
+        forms |= {word + word[-1] + "ing", word + word[-1] + "ed"}
+    return forms
+
+
+def english_roots(word):
+    """Base words a derived English word comes from: swelling -> swell, dizziness -> dizzy"""
+    roots = set()
+    for suffix in ("ing", "ness", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_INFLECTED_LENGTH:
+            root = word[:-len(suffix)]
+            roots.add(root[:-1] + "y" if root.endswith("i") else root)
+    return roots
+
+
+# Case and other suffixes written straight after a Telugu noun: దగ్గుతో, తలనొప్పిగా, కడుపులో
+TELUGU_SUFFIXES = ("తో", "గా", "లో", "కి", "కు", "ని", "ను", "లు", "నే", "కూడా")
+TELUGU_ANUSVARA = "\u0c02"
+TELUGU_VOWEL_I = "\u0c3f"
+TELUGU_VOWEL_U = "\u0c41"
+
+
+def telugu_forms(word):
+    """Inflected forms of a Telugu noun"""
+    forms = {word + suffix for suffix in TELUGU_SUFFIXES}
+    if word.endswith(TELUGU_ANUSVARA):
+        # జ్వరం: జ్వరము, జ్వరాలు, జ్వరానికి, జ్వరాన్ని, జ్వరమా, జ్వరమే
+        stem = word[:-1]
+        forms |= {stem + "ము", stem + "ాలు", stem + "ానికి", stem + "ాన్ని", stem + "మా", stem + "మే"}
+    elif word.endswith(TELUGU_VOWEL_I):
+        # నొప్పి: నొప్పులు, నొప్పియా
+        forms |= {word[:-1] + "ులు", word[:-1] + "ుల", word + "యా"}
+    elif word.endswith(TELUGU_VOWEL_U):
+        # దగ్గు: దగ్గా, దగ్గే
+        forms |= {word[:-1] + "ా", word[:-1] + "ే"}
+    return forms
+
+
+def telugu_roots(word):
+    """The -ం form of an older -ము noun: జ్వరము -> జ్వరం"""
+    if word.endswith("ము") and len(word) > 3:
+        return {word[:-2] + TELUGU_ANUSVARA}
+    return set()
+
+
+# language -> (forms, roots); languages without rules are matched as written
+INFLECTION_RULES = {"english": (english_forms, english_roots), "telugu": (telugu_forms, telugu_roots)}
+
+
+class SymptomNormalizer:
+    """Lemma and synonym maps for one catalogue snapshot"""
+    def __init__(self, catalogue):
+        phrases_by_language = {}
+        self.order = {}
+        for position, (symptom, info) in enumerate(catalogue.symptoms.items()):
+            self.order[symptom] = position
+            phrases_by_language.setdefault("english", []).append((symptom, symptom))
+            for language, terms in info.get("synonyms", {}).items():
+                phrases_by_language.setdefault(language, []).extend((term, symptom) for term in terms)
+
+        vocabulary = {token for phrases in phrases_by_language.values()
+                      for phrase, _ in phrases for token, _, _ in tokenize(phrase)}
+        self.lemmas = {}
+        for language, phrases in phrases_by_language.items():
+            if language not in INFLECTION_RULES:
+                continue
+            forms, roots = INFLECTION_RULES[language]
+            for phrase, _ in phrases:
+                for word, _, _ in tokenize(phrase):
+                    if len(word) < MIN_INFLECTED_LENGTH:
+                        continue
+                    for root in roots(word):
+                        for form in {root} | forms(root):
+                            if form not in vocabulary:
+                                self.lemmas.setdefault(form, word)
+                    for form in forms(word):
+                        # Catalogue words always stand for themselves
+                        if form not in vocabulary:
+                            self.lemmas.setdefault(form, word)
+
+        self.phrases = {}
+        for phrases in phrases_by_language.values():
+            for phrase, symptom in phrases:
+                key = tuple(self.lemma(token) for token, _, _ in tokenize(phrase))
+                if key:
+                    self.phrases.setdefault(key, symptom)
+        self.max_words = max(map(len, self.phrases), default=0)
+
+    def lemma(self, token):
+        return self.lemmas.get(token, token)
+
+    def normalize(self, text):
+        """The lemmas of the words of text"""
+        return [self.lemma(token) for token, _, _ in tokenize(text)]
+
+    def match(self, text):
+        """(symptom, matched text) for every symptom named in text, in catalogue order"""
+        text = normalize_text(text)
+        tokens = tokenize(text, normalized=True)
+        lemmas = [self.lemma(token) for token, _, _ in tokens]
+        found = {}
+        for start in range(len(tokens)):
+            # Longest phrase first: "tired all the time" rather than "tired"
+            for end in range(min(start + self.max_words, len(tokens)), start, -1):
+                symptom = self.phrases.get(tuple(lemmas[start:end]))
+                if symptom is not None and symptom not in found:
+                    found[symptom] = text[tokens[start][1]:tokens[end - 1][2]]
+        return sorted(found.items(), key=lambda item: self.order[item[0]])
+
+
+_normalizers = weakref.WeakKeyDictionary()
+_normalizers_lock = threading.Lock()
+
+
+def normalizer_for(catalogue):
+    """The SymptomNormalizer of a catalogue snapshot, built on first use"""
+    normalizer = _normalizers.get(catalogue)
+    if normalizer is None:
+        with _normalizers_lock:
+            normalizer = _normalizers.get(catalogue)
+            if normalizer is None:
+                normalizer = _normalizers[catalogue] = SymptomNormalizer(catalogue)
+    return normalizer
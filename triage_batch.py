@@ -0,0 +1,264 @@
+"""
+Batch triage of JSONL intake files.
+
+    python -m triage_batch batch intake.jsonl results.jsonl [--workers N] [--unordered]
+    python -m triage_batch status results.jsonl
+
+One intake record per line:
+    {"id": "A-17", "symptoms": "...", "language": "english", "follow_up_answers": [...]}
+input_text is accepted instead of symptoms, so evaluation corpora can be run as well.
+Each result line carries the record's id and line number, the matched symptoms, the
+follow-up question plan and the summary, or an error for lines that cannot be read.
+Summaries in other languages come from their language pack; nothing is sent to the
+translation service, so the user's own words are kept as written.
+
+The input is read line by line, and records go to a process pool in batches, with at
+most 2 * workers batches in flight. Memory stays bounded whatever the file size.
+Results are written in input order, or as they finish with --unordered.
+
+Progress is checkpointed to <output>.checkpoint at most every CHECKPOINT_INTERVAL
+seconds. The checkpoint holds the input offset up to which every batch is written, the
+batches written after it (with --unordered) and the output size at that point. Running
+the same command again resumes there. Output written after the last checkpoint is
+truncated and those batches are triaged again, so every record appears exactly once.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+DEFAULT_BATCH_SIZE = 256
+CHECKPOINT_INTERVAL = float(os.getenv('CHECKPOINT_INTERVAL', 5.0))
+
+
+class CheckpointError(Exception):
+    """Raised when a checkpoint does not belong to the run being resumed"""
+
+
+def triage_record(record):
+    """Symptoms, question plan and summary for one intake record"""
+    from symptom_catalogue import current_catalogue
+    from fuzzy_matcher import match_symptoms
+    from triage_engine import ask_follow_up, generate_summary
+
+    text = record.get("symptoms", record.get("input_text"))
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("record has no symptoms text")
+    language = str(record.get("language", "english")).lower()
+    matches = match_symptoms(current_catalogue(), text)
+    return {
+        "symptoms": [match._asdict() for match in matches],
+        "follow_up_questions": [question["question"] for question in ask_follow_up(text, language)],
+        "summary": generate_summary(text, language, record.get("follow_up_answers"))
+    }
+
+
+def triage_batch(lines):
+    """Result lines for a batch of (line number, raw line) pairs; runs inside worker processes"""
+    results = []
+    errors = 0
+    for number, raw in lines:
+        if not raw.strip():
+            continue
+        result = {"line": number}
+        try:
+            record = json.loads(raw)
+            if not isinstance(record, dict):
+                raise ValueError("record must be a JSON object")
+            if "id" in record:
+                result["id"] = record["id"]
+            result.update(triage_record(record))
+        except Exception as e:
+            # One bad record must not stop a run of a million
+            result["error"] = str(e) or type(e).__name__
+            errors += 1
+        results.append(json.dumps(result, ensure_ascii=False))
+    return len(results), errors, ''.join(line + '\n' for line in results).encode('utf-8')
+
+
+def iter_batches(path, offset, line, size):
+    """(start offset, end offset, [(line number, raw line), ...]) from offset onwards"""
+    with open(path, 'rb') as fp:
+        fp.seek(offset)
+        batch, start = [], offset
+        for raw in fp:
+            line += 1
+            offset += len(raw)
+            batch.append((line, raw.decode('utf-8', errors='replace')))
+            if len(batch) >= size:
+                yield start, offset, line, batch
+                batch, start = [], offset
+        if batch:
+            yield start, offset, line, batch
+
+
+def checkpoint_path_for(output):
+    return output + ".checkpoint"
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    # Written aside and renamed, so a crash never leaves half a checkpoint
+    temporary = path + ".tmp"
+    with open(temporary, 'w', encoding='utf-8') as fp:
+        json.dump(state, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(temporary, path)
+
+
+def _map_batches(batches, workers, ordered):
+    """Yield (start, end, last line, triage_batch result), keeping at most 2 * workers batches in flight"""
+    if workers <= 1:
+        for start, end, line, batch in batches:
+            yield start, end, line, triage_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # (future, batch bounds) in submission order; finished ones wait here until yielded
+        in_flight = deque()
+
+        def collect():
+            if ordered:
+                wait([in_flight[0][0]])
+                while in_flight and in_flight[0][0].done():
+                    future, bounds = in_flight.popleft()
+                    yield bounds + (future.result(),)
+            else:
+                wait([future for future, _ in in_flight], return_when=FIRST_COMPLETED)
+                for item in [item for item in in_flight if item[0].done()]:
+                    in_flight.remove(item)
+                    yield item[1] + (item[0].result(),)
+
+        for start, end, line, batch in batches:
+            in_flight.append((executor.submit(triage_batch, batch), (start, end, line)))
+            if len(in_flight) >= workers * 2:
+                yield from collect()
+        while in_flight:
+            yield from collect()
+
+
+def run_batch(input_path, output_path, workers=None, batch_size=DEFAULT_BATCH_SIZE, ordered=True,
+              checkpoint=None, restart=False, progress=None):
+    """Triage input_path into output_path, resuming from the checkpoint; returns the run's totals"""
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    checkpoint = checkpoint or checkpoint_path_for(output_path)
+    report = progress or (lambda state, rate: None)
+    state = None if restart else read_checkpoint(checkpoint)
+    if state is not None:
+        if state["input"] != os.path.abspath(input_path) or state["batch_size"] != batch_size:
+            raise CheckpointError(f"{checkpoint} belongs to {state['input']} with batch size {state['batch_size']}; "
+                                  "use --restart to start over")
+        if not os.path.exists(output_path) or os.path.getsize(output_path) < state["output_size"]:
+            raise CheckpointError(f"{output_path} is shorter than recorded in {checkpoint}; use --restart")
+    else:
+        state = {"input": os.path.abspath(input_path), "batch_size": batch_size, "offset": 0, "line": 0,
+                 "written_ahead": [], "output_size": 0, "records": 0, "errors": 0, "complete": False}
+    if state["complete"]:
+        return dict(state, resumed=True, processed=0, elapsed=0.0, records_per_second=0.0)
+    resumed_records = state["records"]
+
+    # Batches written after the checkpointed offset; only --unordered runs have any
+    written_ahead = {start: (end, line) for start, end, line in state["written_ahead"]}
+    skipped = set(written_ahead)
+    # Finished batches not yet covered by the contiguous offset
+    done = {}
+    started = time.perf_counter()
+    next_checkpoint = started + CHECKPOINT_INTERVAL
+
+    with open(output_path, 'r+b' if os.path.exists(output_path) and not restart else 'wb') as out:
+        # Drop whatever was written after the last checkpoint
+        out.truncate(state["output_size"])
+        out.seek(state["output_size"])
+        batches = (batch for batch in iter_batches(input_path, state["offset"], state["line"], batch_size)
+                   if batch[0] not in skipped)
+
+        def save():
+            out.flush()
+            os.fsync(out.fileno())
+            state["output_size"] = out.tell()
+            state["written_ahead"] = sorted([start, end, line] for start, (end, line) in {**written_ahead, **done}.items())
+            write_checkpoint(checkpoint, state)
+            elapsed = time.perf_counter() - started
+            report(state, (state["records"] - resumed_records) / elapsed if elapsed else 0.0)
+
+        for start, end, line, (count, errors, data) in _map_batches(batches, workers, ordered):
+            out.write(data)
+            state["records"] += count
+            state["errors"] += errors
+            done[start] = (end, line)
+            # Advance the offset over every batch finished without a gap
+            while state["offset"] in done or state["offset"] in written_ahead:
+                start = state["offset"]
+                state["offset"], state["line"] = done.pop(start, None) or written_ahead.pop(start)
+            if time.perf_counter() >= next_checkpoint:
+                save()
+                next_checkpoint = time.perf_counter() + CHECKPOINT_INTERVAL
+        # Batches skipped as already written may close the last gaps
+        while state["offset"] in written_ahead:
+            state["offset"], state["line"] = written_ahead.pop(state["offset"])
+        state["complete"] = not done and not written_ahead
+        save()
+
+    elapsed = time.perf_counter() - started
+    processed = state["records"] - resumed_records
+    return dict(state, resumed=resumed_records > 0, processed=processed, elapsed=round(elapsed, 2),
+                records_per_second=round(processed / elapsed, 1) if elapsed else 0.0)
+
+
+def print_progress(state, rate):
+    print(f"{state['records']} records ({state['errors']} errors), line {state['line']}, "
+          f"{rate:.0f} records/s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m triage_batch', description="Batch triage of JSONL intake files")
+    commands = parser.add_subparsers(dest='command', required=True)
+    batch = commands.add_parser('batch', help='Triage an intake file, resuming from its checkpoint')
+    batch.add_argument('input', help='JSONL intake file')
+    batch.add_argument('output', help='JSONL results file')
+    batch.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    batch.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    batch.add_argument('--unordered', action='store_true', help='Write results as they finish, not in input order')
+    batch.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint)')
+    batch.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+    status = commands.add_parser('status', help='Show the progress recorded for a results file')
+    status.add_argument('output', help='JSONL results file')
+    status.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        state = read_checkpoint(args.checkpoint or checkpoint_path_for(args.output))
+        if state is None:
+            print(f"No checkpoint for {args.output}")
+            return 1
+        print(f"{state['input']}: {state['records']} records ({state['errors']} errors) up to line {state['line']}, "
+              f"{'complete' if state['complete'] else 'incomplete'}")
+        return 0
+
+    try:
+        result = run_batch(args.input, args.output, args.workers, args.batch_size, not args.unordered,
+                           args.checkpoint, args.restart, print_progress)
+    except CheckpointError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if result["processed"] == 0 and result["resumed"]:
+        print(f"{args.output} is already complete: {result['records']} records ({result['errors']} errors)")
+        return 0
+    print(f"{result['records']} records ({result['errors']} errors) in {result['elapsed']} s, "
+          f"{result['records_per_second']} records/s{' (resumed)' if result['resumed'] else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
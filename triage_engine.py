@@ -0,0 +1,198 @@
+"""
+Local symptom triage: summary generation and follow-up question planning.
+
+Kept free of Flask so it can be imported by worker processes (evaluation, batch jobs)
+without starting the web application.
+"""
+from fuzzy_matcher import match_symptoms
+from symptom_catalogue import current_catalogue
+from language_packs import BASE_LANGUAGE, get_pack, pack_for
+from request_tracing import traced
+
+
+# Sections that must reach the user first when a summary is streamed
+URGENT_SECTIONS = ("urgent_warnings", "emergency_warning")
+
+
+def _identity(text):
+    return text
+
+
+def iter_summary_sections(symptoms, language="English", follow_up_answers=None, translate=None):
+    """
+    Yields (section, text) pairs of the medical summary as each one is produced: opening,
+    identified_symptoms, urgent_warnings, recommendations, follow_up_insights,
+    severity_guidance, general_recommendations and emergency_warning.
+
+    Sections are rendered from the templates and lexicon of the language's pack
+    (language_packs), in English when it has none. translate(text) localizes the user's
+    own words and catalogue strings missing from the lexicon; they are kept as written
+    without it.
+    """
+    pack = pack_for(language)
+    if not pack.localized:
+        pack = get_pack(BASE_LANGUAGE)
+    if translate is None or pack.base is None:
+        translate = _identity
+    # One catalogue snapshot for the whole summary, even if the file is reloaded meanwhile
+    catalogue = current_catalogue()
+    matches = match_symptoms(catalogue, symptoms)
+    identified_symptoms = {match.symptom: catalogue.symptoms[match.symptom] for match in matches}
+    # What the user wrote for symptoms that were only recognized approximately
+    interpreted = {match.symptom: match.text for match in matches if match.confidence < 1.0}
+    # English source text of everything rendered so far, for the checks on its wording
+    mentioned = [symptoms]
+    
+    # Generate personalized summary
+    yield "opening", pack.render("opening", symptoms=translate(symptoms))
+    
+    if identified_symptoms:
+        symptom_details = []
+        warnings = []
+        specific_recommendations = []
+        
+        for symptom, info in identified_symptoms.items():
+            name, severity = pack.string(symptom, translate), pack.string(info['severity'], translate)
+            mentioned += [symptom, info['severity']]
+            # Add symptom-specific details
+            if symptom in interpreted:
+                symptom_details.append(pack.render("symptom_detail_interpreted", symptom=name,
+                                                   text=interpreted[symptom], severity=severity))
+            else:
+                symptom_details.append(pack.render("symptom_detail", symptom=name, severity=severity))
+            
+            # Add urgent warnings
+            if 'urgent' in info['urgency'].lower() or 'immediate' in info['urgency'].lower():
+                warnings.append(pack.render("warning", symptom=name, urgency=pack.string(info['urgency'], translate)))
+                mentioned.append(info['urgency'])
+            
+            # Add detailed symptom-specific recommendations
+            specific_recommendations.extend(info.get('specific_recommendations', ()))
+        
+        yield "identified_symptoms", pack.render("identified_symptoms", details=pack.join(symptom_details))
+        
+        if warnings:
+            yield "urgent_warnings", pack.render("urgent_warnings", warnings=pack.join(warnings, "warning_separator"))
+        
+        # Combine general and specific recommendations
+        all_recommendations = [
+            pack.render("see_doctor"),
+            pack.render("keep_records"),
+            *(pack.string(rec, translate) for rec in specific_recommendations)
+        ]
+        mentioned += specific_recommendations
+        yield "recommendations", pack.render("recommendations", recommendations=pack.join(all_recommendations))
+    
+    # Analyze follow-up information and integrate insights
+    if follow_up_answers:
+        section = [pack.render("follow_up_insights")]
+        # (kind, response) for each answer that tells something
+        insights = []
+        
+        for answer in follow_up_answers:
+            question = answer['question'].lower()
+            response = answer['answer'].lower()
+            
+            # Analyze duration-related responses
+            if 'how long' in question or 'when' in question:
+                if any(word in response for word in ['day', 'week', 'month']):
+                    insights.append(("duration", response))
+            
+            # Analyze severity-related responses
+            elif 'scale' in question or 'intensity' in question:
+                if any(str(i) for i in range(1, 11) if str(i) in response):
+                    insights.append(("severity", response))
+            
+            # Analyze pattern-related responses
+            elif 'pattern' in question or 'worse' in question:
+                insights.append(("pattern", response))
+            
+            # Analyze treatment-related responses
+            elif 'medication' in question or 'taken' in question:
+                insights.append(("treatment", response))
+        
+        if insights:
+            section.append(pack.render("insights", insights=pack.join(
+                pack.render(f"insight_{kind}", response=translate(response)) for kind, response in insights)))
+            responses = [response for _, response in insights]
+            mentioned += responses
+            
+            # Add severity-based recommendations
+            if any(kind == "severity" or 'severity' in response for kind, response in insights):
+                if any(str(i) for i in range(7, 11) for response in responses if str(i) in response):
+                    section.append(pack.render("high_severity_answer"))
+                elif any(str(i) for i in range(4, 7) for response in responses if str(i) in response):
+                    section.append(pack.render("moderate_severity_answer"))
+            
+            # Add duration-based recommendations
+            if any(kind == "duration" or 'duration' in response for kind, response in insights):
+                summary_so_far = ' '.join(mentioned).lower()
+                if any(word in summary_so_far for word in ['week', 'month']):
+                    section.append(pack.render("persistent"))
+        
+        yield "follow_up_insights", ''.join(section)
+    
+    # Add severity-based insights
+    severity_level = "Low"
+    if identified_symptoms:
+        severity_scores = []
+        for symptom, info in identified_symptoms.items():
+            if info['severity'].lower().startswith('high'):
+                severity_scores.append(3)
+            elif info['severity'].lower().startswith('moderate'):
+                severity_scores.append(2)
+            else:
+                severity_scores.append(1)
+        
+        avg_severity = sum(severity_scores) / len(severity_scores)
+        if avg_severity > 2.5:
+            severity_level = "High"
+            yield "severity_guidance", pack.render("severity_high")
+        elif avg_severity > 1.5:
+            severity_level = "Moderate"
+            yield "severity_guidance", pack.render("severity_moderate")
+        else:
+            yield "severity_guidance", pack.render("severity_low")
+    
+    # Include symptom-specific general recommendations from the catalogue
+    if identified_symptoms:
+        general_recommendations = []
+        for symptom, info in identified_symptoms.items():
+            if 'general_recommendations' in info:
+                general_recommendations.extend(info['general_recommendations'])
+        
+        # Remove duplicates while preserving order
+        seen = set()
+        unique_recommendations = []
+        for rec in general_recommendations:
+            if rec not in seen:
+                seen.add(rec)
+                unique_recommendations.append(pack.string(rec, translate))
+        
+        if unique_recommendations:
+            yield "general_recommendations", pack.render("general_recommendations",
+                                                         recommendations=pack.join(unique_recommendations))
+    
+    # Add emergency warning signs based on severity
+    if severity_level == "High":
+        yield "emergency_warning", pack.render("emergency_warning")
+
+@traced('generate_summary')
+def generate_summary(symptoms, language="English", follow_up_answers=None, format_type="concise", translate=None):
+    """
+    Generates a medical summary based on user symptoms and follow-up answers using local processing.
+    Always generates a concise single-paragraph summary optimized for quick medical review,
+    in the language when it has a summary pack.
+    """
+    return ''.join(text for _, text in iter_summary_sections(symptoms, language, follow_up_answers,
+                                                             translate)).strip()
+
+@traced('ask_follow_up')
+def ask_follow_up(symptoms, language="English"):
+    """Return the follow-up questions for the symptoms from the precomputed bilingual plans"""
+    catalogue = current_catalogue()
+    # Name approximately matched symptoms, so that their questions are planned as well
+    corrected = [match.symptom for match in match_symptoms(catalogue, symptoms) if match.confidence < 1.0]
+    if corrected:
+        symptoms = f"{symptoms} {' '.join(corrected)}"
+    return [question._asdict() for question in catalogue.get_question_plan(symptoms, language)]
@@ -0,0 +1,202 @@
+"""
+Synthesized speech cache and output profiles.
+
+Each text/language pair is synthesized once. gTTS's MP3 is stored under a hash of the
+language and text in TTS_CACHE_DIR. Transcoded variants for other output profiles are
+stored next to it:
+
+    standard       MP3 exactly as gTTS produces it
+    low_bandwidth  Opus at 16 kbit/s in Ogg, for mobile networks
+    compact_mp3    MP3 at 24 kbit/s, 16 kHz mono, for clients without Opus
+
+Transcoding uses the same local ffmpeg as audio_codecs. Without ffmpeg, every profile
+falls back to standard. The file names are content hashes, so GET /chatbot/audio/<name>
+can serve them as immutable. Those responses support Range requests, ETags and
+If-None-Match, so replaying a question or summary neither re-synthesizes nor
+re-downloads it. The least recently used files are removed once the cache grows past
+TTS_CACHE_MAX_MB.
+
+The cache directory defaults to tts_cache/ next to this module rather than the shared
+system temp directory. It is created with mode 0o700, and a directory owned by another
+user (or a symlink) is refused, so no other account can plant or read cached audio.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+
+from audio_codecs import FFMPEG
+from request_tracing import span
+
+CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'tts_cache'))
+MAX_CACHE_BYTES = int(float(os.getenv('TTS_CACHE_MAX_MB', 256)) * 1024 * 1024)
+DEFAULT_PROFILE = os.getenv('TTS_DEFAULT_PROFILE', 'standard')
+# Check the cache size after this many new files
+PRUNE_EVERY = 50
+TRANSCODE_TIMEOUT = 30
+# Texts hash onto a fixed set of locks, so memory stays flat however many are spoken
+LOCK_STRIPES = 64
+
+# profile: (file extension, mimetype, ffmpeg output arguments or None for gTTS's MP3)
+OUTPUT_PROFILES = {
+    "standard": ("mp3", "audio/mpeg", None),
+    "low_bandwidth": ("ogg", "audio/ogg; codecs=opus",
+                      ['-c:a', 'libopus', '-b:a', '16k', '-application', 'voip', '-f', 'ogg']),
+    "compact_mp3": ("mp3", "audio/mpeg", ['-c:a', 'libmp3lame', '-b:a', '24k', '-ar', '16000', '-ac', '1', '-f', 'mp3'])
+}
+MIMETYPES = {"mp3": "audio/mpeg", "ogg": "audio/ogg"}
+FILE_NAME = re.compile(r'^[0-9a-f]{32}(\.[a-z_]+)?\.(mp3|ogg)$')
+
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_written = 0
+# Set once the cache directory has passed _ensure_cache_dir
+_dir_checked = False
+
+
+class UnsafeCacheDir(Exception):
+    """Raised when TTS_CACHE_DIR is not a directory private to this process's user"""
+
+
+def _ensure_cache_dir():
+    """Create the cache directory with mode 0o700, refusing one that another user controls"""
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    info = os.lstat(CACHE_DIR)
+    if not stat.S_ISDIR(info.st_mode):
+        raise UnsafeCacheDir(f"{CACHE_DIR} is not a directory")
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise UnsafeCacheDir(f"{CACHE_DIR} is owned by another user")
+    if info.st_mode & 0o077:
+        os.chmod(CACHE_DIR, 0o700)
+    global _dir_checked
+    _dir_checked = True
+
+
+def available_profiles():
+    """Output profiles this server can produce"""
+    return [name for name, (_, _, ffmpeg_args) in OUTPUT_PROFILES.items() if FFMPEG or ffmpeg_args is None]
+
+
+def choose_profile(requested):
+    """The requested profile if it can be produced, else the default"""
+    profiles = available_profiles()
+    if requested in profiles:
+        return requested
+    return DEFAULT_PROFILE if DEFAULT_PROFILE in profiles else "standard"
+
+
+def _key_lock(key):
+    return _locks[int(key[:8], 16) % LOCK_STRIPES]
+
+
+def _cache_path(key, profile):
+    extension = OUTPUT_PROFILES[profile][0]
+    return os.path.join(CACHE_DIR, f"{key}.{extension}" if profile == "standard" else f"{key}.{profile}.{extension}")
+
+
+def _store(source, final_path):
+    """Move a finished file into the cache so that readers never see a partial file"""
+    # Forked workers can have threads with the same ident
+    staging = f"{final_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.move(source, staging)
+    os.replace(staging, final_path)
+
+
+def _transcode(source_path, profile):
+    ffmpeg_args = OUTPUT_PROFILES[profile][2]
+    with tempfile.NamedTemporaryFile(delete=False, dir=CACHE_DIR, suffix='.tmp') as fp:
+        output = fp.name
+    with span(f'tts.transcode_{profile}'):
+        result = subprocess.run([FFMPEG, '-hide_banner', '-loglevel', 'error', '-y', '-i', source_path,
+                                 *ffmpeg_args, output], capture_output=True, timeout=TRANSCODE_TIMEOUT)
+    if result.returncode != 0:
+        os.remove(output)
+        raise RuntimeError(result.stderr.decode(errors='replace').strip())
+    return output
+
+
+def speech_file(voice_handler, text, lang_code, profile="standard"):
+    """
+    Path and profile of the cached speech for text, synthesizing and transcoding only on
+    a cache miss. Returns (None, None) if synthesis fails. Cached files must not be
+    deleted by the caller. Raises UnsafeCacheDir if the cache directory is not private.
+    """
+    profile = choose_profile(profile)
+    key = hashlib.sha256(f"{lang_code}\0{text}".encode('utf-8')).hexdigest()[:32]
+    path = _cache_path(key, profile)
+    if not _dir_checked:
+        # Files already in a directory someone else controls must not be served
+        _ensure_cache_dir()
+    try:
+        # Touch on every hit; pruning removes the least recently used files first
+        os.utime(path)
+        return path, profile
+    except FileNotFoundError:
+        pass
+
+    global _written
+    with _key_lock(key):
+        if os.path.exists(path):
+            return path, profile
+        _ensure_cache_dir()
+        source = _cache_path(key, "standard")
+        if not os.path.exists(source):
+            synthesized = voice_handler.process_voice_output(text, lang_code)
+            if not synthesized:
+                return None, None
+            _store(synthesized, source)
+            _written += 1
+        if profile != "standard":
+            try:
+                _store(_transcode(source, profile), path)
+                _written += 1
+            except Exception as e:
+                logging.error(f"Error transcoding speech to {profile}: {e}")
+                return source, "standard"
+    if _written >= PRUNE_EVERY:
+        _written = 0
+        prune_cache()
+    return path, profile
+
+
+def prune_cache(max_bytes=MAX_CACHE_BYTES):
+    """Delete the least recently used files until the cache fits in max_bytes"""
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.is_file() and FILE_NAME.match(entry.name)]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    total = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        size = entry.stat().st_size
+        try:
+            os.remove(entry.path)
+            total -= size
+        except OSError:
+            pass
+
+
+def cached_audio(name):
+    """(path, mimetype) for a cache file name from an audio URL, or None"""
+    if not FILE_NAME.match(name):
+        return None
+    if not _dir_checked:
+        try:
+            _ensure_cache_dir()
+        except UnsafeCacheDir as e:
+            logging.error(f"Not serving cached speech: {e}")
+            return None
+    path = os.path.join(CACHE_DIR, name)
+    if not os.path.exists(path):
+        return None
+    return path, MIMETYPES[name.rsplit('.', 1)[1]]
+
+
+def audio_url(path):
+    return f"/chatbot/audio/{os.path.basename(path)}"
@@ -6,15 +6,20 @@ import os
 import tempfile
 import logging
 import time
+import threading
+from collections import OrderedDict
+from request_tracing import traced
+from language_packs import get_pack, language_for_code, translate_codes
+
+# Translations kept in memory; repeated summary sections and questions skip the remote call
+TRANSLATION_CACHE_SIZE = int(os.getenv('TRANSLATION_CACHE_SIZE', 2048))
 
 class VoiceLanguageHandler:
     def __init__(self):
         self.recognizer = sr.Recognizer()
         self.translator = None  # Will be created per translation with correct language
-        self.supported_languages = {
-            'english': 'en',
-            'telugu': 'te'
-        }
+        self._translation_cache = OrderedDict()
+        self._translation_cache_lock = threading.Lock()
         
         # Initialize logging with custom format
         logging.basicConfig(
@@ -49,6 +54,11 @@ class VoiceLanguageHandler:
             logging.error(f"Failed to initialize audio system: {str(e)}")
             logging.error("Please check your microphone connection and system audio settings")
 
+    @property
+    def supported_languages(self):
+        """{language: translate code} for every installed language pack, from their codes alone"""
+        return translate_codes()
+
     def _check_audio_system(self):
         """Verify audio system configuration"""
         try:
@@ -162,6 +172,7 @@ class VoiceLanguageHandler:
             logging.error(f"Error during audio system check: {e}. Please verify audio drivers are installed correctly.")
             return False
 
+    @traced('voice.speech_to_text')
     def speech_to_text(self, audio_data, source_language='en-IN'):
         """Convert speech to text with language support"""
         try:
@@ -256,6 +267,7 @@ class VoiceLanguageHandler:
             logging.error(f"Unexpected error in speech recognition: {e}")
             return None
 
+    @traced('voice.text_to_speech')
     def text_to_speech(self, text, language='en'):
         """Convert text to speech with language support"""
         try:
@@ -269,7 +281,30 @@ class VoiceLanguageHandler:
             logging.error(f"Error in text to speech conversion: {e}")
             return None
 
+    def cached_translation(self, text, to_lang='te'):
+        """Previously translated text, or None without calling the translation service"""
+        with self._translation_cache_lock:
+            translated = self._translation_cache.get((text, to_lang))
+            if translated is not None:
+                self._translation_cache.move_to_end((text, to_lang))
+            return translated
+
     def translate_text(self, text, to_lang='te'):
+        """Translate text, answering repeated requests from the translation cache"""
+        translated = self.cached_translation(text, to_lang)
+        if translated is not None:
+            return translated
+        translated = self._translate_uncached(text, to_lang)
+        # Failed translations fall back to the original text; don't cache those
+        if translated and translated != text:
+            with self._translation_cache_lock:
+                self._translation_cache[(text, to_lang)] = translated
+                if len(self._translation_cache) > TRANSLATION_CACHE_SIZE:
+                    self._translation_cache.popitem(last=False)
+        return translated
+
+    @traced('voice.translate_text')
+    def _translate_uncached(self, text, to_lang='te'):
         """Translate text between languages with enhanced error handling"""
         try:
             if not text or not isinstance(text, str):
@@ -394,18 +429,17 @@ class VoiceLanguageHandler:
             logging.error("Please check your microphone connection and try again.")
             return None
 
+    @traced('voice.process_voice_output')
     def process_voice_output(self, text, lang_code):
         """Convert text to speech in the specified language"""
         try:
-            # Normalize language code
+            # Normalize language code: a language name stands for its pack's TTS code
             lang_code = lang_code.lower()
-            if lang_code in ['english', 'en']:
-                lang_code = 'en'
-            elif lang_code in ['telugu', 'te']:
-                lang_code = 'te'
+            if get_pack(lang_code) is not None:
+                lang_code = get_pack(lang_code).tts_code
 
             # Validate language code
-            if lang_code not in ['en', 'te']:
+            if language_for_code(lang_code) is None:
                 raise ValueError(f"Language not supported: {lang_code}")
 
             # Create temporary file for audio
@@ -427,7 +461,7 @@ class VoiceLanguageHandler:
                 return None
 
             # Validate language code
-            if language not in self.supported_languages.values():
+            if language_for_code(language) is None:
                 logging.error(f"Unsupported language code: {language}")
                 return None
 
@@ -475,7 +509,7 @@ class VoiceLanguageHandler:
 
             # Validate and normalize language code
             language = language.lower()
-            if language not in self.supported_languages.values():
+            if language_for_code(language) is None:
                 logging.warning(f"Unsupported language {language}, falling back to English")
                 language = 'en'
 
@@ -0,0 +1,315 @@
+"""
+Socket.IO consultation channel.
+
+The /consultation namespace carries a whole multi-turn consultation over one connection:
+
+    client -> server  start      {"language", "symptoms" or "audio": <bytes>, "voice_response", "audio_profile"}
+                                 (audio is raw PCM or any format from /chatbot/audio-formats)
+    client -> server  answer     {"answer" or "audio": <bytes>}
+    client -> server  audio_ack  {"seq"}
+    server -> client  question   {"index", "total", "question"}  (the first also has "original_symptoms",
+                                 a question re-sent after reconnecting has "resumed": true)
+    server -> client  section    {"section", "order", "text"}
+    server -> client  summary    {"summary_sheet", "translation_status", "qos_tier"}
+    server -> client  audio      {"seq", "last", "mimetype", "chunk": <bytes>}
+    server -> client  error      {"error", "code"}  ("retry_after" when rate limited or overloaded)
+
+Audio travels as Socket.IO binary attachments instead of base64 strings, and the
+consultation state stays on the server, so the client does not echo the question list
+on every turn. Backpressure is per connection: one message is processed at a time
+(others get a "busy" error), uploads are capped at MAX_AUDIO_UPLOAD bytes, and at most
+AUDIO_WINDOW audio chunks may be unacknowledged before the server waits for audio_ack.
+Under load the qos_controller tier may skip question audio and degrade the translation.
+
+Every step is also saved in consultation_store. When the server runs as several worker
+processes, a client that reconnects to another worker resumes the same consultation.
+Events are fanned out between workers by the message queue from SOCKETIO_MESSAGE_QUEUE
+(see message_broker).
+"""
+import logging
+import os
+import threading
+
+from flask import request, session
+from flask_socketio import SocketIO, Namespace
+
+from admission_control import admit, AdmissionRejected
+from audio_codecs import decode_audio, UnsupportedAudio
+from consultation import iter_summary_updates
+from consultation_store import save_consultation_state, load_consultation_state, clear_consultation_state
+from language_packs import needs_translation, pack_for
+from message_broker import message_queue_options
+from qos_controller import qos, tier_allows_tts
+from tts_cache import speech_file, OUTPUT_PROFILES
+from request_tracing import register_metric
+from triage_engine import ask_follow_up
+
+socketio = SocketIO()
+
+NAMESPACE = '/consultation'
+AUDIO_CHUNK_SIZE = 32 * 1024
+AUDIO_WINDOW = int(os.getenv('SOCKETIO_AUDIO_WINDOW', 8))
+AUDIO_ACK_TIMEOUT = float(os.getenv('SOCKETIO_AUDIO_ACK_TIMEOUT', 10))
+MAX_AUDIO_UPLOAD = int(os.getenv('SOCKETIO_MAX_AUDIO_UPLOAD', 10 * 1024 * 1024))
+
+
+class ConsultationState:
+    """Consultation progress and audio flow control for one connection"""
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.language = "english"
+        self.voice_response = False
+        self.audio_profile = "standard"
+        self.original_symptoms = ""
+        self.questions = []
+        self.index = 0
+        self.answers = []
+        self.tier = "full"
+        self.busy = threading.Lock()
+        self.credit = threading.Condition()
+        self.sent_seq = 0
+        self.acked_seq = 0
+
+    def to_dict(self):
+        return {
+            "language": self.language,
+            "voice_response": self.voice_response,
+            "audio_profile": self.audio_profile,
+            "original_symptoms": self.original_symptoms,
+            "questions": self.questions,
+            "index": self.index,
+            "answers": self.answers
+        }
+
+    def restore(self, saved):
+        self.language = saved["language"]
+        self.voice_response = saved["voice_response"]
+        self.audio_profile = saved.get("audio_profile", "standard")
+        self.original_symptoms = saved["original_symptoms"]
+        self.questions = saved["questions"]
+        self.index = saved["index"]
+        self.answers = saved["answers"]
+
+    def wait_for_credit(self, timeout):
+        """Block until another audio chunk fits in the window; False on timeout"""
+        with self.credit:
+            return self.credit.wait_for(lambda: self.sent_seq - self.acked_seq < AUDIO_WINDOW, timeout)
+
+    def next_seq(self):
+        with self.credit:
+            self.sent_seq += 1
+            return self.sent_seq
+
+    def ack(self, seq):
+        with self.credit:
+            if seq > self.acked_seq:
+                self.acked_seq = min(seq, self.sent_seq)
+                self.credit.notify_all()
+
+
+class ConsultationNamespace(Namespace):
+    """Multi-turn consultation over a persistent Socket.IO connection"""
+    def __init__(self, namespace):
+        super().__init__(namespace)
+        self.voice_handler = None
+        self.connections = {}
+        self.busy_rejections = 0
+        self.stalled_streams = 0
+
+    def on_connect(self, auth=None):
+        if self.voice_handler is None:
+            logging.warning("Consultation channel used before init_consultation_channel()")
+            return False
+        if 'user_id' not in session:
+            return False
+        state = ConsultationState(session['user_id'])
+        self.connections[request.sid] = state
+
+        # Resume a consultation started on an earlier connection, possibly on another worker
+        saved = load_consultation_state(state.user_id)
+        if saved and saved["questions"]:
+            state.restore(saved)
+            self.emit('question', {
+                "index": state.index,
+                "total": len(state.questions),
+                "question": state.questions[state.index],
+                "original_symptoms": state.original_symptoms,
+                "resumed": True
+            }, to=request.sid)
+
+    def on_disconnect(self, *args):
+        state = self.connections.pop(request.sid, None)
+        if state is not None:
+            # Release a sender still waiting for acknowledgements
+            state.ack(state.sent_seq)
+
+    def on_start(self, data):
+        self._handle(self._start, data)
+
+    def on_answer(self, data):
+        self._handle(self._answer, data)
+
+    def on_audio_ack(self, data):
+        state = self.connections.get(request.sid)
+        if state is not None and isinstance(data, dict):
+            state.ack(int(data.get("seq", 0)))
+
+    def _handle(self, step, data):
+        state = self.connections.get(request.sid)
+        if state is None:
+            return
+        if not state.busy.acquire(blocking=False):
+            self.busy_rejections += 1
+            self._error("A previous message is still being processed.", "busy")
+            return
+        try:
+            state.tier = qos.select_tier()
+            step(state, data if isinstance(data, dict) else {})
+        except AdmissionRejected as e:
+            self.emit('error', {
+                "error": "Too many requests. Please wait a moment and try again." if e.status == 429
+                         else "The server is busy. Please try again shortly.",
+                "code": "rate_limited" if e.status == 429 else "overloaded",
+                "retry_after": e.retry_after
+            }, to=request.sid)
+        except Exception as e:
+            logging.error(f"Error in consultation channel: {str(e)}")
+            self._error("Error processing consultation message", "server_error")
+        finally:
+            state.busy.release()
+
+    def _error(self, message, code):
+        self.emit('error', {"error": message, "code": code}, to=request.sid)
+
+    def _read_input(self, state, data, field):
+        """Text field or transcribed binary audio; None if an error was already sent"""
+        audio = data.get("audio")
+        if audio is None:
+            return data.get(field, "")
+        if not isinstance(audio, (bytes, bytearray)) or not audio:
+            self._error("Empty audio data. Please try recording again.", "bad_audio")
+            return None
+        if len(audio) > MAX_AUDIO_UPLOAD:
+            self._error("Audio recording is too long.", "too_large")
+            return None
+
+        try:
+            audio_data = decode_audio(audio)
+        except UnsupportedAudio:
+            self._error("Unsupported audio format.", "bad_audio")
+            return None
+        admit("stt", state.user_id)
+        source_lang = pack_for(state.language).stt_code
+        text = self.voice_handler.process_voice_input(audio_data, source_lang)
+        if not text:
+            self._error("Could not understand the audio. Please try again.", "bad_audio")
+            return None
+        return text
+
+    def _start(self, state, data):
+        state.language = str(data.get("language", "english")).lower()
+        state.voice_response = bool(data.get("voice_response", False))
+        state.audio_profile = str(data.get("audio_profile", "standard"))
+        symptoms = self._read_input(state, data, "symptoms")
+        if symptoms is None:
+            return
+        if not symptoms:
+            self._error("Please provide symptoms", "no_symptoms")
+            return
+
+        state.original_symptoms = symptoms
+        state.questions = ask_follow_up(symptoms, state.language)
+        state.index = 0
+        state.answers = []
+        save_consultation_state(state.user_id, state.to_dict())
+        self._send_question(state)
+
+    def _answer(self, state, data):
+        if not state.questions:
+            self._error("Please start a consultation first.", "no_consultation")
+            return
+        answer = self._read_input(state, data, "answer")
+        if answer is None:
+            return
+        if answer:
+            state.answers.append({"question": state.questions[state.index]["question"], "answer": answer})
+
+        if state.index + 1 < len(state.questions):
+            state.index += 1
+            save_consultation_state(state.user_id, state.to_dict())
+            self._send_question(state)
+            return
+
+        # Final step: push summary sections as they are ready
+        if needs_translation(state.language) and state.tier in ("full", "skip_tts"):
+            admit("translate", state.user_id)
+        state.questions = []
+        clear_consultation_state(state.user_id)
+        for event, payload in iter_summary_updates(self.voice_handler, state.user_id, state.original_symptoms,
+                                                   state.language, state.answers, state.tier):
+            self.emit("summary" if event == "complete" else event, payload, to=request.sid)
+
+    def _send_question(self, state):
+        question = state.questions[state.index]
+        payload = {"index": state.index, "total": len(state.questions), "question": question}
+        if state.index == 0:
+            payload["original_symptoms"] = state.original_symptoms
+        self.emit('question', payload, to=request.sid)
+        if state.voice_response and tier_allows_tts(state.tier):
+            self._send_audio(state, question["question"])
+
+    def _send_audio(self, state, text):
+        """
+        Synthesize text and push it as binary chunks within the connection's ack window.
+        The text has already been sent, so when speech is not admitted it stays text only.
+        """
+        try:
+            admit("tts", state.user_id)
+        except AdmissionRejected as e:
+            logging.warning(f"Voice response skipped: {e}")
+            return
+        try:
+            lang_code = pack_for(state.language).tts_code
+            audio_file, profile = speech_file(self.voice_handler, text, lang_code, state.audio_profile)
+        except Exception as e:
+            logging.error(f"Error generating voice response: {str(e)}")
+            return
+        if not audio_file:
+            return
+
+        # Cached speech is shared between connections and is not deleted after sending
+        with open(audio_file, 'rb') as fp:
+            chunk = fp.read(AUDIO_CHUNK_SIZE)
+            while chunk:
+                next_chunk = fp.read(AUDIO_CHUNK_SIZE)
+                if not state.wait_for_credit(AUDIO_ACK_TIMEOUT):
+                    self.stalled_streams += 1
+                    self._error("Audio stream stalled waiting for acknowledgements.", "slow_consumer")
+                    return
+                self.emit('audio', {
+                    "seq": state.next_seq(),
+                    "last": not next_chunk,
+                    "mimetype": OUTPUT_PROFILES[profile][1],
+                    "chunk": chunk
+                }, to=request.sid)
+                chunk = next_chunk
+
+
+def socketio_options():
+    """Extra SocketIO.init_app options: the cross-worker message queue, if configured"""
+    return message_queue_options()
+
+
+consultation_namespace = ConsultationNamespace(NAMESPACE)
+socketio.on_namespace(consultation_namespace)
+
+
+def init_consultation_channel(voice_handler):
+    """Enable the consultation namespace with the app's voice handler and export its metrics"""
+    consultation_namespace.voice_handler = voice_handler
+    register_metric("chatbot_socketio_connections", "gauge", "Open consultation channel connections.",
+                    lambda: len(consultation_namespace.connections))
+    register_metric("chatbot_socketio_backpressure_total", "counter",
+                    "Consultation channel messages refused or aborted by flow control.",
+                    lambda: [({"reason": "busy"}, consultation_namespace.busy_rejections),
+                             ({"reason": "slow_consumer"}, consultation_namespace.stalled_streams)])